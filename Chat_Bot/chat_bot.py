@@ -17,9 +17,13 @@ class GameDataLoader:
         except json.JSONDecodeError:
             raise ValueError(f"Invalid JSON in {file_name}")
 
+# The game's character catalog, the same file the game builds its characters from
+CHARACTER_CATALOG = os.path.join('..', 'JJK_Game', 'characters', 'catalog.json')
+
+
 # Game Services
 class CharacterService:
-    def __init__(self, data_file: str = 'characters.json'):
+    def __init__(self, data_file: str = CHARACTER_CATALOG):
         script_dir = os.path.dirname(__file__)
         file_path = os.path.join(script_dir, data_file)
         data = GameDataLoader.load_json(file_path)
@@ -11,6 +11,7 @@ from Chat_Bot.chat_bot import Chatbot
 from JJK_Game.battle_manager import BattleManager
 from JJK_Game.character_factory import CharacterFactory, Character
 from GoPirate_GUI.game_frame import GameFrame
+from JJK_Game.framing import FrameReader, send_frame
 from typing import Optional
 
 class UnifiedClient:
@@ -138,7 +139,7 @@ class UnifiedClient:
             self.username = self.player_name
             
             # Send player name to server for registration
-            self.client_socket.send(f"JOIN:{self.player_name}".encode())
+            send_frame(self.client_socket, f"JOIN:{self.player_name}")
             
             # Start receiver thread
             self.receiver_thread = threading.Thread(target=self.receive_messages, daemon=True)
@@ -192,9 +193,7 @@ class UnifiedClient:
 
     def send_message(self, message: dict):
         try:
-            # Add newline to separate messages
-            data = json.dumps(message) + '\n'
-            self.client_socket.send(data.encode())
+            send_frame(self.client_socket, json.dumps(message))
         except Exception as e:
             self.show_error(f"Failed to send message: {str(e)}")
 
@@ -233,10 +232,11 @@ class UnifiedClient:
         })
 
     def receive_messages(self):
+        reader = FrameReader(self.client_socket)
         while True:
             try:
-                message = self.client_socket.recv(1024).decode()
-                if not message:
+                message = reader.read_text()
+                if message is None:
                     break
 
                 if message.startswith('System:'):
@@ -296,7 +296,7 @@ class UnifiedClient:
         if message:
             try:
                 # Send message to server
-                self.client_socket.send(f"{self.player_name}: {message}".encode())
+                send_frame(self.client_socket, f"{self.player_name}: {message}")
                 
                 # Clear input
                 self.chat_input.delete(0, tk.END)
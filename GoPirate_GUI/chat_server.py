@@ -6,6 +6,7 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext
 from network_manager import NetworkManager
 from JJK_Game.game_server import GameServer
+from JJK_Game.framing import FrameReader, send_frame
 import threading
 import socket
 import json
@@ -40,17 +41,18 @@ class ChatServer:
         with self.lock:
             for client in self.clients:
                 try:
-                    client.send(message.encode())
+                    send_frame(client, message)
                 except Exception as e:
                     print(f"Error broadcasting to client: {str(e)}")
                     # Don't break on individual client errors
                     continue
                         
     def handle_client(self, client_socket, addr):
+        reader = FrameReader(client_socket)
         while True:
             try:
-                message = client_socket.recv(1024).decode()
-                if not message:
+                message = reader.read_text()
+                if message is None:
                     break
                     
                 if message.startswith('JOIN:'):
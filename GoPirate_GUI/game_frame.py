@@ -8,6 +8,8 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from JJK_Game.character_factory import CharacterFactory
+from JJK_Game.framing import FrameReader, encode_json
+from JJK_Game.state_stream import StateMirror
 
 
 class GameFrame(tk.Frame):
@@ -22,6 +24,7 @@ class GameFrame(tk.Frame):
         self.is_my_turn = False
         self.available_targets = []
         self.characters = []
+        self.state_mirror = StateMirror()
 
         # Network setup
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -56,6 +59,8 @@ class GameFrame(tk.Frame):
         if not self.battle_in_progress:
             start_btn = ttk.Button(self.button_frame, text="Start Game", command=self.start_game)
             start_btn.pack()
+            cpu_btn = ttk.Button(self.button_frame, text="Add CPU Player", command=self.add_cpu)
+            cpu_btn.pack()
 
     def render_character_selection(self, descriptions: list[dict[str, str]]):
         """Show character selection UI"""
@@ -143,13 +148,17 @@ class GameFrame(tk.Frame):
         self.state = 'select'
         self.send_message({'type': 'start'})
 
-    def connect(self, name: str):
+    def add_cpu(self):
+        """Ask the server to seat a CPU player in this room"""
+        self.send_message({'type': 'add_cpu'})
+
+    def connect(self, name: str, room: str = 'default'):
         try:
             self.sock.connect(('localhost', 5555))
             self.receive_thread = threading.Thread(target=self.receive_messages, daemon=True)
             self.receive_thread.start()
             self.player = name
-            self.send_message({'type': 'join', 'player_name': name})
+            self.send_message({'type': 'join', 'player_name': name, 'room': room})
         except ConnectionRefusedError:
             messagebox.showerror("Connection Error", "Could not connect to game server")
             self.master.destroy()
@@ -167,16 +176,13 @@ class GameFrame(tk.Frame):
 
     def receive_messages(self):
         """Thread for receiving server messages"""
-        buffer = b''
+        reader = FrameReader(self.sock)
         while True:
             try:
-                data = self.sock.recv(1024)
-                if not data:
+                message = reader.read_json()
+                if message is None:
                     break
-                buffer += data
-                while b'\n' in buffer:
-                    message, _, buffer = buffer.partition(b'\n')
-                    self.handle_server_message(json.loads(message))
+                self.handle_server_message(message)
             except (ConnectionAbortedError, ConnectionResetError):
                 self.after(0, lambda: messagebox.showerror("Connection Error", "Disconnected from server"))
                 break
@@ -196,6 +202,11 @@ class GameFrame(tk.Frame):
             self.after(100, self.enable_turn)
         elif data['type'] == 'target_selection':
             self.after(100, self.render_target_selection, data['targets'])
+        elif data['type'] in ('game_state', 'state_delta'):
+            if not self.state_mirror.apply(data):
+                self.send_message({'type': 'resync'})
+        elif data['type'] == 'timeout':
+            self.after(100, self.handle_timeout, data['phase'])
         elif data['type'] == 'battle_over':
             self.after(100, self.handle_battle_end, data['winner'])
 
@@ -232,6 +243,15 @@ class GameFrame(tk.Frame):
         self.is_my_turn = False
         self.render_action_buttons()
 
+    def handle_timeout(self, phase):
+        """Handle a prompt the server stopped waiting for"""
+        self.is_my_turn = False
+        self.clear_buttons()
+        if phase == 'character_choice':
+            self.info_label.config(text="Time is up, a character was picked for you.")
+        else:
+            self.info_label.config(text="Time is up, your turn was played for you.")
+
     def handle_battle_end(self, winner):
         """Handle battle conclusion"""
         self.battle_in_progress = False
@@ -248,7 +268,7 @@ class GameFrame(tk.Frame):
     def send_message(self, data):
         """Send message to server"""
         try:
-            self.sock.sendall(json.dumps(data).encode() + b'\n')
+            self.sock.sendall(encode_json(data))
         except Exception as e:
             messagebox.showerror("Connection Error", f"Failed to send data: {str(e)}")
 
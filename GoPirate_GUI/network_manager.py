@@ -9,6 +9,7 @@ from typing import Dict, Set
 import json
 from JJK_Game.battle_manager import BattleManager
 from JJK_Game.character_factory import CharacterFactory
+from JJK_Game.framing import FrameReader, send_frame
 
 class NetworkManager:
     def __init__(self, host='0.0.0.0', port=12345):
@@ -23,10 +24,11 @@ class NetworkManager:
         self.message_handler = handler
 
     def handle_client(self, client_socket: socket.socket, client_id: int):
+        reader = FrameReader(client_socket)
         while True:
             try:
-                message = client_socket.recv(1024).decode()
-                if not message:
+                message = reader.read_text()
+                if message is None:
                     break
 
                 # Handle JOIN messages specifically
@@ -55,10 +57,10 @@ class NetworkManager:
             try:
                 if isinstance(message, dict):
                     # Handle JSON messages
-                    client.send((json.dumps(message) + '\n').encode())
+                    send_frame(client, json.dumps(message))
                 else:
                     # Handle plain text messages
-                    client.send(message.encode())
+                    send_frame(client, message)
             except:
                 continue
 
@@ -1,17 +1,33 @@
 from __future__ import annotations
+import random
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
-from JJK_Game.user_interface import slow_print
-import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+from JJK_Game.battle_events import BattleEvent, EventSink, DEFAULT_SINK, DAMAGE, DEATH
+from JJK_Game.battle_state import CharacterState
 
 if TYPE_CHECKING:
     from character import Character
 
+# Where special moves draw their random numbers until a BattleManager gives them the match's own generator
+SHARED_RNG: random.Random = random.Random()
+
+
+def damage_after_defense(power: int, defense: int, pierces: bool = False) -> int:
+    """
+    The damage rule of every hit in the game, see matchups for it worked out per character pair.
+    :param power: The damage of the hit.
+    :param defense: The defender's current defense.
+    :param pierces: Whether the hit ignores defense.
+    :return: The hit points the defender loses.
+    """
+    return power if pierces else max(power - defense, 0)
+
 
 class Action(ABC):
     """
     Abstract Base Class representing actions that characters can use during the game.
     """
+    __slots__ = ('_name', '_description', '_voiceline', '_sink', '_hits')
 
     # region Constructor
     def __init__(self, name: str, description: str, voiceline: str):
@@ -24,6 +40,9 @@ class Action(ABC):
         self._name: str = name
         self._description: str = description
         self._voiceline: str = voiceline
+        self._sink: EventSink = DEFAULT_SINK
+        # Per defender kind, the damage this action deals at each defense the defender can have
+        self._hits: Optional[List[Dict[int, int]]] = None
 
     # endregion
 
@@ -40,9 +59,64 @@ class Action(ABC):
     def voiceline(self) -> str:
         return self._voiceline
 
+    @property
+    def sink(self) -> EventSink:
+        return self._sink
+
+    @sink.setter
+    def sink(self, sink: EventSink) -> None:
+        self._sink = sink
+
+    @property
+    def hits(self) -> Optional[List[Dict[int, int]]]:
+        return self._hits
+
+    @hits.setter
+    def hits(self, hits: Optional[List[Dict[int, int]]]) -> None:
+        self._hits = hits
+
     # endregion
 
     # region Methods
+    def clone(self) -> 'Action':
+        """
+        Copies this action field by field without running its constructor, see CharacterFactory.
+        :return: The copy.
+        """
+        twin = object.__new__(type(self))
+        twin._name = self._name
+        twin._description = self._description
+        twin._voiceline = self._voiceline
+        twin._sink = self._sink
+        twin._hits = self._hits
+        return twin
+
+    def hit(self, defender: Character, power: int, pierces: bool = False) -> int:
+        """
+        Looks up the damage dealt to the defender in this action's row of the matchup table,
+        working it out only for characters or defenses the table does not know.
+        :param defender: The character hit.
+        :param power: The damage of the hit.
+        :param pierces: Whether the hit ignores defense.
+        :return: The hit points the defender loses.
+        """
+        if self._hits is not None and defender.kind >= 0:
+            damage = self._hits[defender.kind].get(defender.defense)
+            if damage is not None:
+                return damage
+        return damage_after_defense(power, defender.defense, pierces)
+
+    def emit(self, kind: str, text: str, target: Optional[str] = None, amount: Optional[int] = None) -> None:
+        """
+        Reports something this action did to the sink.
+        :param kind: The event kind.
+        :param text: The line describing the event.
+        :param target: The name of the affected character.
+        :param amount: The number involved, if any.
+        :return: None
+        """
+        self._sink.emit(BattleEvent(kind, text, self._name, target, amount))
+
     @abstractmethod
     def apply(self, *args, **kwargs) -> None:
         """
@@ -58,6 +132,7 @@ class Attack(Action):
     """
     Represents a basic attack action, where the attacker deals damage to the defender.
     """
+    __slots__ = ('__damage',)
 
     # region Constructor
     def __init__(self, damage: int, name: str, description: str, voiceline: str) -> None:
@@ -81,6 +156,11 @@ class Attack(Action):
     # endregion
 
     # region Methods
+    def clone(self) -> 'Attack':
+        twin = super().clone()
+        twin.__damage = self.__damage
+        return twin
+
     def apply(self, attacker: Character, defender: Character) -> str:
         """
         Computes the amount of damage dealt after defense and checks if the defender is defeated.
@@ -88,13 +168,13 @@ class Attack(Action):
         @param attacker: The character using their attack.
         @param defender: The character receiving the attack.
         """
-        damage = max(self.__damage - defender.defense, 0)
+        damage = self.hit(defender, self.__damage)
         defender.hp -= damage
         response: str  = ''
         response += f"{attacker.name} attacks {defender.name} for {damage} damage!\n"
         response += f"{defender.name} has {defender.hp} HP remaining."
         if not defender.is_alive():
-            print(f"{defender.name} has been defeated!")
+            self.emit(DEATH, f"{defender.name} has been defeated!", defender.name)
         return response
     # endregion
 
@@ -102,7 +182,9 @@ class Attack(Action):
 class Defend(Action):
     """
     Represents a defensive action, where the attacker temporarily doubles their defense.
+    The current defense lives in a CharacterState shared with the character using it.
     """
+    __slots__ = ('__base_defense', '__boost', '_state')
 
     # region Constructor
     def __init__(self, name: str, description: str, base_defense: int, boost: int):
@@ -116,7 +198,7 @@ class Defend(Action):
         super().__init__(name, description, '')
         self.__base_defense: int = base_defense
         self.__boost: int = boost
-        self.__current_defense: int = base_defense
+        self._state: CharacterState = CharacterState(defense=base_defense)
 
     # endregion
 
@@ -131,22 +213,37 @@ class Defend(Action):
 
     @property
     def current_defense(self) -> int:
-        return self.__current_defense
+        return self._state.defense
 
     @current_defense.setter
     def current_defense(self, defense: int) -> None:
-        self.__current_defense = defense
+        self._state.defense = defense
+
+    @property
+    def state(self) -> CharacterState:
+        return self._state
+
+    @state.setter
+    def state(self, state: CharacterState) -> None:
+        self._state = state
 
     # endregion
 
     # region Methods
+    def clone(self) -> 'Defend':
+        twin = super().clone()
+        twin.__base_defense = self.__base_defense
+        twin.__boost = self.__boost
+        twin._state = self._state
+        return twin
+
     def is_boost_active(self) -> bool:
         """
         Does this Defend have a defense boost applied?
 
         :return: True if a defense boost is applied, False otherwise.
         """
-        return self.__current_defense > self.__base_defense
+        return self._state.defense > self.__base_defense
 
     def apply(self) -> None:
         """
@@ -154,14 +251,22 @@ class Defend(Action):
 
         :return: None
         """
-        self.__current_defense += self.__boost
+        self._state.defense += self.__boost
     # endregion
 
 
 class SpecialMove(Action, ABC):
     """
     Represents a special move with a cooldown that can be used during the game.
+    The turn it was last used on lives in a CharacterState shared with the character using it.
     """
+    __slots__ = ('__cooldown', '_rng', '_state')
+    # Outcomes of each rng.randint() call apply() makes per target, with their probabilities. Search AIs read this
+    # to build chance nodes, so a special that draws random numbers must declare them here
+    draws: tuple[tuple[int, float], ...] = ()
+    # The damage each target takes when it is hit, and whether defense is ignored. Read by the matchup table
+    power: int = 0
+    pierces: bool = False
 
     # region Constructor
     def __init__(self, name: str, description: str, voiceline: str, cooldown: int) -> None:
@@ -174,7 +279,8 @@ class SpecialMove(Action, ABC):
         """
         super().__init__(name, description, voiceline)
         self.__cooldown: int = cooldown
-        self.__last_used: int = 0
+        self._state: CharacterState = CharacterState()
+        self._rng: random.Random = SHARED_RNG
 
     # endregion
 
@@ -189,22 +295,79 @@ class SpecialMove(Action, ABC):
 
     @property
     def last_used(self) -> int:
-        return self.__last_used
+        return self._state.last_used
 
     @last_used.setter
     def last_used(self, value) -> None:
-        self.__last_used = value
+        self._state.last_used = value
+
+    @property
+    def state(self) -> CharacterState:
+        return self._state
+
+    @state.setter
+    def state(self, state: CharacterState) -> None:
+        self._state = state
+
+    @property
+    def rng(self) -> random.Random:
+        return self._rng
+
+    @rng.setter
+    def rng(self, rng: random.Random) -> None:
+        self._rng = rng
 
     # endregion
 
     # region Methods
+    def clone(self) -> 'SpecialMove':
+        twin = super().clone()
+        twin.__cooldown = self.__cooldown
+        twin._rng = self._rng
+        twin._state = self._state
+        return twin
+
     def is_available(self, turn: int) -> bool:
         """
         Returns whether this special move is available or not
         :param turn: The current turn count
         :return: True if the special move is available, False otherwise.
         """
-        return turn - self.last_used >= self.__cooldown
+        return turn - self._state.last_used >= self.__cooldown
+
+    def strike(self, targets: list[Character], power: int, pierces: bool = False) -> list[int]:
+        """
+        Hits every target as one batch, for specials that reach a whole lobby. Damage is looked up once per
+        character and defense, hit points are taken straight off the targets' states rather than through the hp
+        property, and the life hooks run once the whole batch landed, only for the targets that fell.
+        The hits are reported last, without building any event when the sink drops them.
+        :param targets: The characters hit.
+        :param power: The damage of each hit.
+        :param pierces: Whether the hits ignore defense.
+        :return: The hit points each target lost.
+        """
+        known: Dict[tuple, int] = {}
+        damages = []
+        fallen = []
+        for target in targets:
+            state = target.state
+            key = (target.kind, state.defense)
+            damage = known.get(key)
+            if damage is None:
+                damage = known[key] = self.hit(target, power, pierces)
+            if 0 < state.hp <= damage:
+                fallen.append(target)
+            state.hp -= damage
+            damages.append(damage)
+        for target in fallen:
+            target.report_life_change()
+        if self._sink.listening:
+            for target, damage in zip(targets, damages):
+                if not target.is_alive():
+                    self.emit(DEATH, f"{target.name} was eliminated by {self._name}.", target.name, damage)
+                else:
+                    self.emit(DAMAGE, f"{target.name} was damaged for {damage} damage.", target.name, damage)
+        return damages
 
     @abstractmethod
     def apply(self, defenders: list[Character]) -> None:
@@ -0,0 +1,214 @@
+import itertools
+import math
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from JJK_Game.battle_events import NullSink
+from JJK_Game.battle_manager import BattleManager
+from JJK_Game.battle_state import BattleState
+from JJK_Game.character import Character
+from JJK_Game.character_factory import CharacterFactory
+from JJK_Game.replay import factory_name
+
+BUDGET_MS = 200
+MAX_DEPTH = 12  # Turns to look ahead, iterative deepening usually runs out of time first
+MAX_OUTCOMES = 8  # Chance nodes with more outcomes are sampled instead of enumerated
+TABLE_SIZE = 200_000  # Transposition table entries kept per lineup before it is cleared
+MAX_LINEUPS = 64  # Lineups a search keeps a model of, one search can serve many rooms
+
+# An action and the seat it targets, None for defend and special
+Move = Tuple[str, Optional[int]]
+
+
+class OutOfTime(Exception):
+    """
+    Unwinds a search whose budget ran out, the deepest completed iteration gives the answer.
+    """
+
+
+class ScriptedRng:
+    """
+    Stands in for a special move's random generator and hands out the outcome of the chance node being searched.
+    """
+    __slots__ = ('values',)
+
+    def __init__(self) -> None:
+        self.values: List[int] = []
+
+    def script(self, values: Sequence[int]) -> None:
+        self.values = list(reversed(values))
+
+    def randint(self, a: int, b: int) -> int:
+        return self.values.pop()
+
+
+class SearchAI:
+    """
+    CPU opponent that picks a move by expectimax search over its own copy of the battle.
+    With more than two players every node maximises the value of the player to move (max^n), and special moves
+    with random effects become chance nodes over the outcomes the special declares in its draws.
+    """
+
+    # region Constructor
+    def __init__(self, budget_ms: float = BUDGET_MS, max_depth: int = MAX_DEPTH, max_outcomes: int = MAX_OUTCOMES,
+                 table_size: int = TABLE_SIZE, seed: Optional[int] = None) -> None:
+        """
+        :param budget_ms: Milliseconds a decision may take. The first turn of look-ahead always completes.
+        :param max_depth: The deepest search, in turns.
+        :param max_outcomes: Chance nodes with more outcomes than this are sampled.
+        :param table_size: Transposition table entries kept before it is cleared.
+        :param seed: Seed for sampling chance nodes.
+        """
+        self.budget: float = budget_ms / 1000
+        self.max_depth: int = max_depth
+        self.max_outcomes: int = max_outcomes
+        self.table_size: int = table_size
+        self.random: random.Random = random.Random(seed)
+        self.depth_reached: int = 0  # of the last decision
+        self.nodes: int = 0  # searched in the last decision
+        self.__rng: ScriptedRng = ScriptedRng()
+        # Lineup -> its private battle, players and transposition table
+        self.__models: Dict[Tuple[str, ...], Tuple[BattleManager, List[Character], dict]] = {}
+        self.__table: Dict[tuple, Tuple[int, Tuple[float, ...]]] = {}
+        self.__manager: Optional[BattleManager] = None
+        self.__players: List[Character] = []
+        self.__deadline: float = 0.0
+
+    # endregion
+
+    # region Methods
+    def choose(self, players: Sequence[str], state: BattleState, seat: int) -> Move:
+        """
+        Picks the move for the player in the given seat, whose status effects have already been handled this turn.
+        :param players: The in game names of the characters in seat order.
+        :param state: A snapshot of the battle, see BattleManager.snapshot().
+        :param seat: The seat to move for.
+        :return: The action and the seat it targets.
+        """
+        self.__manager, self.__players, self.__table = self.__model(tuple(players))
+        root = BattleState(state.characters, state.turn, seat, 0)
+        self.__manager.restore(root)
+        self.__deadline = time.perf_counter() + self.budget
+        self.nodes = 0
+        if len(self.__table) > self.table_size:
+            self.__table.clear()
+
+        moves = self.__moves(seat)
+        best = moves[0]
+        self.depth_reached = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                best = max(moves, key=lambda move: self.__expected(seat, move, depth, depth > 1)[seat])
+            except OutOfTime:
+                break
+            finally:
+                self.__manager.restore(root)
+            self.depth_reached = depth
+            if time.perf_counter() > self.__deadline:
+                break
+        return best
+
+    def choose_for(self, manager: BattleManager, player: Character) -> Tuple[str, Optional[str]]:
+        """
+        Picks the move of a player in a running battle. The battle itself is not touched.
+        :param manager: The battle.
+        :param player: The player to move for, after its status effects were handled.
+        :return: The action and the name of its target.
+        """
+        names = [p['name'] for p in manager.get_battle_state()['players']]
+        action, target = self.choose(names, manager.snapshot(), manager.get_seat(player))
+        return action, None if target is None else names[target]
+
+    def __model(self, players: Tuple[str, ...]) -> Tuple[BattleManager, List[Character], dict]:
+        # A private battle per lineup, reused between decisions
+        if players not in self.__models:
+            if len(self.__models) >= MAX_LINEUPS:
+                self.__models.clear()
+            factory = CharacterFactory()
+            characters = [factory.create_character(factory_name(name)) for name in players]
+            manager = BattleManager(characters, sink=NullSink(), seed=0)
+            for c in characters:
+                manager.assign_character(c.name)
+                c.rng = self.__rng
+            manager.start_battle()
+            self.__models[players] = manager, characters, {}
+        return self.__models[players]
+
+    def __moves(self, seat: int) -> List[Move]:
+        player = self.__players[seat]
+        moves: List[Move] = [('attack', self.__manager.get_seat(self.__manager.get_target_by_name(name)))
+                             for name in self.__manager.get_alive_targets(exclude=player)]
+        moves.append(('defend', None))
+        if player.special_move.is_available(self.__manager.get_turn()):
+            moves.append(('special', None))
+        return moves
+
+    def __outcomes(self, player: Character, action: str) -> List[Tuple[Tuple[int, ...], float]]:
+        draws = player.special_move.draws if action == 'special' else ()
+        if not draws:
+            return [((), 1.0)]
+        targets = len(self.__manager.get_alive_targets(exclude=player))
+        if len(draws) ** targets <= self.max_outcomes:
+            return [(tuple(value for value, _ in outcome), math.prod(p for _, p in outcome))
+                    for outcome in itertools.product(draws, repeat=targets)]
+        values, weights = zip(*draws)
+        return [(tuple(self.random.choices(values, weights, k=targets)), 1 / self.max_outcomes)
+                for _ in range(self.max_outcomes)]
+
+    def __expected(self, seat: int, move: Move, depth: int, timed: bool) -> Tuple[float, ...]:
+        manager, player = self.__manager, self.__players[seat]
+        action, target = move
+        saved = manager.snapshot()
+        total = [0.0] * len(self.__players)
+        for values, probability in self.__outcomes(player, action):
+            self.__rng.script(values)
+            manager.apply_action(player, action, None if target is None else self.__players[target])
+            manager.advance_turn()
+            for i, value in enumerate(self.__value(depth - 1, timed)):
+                total[i] += probability * value
+            manager.restore(saved)
+        return tuple(total)
+
+    def __value(self, depth: int, timed: bool) -> Tuple[float, ...]:
+        manager = self.__manager
+        if depth == 0 or manager.is_battle_over():
+            return self.__evaluate()
+        self.nodes += 1
+        if timed and time.perf_counter() > self.__deadline:
+            raise OutOfTime()
+
+        saved = manager.snapshot()
+        key = self.__key(saved)
+        cached = self.__table.get(key)
+        if cached is not None and cached[0] >= depth:
+            return cached[1]
+
+        player = manager.get_current_player()
+        seat = manager.get_seat(player)
+        if manager.handle_status_effects(player) or not player.is_alive():
+            manager.advance_turn()
+            value = self.__value(depth - 1, timed)
+        else:
+            value = max((self.__expected(seat, move, depth, timed) for move in self.__moves(seat)),
+                        key=lambda v: v[seat])
+        manager.restore(saved)
+        self.__table[key] = depth, value
+        return value
+
+    def __key(self, state: BattleState) -> tuple:
+        # Turns only matter through cooldowns, so they are stored as turns until each special is ready
+        turn = state.turn
+        return (state.current,) + tuple(
+            (c.hp, c.defense, c.stun, c.poison, max(0, p.special_move.cooldown - (turn - c.last_used)))
+            for c, p in zip(state.characters, self.__players))
+
+    def __evaluate(self) -> Tuple[float, ...]:
+        # Each player's share of the hit points still standing, a win is worth the whole share
+        hp = [max(p.hp, 0) for p in self.__players]
+        total = sum(hp)
+        if total == 0:
+            return tuple(0.0 for _ in hp)
+        return tuple(h / total for h in hp)
+
+    # endregion
+
@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+import JJK_Game
+from JJK_Game.analysis.simulator import simulate, Lineup, Policy, SeatPolicies, POLICIES, MAX_TURNS
+from JJK_Game.matchups import Overrides
+
+TASK_SIZE = 50_000  # Battles per task. Results depend on the task split only, never on the number of workers
+CONFIDENCE_Z = 1.96  # 95% confidence intervals
+CACHE_DIR = Path(os.environ.get('JJK_CACHE_DIR', Path.home() / '.cache' / 'jjk_game')) / 'monte_carlo'
+# Files whose contents decide battle outcomes. Editing any of them invalidates cached estimates
+RULE_SOURCES = ['action.py', 'battle_manager.py', 'battle_state.py', 'character.py', 'matchups.py',
+                'status_effects.py', 'characters', 'characters/catalog.json', 'analysis/simulator.py']
+
+
+# region Helpers
+def rules_version() -> str:
+    """
+    Hashes the source of the battle rules, so estimates computed under older rules are never reused.
+    :return: A hex digest of the rule sources.
+    """
+    root = Path(JJK_Game.__file__).parent
+    digest = hashlib.sha256()
+    for source in RULE_SOURCES:
+        path = root / source
+        for file in sorted(path.glob('*.py')) if path.is_dir() else [path]:
+            digest.update(file.relative_to(root).as_posix().encode())
+            digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def wilson_interval(wins: int, total: int, z: float = CONFIDENCE_Z) -> Tuple[float, float]:
+    """
+    Confidence interval of a win probability, which stays inside [0, 1] even for rare outcomes.
+    :param wins: The number of battles won.
+    :param total: The number of battles played.
+    :param z: The z-score of the confidence level.
+    :return: The lower and upper bound.
+    """
+    if total == 0:
+        return 0.0, 1.0
+    p = wins / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    half = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def write_atomic(path: Path, data: dict) -> None:
+    """
+    Writes JSON to a cache file under a temporary name first, so a concurrent reader never sees half a file.
+    :param path: The cache file.
+    :param data: What to write.
+    :return: None
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(f'.{os.getpid()}.tmp')
+    partial.write_text(json.dumps(data))
+    partial.replace(path)
+
+
+# endregion
+
+class WinEstimate:
+    """
+    Estimated win probabilities of a lineup, one per seat plus draws.
+    """
+
+    # region Constructor
+    def __init__(self, names: List[str], wins: List[int], draws: int, mean_turns: float, cached: bool = False) -> None:
+        """
+        :param names: The lineup in seat order.
+        :param wins: Battles won by each seat.
+        :param draws: Battles without a winner.
+        :param mean_turns: The average battle length.
+        :param cached: Whether the estimate was read from the disk cache.
+        """
+        self.names: List[str] = names
+        self.wins: List[int] = wins
+        self.draws: int = draws
+        self.mean_turns: float = mean_turns
+        self.cached: bool = cached
+
+    # endregion
+
+    # region Properties
+    @property
+    def battles(self) -> int:
+        return sum(self.wins) + self.draws
+
+    # endregion
+
+    # region Methods
+    def probability(self, seat: int) -> float:
+        return self.wins[seat] / self.battles
+
+    def interval(self, seat: int) -> Tuple[float, float]:
+        return wilson_interval(self.wins[seat], self.battles)
+
+    def to_dict(self) -> dict:
+        return {'names': self.names, 'wins': self.wins, 'draws': self.draws, 'mean_turns': self.mean_turns}
+
+    @classmethod
+    def from_dict(cls, data: dict, cached: bool = False) -> 'WinEstimate':
+        return cls(data['names'], data['wins'], data['draws'], data['mean_turns'], cached)
+
+    def __str__(self) -> str:
+        lines = []
+        for seat, name in enumerate(self.names):
+            low, high = self.interval(seat)
+            lines.append(f"{seat}: {name:>10}  {self.probability(seat):.4f}  [{low:.4f}, {high:.4f}]")
+        lines.append(f"{'draw':>13}  {self.draws / self.battles:.4f}")
+        lines.append(f"{self.battles} battles, {self.mean_turns:.2f} turns on average")
+        return '\n'.join(lines)
+    # endregion
+
+
+# region Workers
+def run_task(names: List[str], battles: int, policies: List[Policy], seed: np.random.SeedSequence,
+             max_turns: int, overrides: Optional[Overrides] = None) -> Tuple[List[int], int, int]:
+    """
+    Simulates one share of the battles in a worker process.
+    :return: Wins per seat, draws and the total number of turns, small enough to send back cheaply.
+    """
+    result = simulate(names, battles, policies, seed, max_turns, overrides=overrides)
+    counts = np.bincount(result.winners.astype(np.int64) + 1, minlength=len(names) + 1)
+    return counts[1:].tolist(), int(counts[0]), int(result.turns.sum())
+
+
+# endregion
+
+def cache_key(names: Sequence[str], policies: List[Policy], battles: int, seed: int, max_turns: int) -> str:
+    description = json.dumps({
+        'lineup': list(names),
+        'policies': [repr(policy) for policy in policies],
+        'battles': battles,
+        'seed': seed,
+        'max_turns': max_turns,
+        'task_size': TASK_SIZE,
+        'rules': rules_version()
+    }, sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def estimate(names: Sequence[str], policies: Union[Policy, Sequence[Policy]] = POLICIES['random'],
+             battles: int = 200_000, seed: int = 0, workers: Optional[int] = None, max_turns: int = MAX_TURNS,
+             cache_dir: Optional[Path] = CACHE_DIR) -> WinEstimate:
+    """
+    Estimates the win probability of every seat by simulating independent battles in parallel.
+    :param names: Factory names of the characters in seat order.
+    :param policies: One policy for everybody or one per seat.
+    :param battles: The number of battles to simulate.
+    :param seed: The root seed. Every task gets its own independent stream spawned from it.
+    :param workers: The number of worker processes, default is the CPU count. 1 runs in this process.
+    :param max_turns: Battles still running after this many turns count as a draw.
+    :param cache_dir: Where estimates are kept between runs, None to disable the cache.
+    :return: The estimate.
+    :raises ValueError: If the lineup or the policies are invalid.
+    """
+    policies = SeatPolicies(policies, len(Lineup(names))).seats
+    key = cache_key(names, policies, battles, seed, max_turns)
+    path = None if cache_dir is None else Path(cache_dir) / f'{key}.json'
+    if path is not None and path.exists():
+        return WinEstimate.from_dict(json.loads(path.read_text()), cached=True)
+
+    sizes = [min(TASK_SIZE, battles - start) for start in range(0, battles, TASK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(list(names), size, policies, task_seed, max_turns) for size, task_seed in zip(sizes, seeds)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        results = [run_task(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(run_task, *zip(*tasks)))
+
+    wins = [sum(result[0][seat] for result in results) for seat in range(len(names))]
+    draws = sum(result[1] for result in results)
+    total_turns = sum(result[2] for result in results)
+    found = WinEstimate(list(names), wins, draws, total_turns / max(battles, 1))
+
+    if path is not None:
+        write_atomic(path, found.to_dict())
+    return found
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Estimate the win probabilities of a JJK lineup.')
+    parser.add_argument('lineup', nargs='+', help='Characters in seat order, e.g. Gojo Sukuna')
+    parser.add_argument('--policies', nargs='+', choices=sorted(POLICIES), default=['random'],
+                        help='One policy for everybody or one per seat')
+    parser.add_argument('--battles', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    chosen = [POLICIES[name] for name in args.policies]
+    print(estimate(args.lineup, chosen[0] if len(chosen) == 1 else chosen, args.battles, args.seed, args.workers,
+                   cache_dir=None if args.no_cache else CACHE_DIR))
@@ -0,0 +1,472 @@
+import argparse
+import math
+import random
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from JJK_Game.battle_events import NullSink
+from JJK_Game.battle_manager import BattleManager
+from JJK_Game.character import Character
+from JJK_Game.character_factory import CharacterFactory
+from JJK_Game.characters.gojo import UnlimitedVoid
+from JJK_Game.characters.megumi import Mahoraga
+from JJK_Game.characters.nanami import Overtime
+from JJK_Game.characters.nobara import Resonance
+from JJK_Game.characters.sukuna import MalevolentShrine
+from JJK_Game.matchups import MatchupTable, Overrides, get_table, tuned_stats
+
+ATTACK, DEFEND, SPECIAL = 0, 1, 2
+ACTIONS = ('attack', 'defend', 'special')
+DRAW = -1  # Winner of a battle that hit the turn limit or left nobody standing
+MAX_TURNS = 1000
+CHUNK_SIZE = 100_000  # Battles simulated at once, bounds the memory of the arrays
+CONSISTENCY_THRESHOLD = 4.0  # Largest z-score a cross-check may show and still count as consistent
+
+
+# region Lineup
+class Lineup:
+    """
+    Per-seat constants of a battle, read from the object engine's character classes.
+    """
+
+    def __init__(self, names: Sequence[str], overrides: Optional[Overrides] = None) -> None:
+        """
+        :param names: Factory names of the characters in seat order, e.g. ['Gojo', 'Sukuna'].
+        :param overrides: Stats to use instead of the catalog's, e.g. {'Gojo': {'hp': 130}}.
+        :raises ValueError: If fewer than two characters are given, or a name or an overridden stat is unknown.
+        """
+        if len(names) < 2:
+            raise ValueError("A battle needs at least two characters.")
+        factory = CharacterFactory()
+        characters: List[Character] = [factory.create_character(name) for name in names]
+        stats = [tuned_stats(c, (overrides or {}).get(name)) for name, c in zip(names, characters)]
+        self.names: List[str] = list(names)
+        self.hp: np.ndarray = np.array([s['hp'] for s in stats], np.int32)
+        self.attack: np.ndarray = np.array([s['attack'] for s in stats], np.int32)
+        self.base_defense: np.ndarray = np.array([s['base_defense'] for s in stats], np.int32)
+        self.boost: np.ndarray = np.array([s['boost'] for s in stats], np.int32)
+        self.cooldown: np.ndarray = np.array([s['cooldown'] for s in stats], np.int32)
+        self.poison_damage: np.ndarray = np.array([c.poison.damage for c in characters], np.int32)
+        self.specials: List[type] = list(dict.fromkeys(type(c.special_move) for c in characters))
+        self.special_index: np.ndarray = np.array([self.specials.index(type(c.special_move)) for c in characters])
+        # Damage by attacker seat, defender seat and whether the defender's boost is up, from the matchup table
+        table = MatchupTable(list(dict.fromkeys(names)), overrides) if overrides else get_table()
+        kinds = [table.kind(c) for c in characters]
+        self.attack_table: np.ndarray = np.array([[table.attack[a][d] for d in kinds] for a in kinds], np.int32)
+        self.special_table: np.ndarray = np.array([[table.special[a][d] for d in kinds] for a in kinds], np.int32)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def hits(self, table: np.ndarray, sources: np.ndarray, targets: np.ndarray, defense: np.ndarray) -> np.ndarray:
+        """
+        :param table: attack_table or special_table.
+        :param sources: Flat positions of the characters hitting.
+        :param targets: Flat positions of the characters hit, one per source.
+        :param defense: The flattened defense of every battle.
+        :return: The damage of each hit.
+        """
+        seats = len(self)
+        defenders = targets % seats
+        boosted = (defense[targets] != self.base_defense[defenders]).astype(np.intp)
+        return table[sources % seats, defenders, boosted]
+
+
+# endregion
+
+# region Policies
+class Policy:
+    """
+    How simulated players choose their actions, usable by both the vectorized and the object engine.
+    """
+
+    def __init__(self, weights: Tuple[float, float, float] = (1, 1, 1), target: str = 'random',
+                 special_when_ready: bool = False) -> None:
+        """
+        :param weights: Relative chances of attack, defend and special.
+        :param target: 'random', 'first' (lowest seat) or 'weakest' (lowest hp, then lowest seat).
+        :param special_when_ready: Always use the special when it is off cooldown.
+        """
+        total = sum(weights)
+        self.thresholds: Tuple[float, float] = (weights[0] / total, (weights[0] + weights[1]) / total)
+        self.target: str = target
+        self.special_when_ready: bool = special_when_ready
+
+    def __repr__(self) -> str:
+        return (f"Policy(thresholds={self.thresholds!r}, target={self.target!r}, "
+                f"special_when_ready={self.special_when_ready!r})")
+
+    def choose_actions(self, rng: np.random.Generator, available: np.ndarray) -> np.ndarray:
+        """
+        :param rng: The simulator's random generator.
+        :param available: Whether each actor's special is off cooldown.
+        :return: The action code of each actor.
+        """
+        u = rng.random(len(available))
+        actions = np.where(u < self.thresholds[0], ATTACK, np.where(u < self.thresholds[1], DEFEND, SPECIAL))
+        if self.special_when_ready:
+            actions[available] = SPECIAL
+        return actions
+
+    def choose_targets(self, rng: np.random.Generator, others: np.ndarray, hp: np.ndarray) -> np.ndarray:
+        """
+        :param rng: The simulator's random generator.
+        :param others: Which seats each actor may target.
+        :param hp: The hit points of every seat.
+        :return: The target seat of each actor.
+        """
+        if self.target == 'first':
+            return np.argmax(others, axis=1)
+        if self.target == 'weakest':
+            return np.argmin(np.where(others, hp, np.iinfo(np.int32).max), axis=1)
+        return np.argmax(np.where(others, rng.random(others.shape), -1.0), axis=1)
+
+    def choose_action(self, rng: random.Random, available: bool) -> str:
+        if self.special_when_ready and available:
+            return 'special'
+        u = rng.random()
+        return ACTIONS[ATTACK if u < self.thresholds[0] else DEFEND if u < self.thresholds[1] else SPECIAL]
+
+    def choose_target(self, rng: random.Random, targets: List[Character]) -> Character:
+        if self.target == 'first':
+            return targets[0]
+        if self.target == 'weakest':
+            return min(targets, key=lambda c: c.hp)
+        return rng.choice(targets)
+
+
+class SeatPolicies:
+    """
+    One policy per seat. Seats sharing a policy are decided together, so a single policy costs one call per step.
+    """
+
+    def __init__(self, policies: Union[Policy, Sequence[Policy]], seats: int) -> None:
+        """
+        :param policies: A policy for every seat, or one policy used by all of them.
+        :param seats: The number of seats.
+        :raises ValueError: If the number of policies does not match the number of seats.
+        """
+        if isinstance(policies, Policy):
+            policies = [policies] * seats
+        if len(policies) != seats:
+            raise ValueError(f"Expected {seats} policies, got {len(policies)}.")
+        self.seats: List[Policy] = list(policies)
+        self.distinct: List[Policy] = list(dict.fromkeys(self.seats))
+        self.index: np.ndarray = np.array([self.distinct.index(p) for p in self.seats])
+
+    def choose_actions(self, rng: np.random.Generator, actors: np.ndarray, available: np.ndarray) -> np.ndarray:
+        if len(self.distinct) == 1:
+            return self.distinct[0].choose_actions(rng, available)
+        actions = np.empty(len(actors), np.int64)
+        for index, policy in enumerate(self.distinct):
+            mine = self.index[actors] == index
+            actions[mine] = policy.choose_actions(rng, available[mine])
+        return actions
+
+    def choose_targets(self, rng: np.random.Generator, actors: np.ndarray, others: np.ndarray,
+                       hp: np.ndarray) -> np.ndarray:
+        if len(self.distinct) == 1:
+            return self.distinct[0].choose_targets(rng, others, hp)
+        targets = np.empty(len(actors), np.int64)
+        for index, policy in enumerate(self.distinct):
+            mine = self.index[actors] == index
+            targets[mine] = policy.choose_targets(rng, others[mine], hp[mine])
+        return targets
+
+
+POLICIES: Dict[str, Policy] = {
+    'random': Policy(),
+    'greedy': Policy((1, 0, 0), target='first', special_when_ready=True),
+    'focus': Policy((1, 0, 0), target='weakest', special_when_ready=True),
+}
+
+
+# endregion
+
+# region Vectorized Engine
+class BattleArrays:
+    """
+    Struct of arrays holding the state of many independent battles, one row per battle and one column per seat.
+    """
+
+    def __init__(self, lineup: Lineup, battles: int) -> None:
+        shape = (battles, len(lineup))
+        self.ids: np.ndarray = np.arange(battles)  # Position of each row in the results
+        self.hp: np.ndarray = np.broadcast_to(lineup.hp, shape).copy()
+        self.defense: np.ndarray = np.broadcast_to(lineup.base_defense, shape).copy()  # Including any boost
+        self.last_used: np.ndarray = np.zeros(shape, np.int32)
+        self.poison: np.ndarray = np.zeros(shape, np.int8)
+        self.stun: np.ndarray = np.zeros(shape, np.int8)
+        self.current: np.ndarray = np.zeros(battles, np.int64)
+        self.turn: np.ndarray = np.zeros(battles, np.int32)
+
+    def keep(self, rows: np.ndarray) -> None:
+        """
+        Drops every battle not in rows, so finished battles cost nothing on later steps.
+        """
+        for field in ('ids', 'hp', 'defense', 'last_used', 'poison', 'stun', 'current', 'turn'):
+            setattr(self, field, getattr(self, field)[rows])
+
+
+# Each special's apply() as array operations on the flattened (battle, seat) arrays.
+# `targets` are the flat positions of the characters the object engine would pass in, `sources` the user hitting
+# each of them and `actors` the users themselves.
+def unlimited_void(s: BattleArrays, lineup: Lineup, targets: np.ndarray, sources: np.ndarray, actors: np.ndarray,
+                   rng: np.random.Generator) -> None:
+    hp, defense, stun = s.hp.reshape(-1), s.defense.reshape(-1), s.stun.reshape(-1)
+    hp[targets] -= lineup.hits(lineup.special_table, sources, targets, defense)
+    stun[targets[rng.random(len(targets)) < 0.5]] = 1
+
+
+def malevolent_shrine(s: BattleArrays, lineup: Lineup, targets: np.ndarray, sources: np.ndarray, actors: np.ndarray,
+                      rng: np.random.Generator) -> None:
+    s.hp.reshape(-1)[targets] -= lineup.hits(lineup.special_table, sources, targets, s.defense.reshape(-1))
+
+
+def mahoraga(s: BattleArrays, lineup: Lineup, targets: np.ndarray, sources: np.ndarray, actors: np.ndarray,
+             rng: np.random.Generator) -> None:
+    hp = s.hp.reshape(-1)
+    hp[targets] -= lineup.hits(lineup.special_table, sources, targets, s.defense.reshape(-1))
+    hp[actors] += Mahoraga.heal
+
+
+def overtime(s: BattleArrays, lineup: Lineup, targets: np.ndarray, sources: np.ndarray, actors: np.ndarray,
+             rng: np.random.Generator) -> None:
+    hp, defense, stun = s.hp.reshape(-1), s.defense.reshape(-1), s.stun.reshape(-1)
+    stunned = rng.random(len(targets)) < 0.25
+    stun[targets[stunned]] = 1
+    hit = targets[~stunned]
+    hp[hit] -= lineup.hits(lineup.special_table, sources[~stunned], hit, defense)
+
+
+def resonance(s: BattleArrays, lineup: Lineup, targets: np.ndarray, sources: np.ndarray, actors: np.ndarray,
+              rng: np.random.Generator) -> None:
+    s.poison.reshape(-1)[targets] = rng.integers(1, 4, len(targets))
+
+
+SPECIAL_RULES: Dict[type, Callable] = {
+    UnlimitedVoid: unlimited_void,
+    MalevolentShrine: malevolent_shrine,
+    Mahoraga: mahoraga,
+    Overtime: overtime,
+    Resonance: resonance,
+}
+
+
+def step(s: BattleArrays, lineup: Lineup, policies: 'SeatPolicies', rng: np.random.Generator) -> None:
+    """
+    Plays one turn in every battle, in the same order as GameRoom.run_battle.
+    Cells are addressed by flat position (battle * seats + seat), which is much cheaper than 2D fancy indexing.
+    """
+    seats = len(lineup)
+    hp, defense, poison = s.hp.reshape(-1), s.defense.reshape(-1), s.poison.reshape(-1)
+    stun, last_used = s.stun.reshape(-1), s.last_used.reshape(-1)
+    rows = np.arange(len(s.ids))
+
+    # The current player is the first alive seat at or after the turn index
+    alive = s.hp > 0
+    ahead = np.concatenate([alive, alive], axis=1) & (np.arange(2 * seats) >= s.current[:, None])
+    current = np.argmax(ahead, axis=1) % seats
+    cells = rows * seats + current
+
+    # Status effects: the defense boost ends, poison ticks, a stun skips the turn
+    defense[cells] = lineup.base_defense[current]
+    poisoned = cells[poison[cells] > 0]
+    hp[poisoned] -= lineup.poison_damage[poisoned % seats]
+    poison[poisoned] -= 1
+    stunned = stun[cells] > 0
+    stun[cells[stunned]] -= 1
+
+    rows, actors, cells = rows[~stunned], current[~stunned], cells[~stunned]
+    others = s.hp[rows] > 0
+    others[np.arange(len(rows)), actors] = False
+    available = s.turn[rows] - last_used[cells] >= lineup.cooldown[actors]
+    actions = policies.choose_actions(rng, actors, available)
+
+    attacking = actions == ATTACK
+    r = rows[attacking]
+    hit = r * seats + policies.choose_targets(rng, actors[attacking], others[attacking], s.hp[r])
+    hp[hit] -= lineup.hits(lineup.attack_table, cells[attacking], hit, defense)
+
+    defending = cells[actions == DEFEND]
+    defending = defending[defense[defending] == lineup.base_defense[defending % seats]]
+    defense[defending] += lineup.boost[defending % seats]
+
+    # A special on cooldown wastes the turn, like Character.special returning False
+    using = (actions == SPECIAL) & available
+    users, others = cells[using], others[using]
+    last_used[users] = s.turn[rows[using]]
+    kinds = lineup.special_index[actors[using]]
+    for index, special in enumerate(lineup.specials):
+        mine = kinds == index
+        if mine.any():
+            flat = np.flatnonzero(others[mine])
+            sources = users[mine][flat // seats]
+            targets = (sources // seats) * seats + flat % seats
+            SPECIAL_RULES[special](s, lineup, targets, sources, users[mine], rng)
+
+    s.turn += 1
+    s.current = (current + 1) % seats
+
+
+class SimulationResult:
+    """
+    Outcomes of a batch of battles of one lineup.
+    """
+
+    def __init__(self, names: List[str], winners: np.ndarray, turns: np.ndarray, hp: np.ndarray) -> None:
+        """
+        :param names: The lineup in seat order.
+        :param winners: The winning seat of each battle, or DRAW.
+        :param turns: The number of turns each battle took.
+        :param hp: The final hit points, one row per battle.
+        """
+        self.names: List[str] = names
+        self.winners: np.ndarray = winners
+        self.turns: np.ndarray = turns
+        self.hp: np.ndarray = hp
+
+    def __len__(self) -> int:
+        return len(self.winners)
+
+    def win_rates(self) -> Dict[str, float]:
+        """
+        :return: The share of battles won by each seat, keyed by character name, plus 'draw'.
+        """
+        counts = np.bincount(self.winners + 1, minlength=len(self.names) + 1) / max(len(self), 1)
+        rates = {name: float(rate) for name, rate in zip(self.names, counts[1:])}
+        rates['draw'] = float(counts[0])
+        return rates
+
+    def mean_turns(self) -> float:
+        return float(self.turns.mean()) if len(self) else 0.0
+
+
+def simulate(names: Sequence[str], battles: int, policy: Union[Policy, Sequence[Policy]] = POLICIES['random'],
+             seed: Union[int, np.random.SeedSequence, None] = None, max_turns: int = MAX_TURNS,
+             chunk_size: int = CHUNK_SIZE, overrides: Optional[Overrides] = None) -> SimulationResult:
+    """
+    Plays many independent battles of the same lineup at array speed.
+    :param names: Factory names of the characters in seat order.
+    :param battles: The number of battles.
+    :param policy: How the players choose their actions, one policy for everybody or one per seat.
+    :param seed: Seed of the random generator, None for a fresh one.
+    :param max_turns: Battles still running after this many turns count as a draw.
+    :param chunk_size: The number of battles held in memory at once.
+    :param overrides: Stats to use instead of the catalog's.
+    :return: The outcome of every battle.
+    """
+    lineup = Lineup(names, overrides)
+    policies = SeatPolicies(policy, len(lineup))
+    rng = np.random.default_rng(seed)
+    winners = np.full(battles, DRAW, np.int8)
+    turns = np.zeros(battles, np.int32)
+    hp = np.zeros((battles, len(lineup)), np.int32)
+
+    for start in range(0, battles, chunk_size):
+        s = BattleArrays(lineup, min(chunk_size, battles - start))
+        s.ids += start
+        while len(s.ids):
+            step(s, lineup, policies, rng)
+            alive = s.hp > 0
+            count = alive.sum(axis=1)
+            finished = (count <= 1) | (s.turn >= max_turns)
+            if finished.any():
+                ids = s.ids[finished]
+                winners[ids] = np.where(count[finished] == 1, np.argmax(alive[finished], axis=1), DRAW)
+                turns[ids] = s.turn[finished]
+                hp[ids] = s.hp[finished]
+                s.keep(np.flatnonzero(~finished))
+    return SimulationResult(list(names), winners, turns, hp)
+
+
+# endregion
+
+# region Cross-Check
+def play_object_battle(names: Sequence[str], policy: Union[Policy, Sequence[Policy]], rng: random.Random,
+                       max_turns: int = MAX_TURNS) -> Tuple[int, int, List[int]]:
+    """
+    Plays one battle with the object engine, driving BattleManager the way GameRoom does.
+    :return: The winning seat or DRAW, the number of turns and the final hit points.
+    """
+    policies = SeatPolicies(policy, len(names)).seats
+    factory = CharacterFactory()
+    characters = [factory.create_character(name) for name in names]
+    manager = BattleManager(characters, sink=NullSink(), seed=rng.getrandbits(64))
+    for c in characters:
+        manager.assign_character(c.name)
+    manager.start_battle()
+
+    turn = 0
+    while not manager.is_battle_over() and turn < max_turns:
+        player = manager.get_current_player()
+        if not manager.handle_status_effects(player):
+            policy = policies[manager.get_seat(player)]
+            action = policy.choose_action(rng, player.special_move.is_available(turn))
+            target = None
+            if action == 'attack':
+                targets = [manager.get_target_by_name(name) for name in manager.get_alive_targets(exclude=player)]
+                target = policy.choose_target(rng, targets)
+            manager.apply_action(player, action, target)
+        manager.advance_turn()
+        turn += 1
+
+    alive = [seat for seat, c in enumerate(characters) if c.is_alive()]
+    winner = alive[0] if len(alive) == 1 else DRAW
+    return winner, turn, [c.hp for c in characters]
+
+
+def two_proportion_z(p1: float, n1: int, p2: float, n2: int) -> float:
+    pooled = (p1 * n1 + p2 * n2) / (n1 + n2)
+    spread = math.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+    return 0.0 if spread == 0 else (p1 - p2) / spread
+
+
+def cross_check(names: Sequence[str], policy: Union[Policy, Sequence[Policy]] = POLICIES['random'],
+                samples: int = 2000, battles: int = 100_000, seed: int = 0, max_turns: int = MAX_TURNS) -> dict:
+    """
+    Compares the simulator with the object engine on the same lineup and policy.
+    Random streams differ between the two, so outcomes are compared as distributions with z-scores.
+    :param samples: The number of battles played by the object engine.
+    :param battles: The number of battles simulated.
+    :return: Both sets of win rates and mean turns, the z-scores and whether they are all within the threshold.
+    """
+    rng = random.Random(seed)
+    played = [play_object_battle(names, policy, rng, max_turns) for _ in range(samples)]
+    reference = SimulationResult(list(names), np.array([p[0] for p in played], np.int8),
+                                 np.array([p[1] for p in played], np.int32), np.array([p[2] for p in played]))
+    simulated = simulate(names, battles, policy, seed, max_turns)
+
+    expected, actual = reference.win_rates(), simulated.win_rates()
+    z_scores = {key: two_proportion_z(expected[key], samples, actual[key], battles) for key in expected}
+    spread = math.sqrt(reference.turns.var() / samples + simulated.turns.var() / battles)
+    z_scores['turns'] = 0.0 if spread == 0 else (reference.mean_turns() - simulated.mean_turns()) / spread
+    return {
+        'object': {'win_rates': expected, 'mean_turns': reference.mean_turns()},
+        'simulated': {'win_rates': actual, 'mean_turns': simulated.mean_turns()},
+        'z_scores': z_scores,
+        'consistent': all(abs(z) < CONSISTENCY_THRESHOLD for z in z_scores.values())
+    }
+
+
+# endregion
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulate many JJK battles at once for balance analysis.')
+    parser.add_argument('lineup', nargs='+', help='Characters in seat order, e.g. Gojo Sukuna')
+    parser.add_argument('--battles', type=int, default=1_000_000)
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--cross-check', action='store_true', help='Also compare against the object engine')
+    args = parser.parse_args()
+
+    if args.cross_check:
+        report = cross_check(args.lineup, POLICIES[args.policy], seed=args.seed or 0)
+        for engine in ('object', 'simulated'):
+            print(f"{engine}: {report[engine]}")
+        print(f"z-scores: {report['z_scores']}")
+        print("Consistent" if report['consistent'] else "MISMATCH between the simulator and the object engine")
+    else:
+        result = simulate(args.lineup, args.battles, POLICIES[args.policy], args.seed)
+        for name, rate in result.win_rates().items():
+            print(f"{name:>10}: {rate:.4f}")
+        print(f"Mean turns: {result.mean_turns():.2f}")
@@ -0,0 +1,293 @@
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from JJK_Game.analysis.monte_carlo import CACHE_DIR as ESTIMATE_CACHE_DIR, rules_version, run_task
+from JJK_Game.analysis.simulator import Policy, POLICIES, MAX_TURNS
+from JJK_Game.analysis.tournament import chunk_seed
+from JJK_Game.character_factory import CharacterFactory
+from JJK_Game.matchups import Overrides, TUNABLE, tuned_stats
+
+CHECKPOINT = ESTIMATE_CACHE_DIR.parent / 'sweep' / 'checkpoint.jsonl'
+
+# The values to try per parameter, e.g. {'Gojo.attack': [24, 26, 28]}
+Space = Dict[str, List[int]]
+# One value per parameter
+Point = Dict[str, int]
+# Wins per seat, draws and the total number of turns of the battles of one seat order
+Counts = Tuple[List[int], int, int]
+
+
+# region Helpers
+def parse_range(spec: str) -> Tuple[str, List[int]]:
+    """
+    :param spec: 'Name.stat=low:high[:step]', both ends included, or 'Name.stat=a,b,c'.
+    :return: The parameter and its values.
+    :raises ValueError: If the spec is malformed or names an unknown character or stat.
+    """
+    parameter, _, values = spec.partition('=')
+    check_parameter(parameter)
+    try:
+        if ':' in values:
+            low, high, step = (list(map(int, values.split(':'))) + [1])[:3]
+            found = list(range(low, high + 1, step))
+        else:
+            found = [int(value) for value in values.split(',')]
+    except ValueError:
+        raise ValueError(f"'{spec}' is not a range like Gojo.attack=24:32:2 or Gojo.attack=24,28.")
+    if not found:
+        raise ValueError(f"'{spec}' has no values.")
+    return parameter, found
+
+
+def check_parameter(parameter: str) -> None:
+    name, _, stat = parameter.partition('.')
+    CharacterFactory().create_character(name)
+    if stat not in TUNABLE:
+        raise ValueError(f"'{parameter}' is not a tunable stat, expected Name.stat with stat one of "
+                         f"{', '.join(TUNABLE)}.")
+
+
+def grid(space: Space) -> Iterator[Point]:
+    """
+    :return: Every combination of the values, the last parameter changing fastest.
+    """
+    for values in itertools.product(*space.values()):
+        yield dict(zip(space, values))
+
+
+def sample(space: Space, count: int, seed: int = 0) -> List[Point]:
+    """
+    :return: Up to count distinct points with each value drawn uniformly, for spaces too large for a grid.
+    """
+    rng = random.Random(seed)
+    count = min(count, math.prod(len(values) for values in space.values()))
+    points: Dict[Tuple[int, ...], Point] = {}
+    while len(points) < count:
+        point = {parameter: rng.choice(values) for parameter, values in space.items()}
+        points.setdefault(tuple(point.values()), point)
+    return list(points.values())
+
+
+def overrides_of(point: Point) -> Overrides:
+    overrides: Overrides = {}
+    for parameter, value in point.items():
+        name, _, stat = parameter.partition('.')
+        overrides.setdefault(name, {})[stat] = value
+    return overrides
+
+
+def task_key(lineup: Sequence[str], stats: List[Dict[str, int]], policies: List[Policy], seed: int, battles: int,
+             max_turns: int) -> str:
+    # Only the stats of the two characters fighting matter, so a point shares every pair it does not change
+    description = json.dumps({
+        'lineup': list(lineup),
+        'stats': stats,
+        'policies': [repr(policy) for policy in policies],
+        'seed': seed,
+        'battles': battles,
+        'max_turns': max_turns,
+        'rules': rules_version()
+    }, sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def load_checkpoint(path: Optional[Path]) -> Dict[str, Counts]:
+    """
+    :param path: The checkpoint file of earlier runs, one finished task per line.
+    :return: The counts by task key. A line cut short by an interruption is skipped.
+    """
+    done: Dict[str, Counts] = {}
+    if path is None or not Path(path).exists():
+        return done
+    with open(path) as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[entry['key']] = tuple(entry['counts'])
+    return done
+
+
+# endregion
+
+class SweepResult:
+    """
+    Pairwise win rates at every point of a sweep, ranked by how close they come to even.
+    """
+
+    # region Constructor
+    def __init__(self, names: List[str]) -> None:
+        """
+        :param names: The characters entered.
+        """
+        self.names: List[str] = names
+        self.points: List[Tuple[Point, Dict[Tuple[str, str], float]]] = []
+        self.baseline: Dict[Tuple[str, str], float] = {}  # the catalog's own stats
+        self.computed: int = 0  # tasks simulated by this run
+        self.reused: int = 0  # tasks shared with another point or read from the checkpoint
+
+    # endregion
+
+    # region Methods
+    @staticmethod
+    def score(rates: Dict[Tuple[str, str], float]) -> float:
+        """
+        :param rates: How often the first character of each pair beats the second.
+        :return: The mean distance of the rates from 50%, 0 is perfectly even.
+        """
+        return sum(abs(rate - 0.5) for rate in rates.values()) / max(len(rates), 1)
+
+    def best(self, count: int = 10) -> List[Tuple[Point, Dict[Tuple[str, str], float]]]:
+        return sorted(self.points, key=lambda entry: self.score(entry[1]))[:count]
+
+    def to_dict(self) -> dict:
+        def rows(rates: Dict[Tuple[str, str], float]) -> List[dict]:
+            return [{'first': a, 'second': b, 'win_rate': rate} for (a, b), rate in rates.items()]
+        return {
+            'baseline': {'score': self.score(self.baseline), 'pairs': rows(self.baseline)},
+            'points': [{'point': point, 'score': self.score(rates), 'pairs': rows(rates)}
+                       for point, rates in self.best(len(self.points))]
+        }
+
+    def format(self, count: int = 10) -> str:
+        pairs = list(self.baseline)
+        lines = [f"{'score':>8}  " + '  '.join(f"{f'{a}-{b}':>14}" for a, b in pairs) + '  point']
+        for point, rates in [({}, self.baseline)] + self.best(count):
+            settings = ' '.join(f"{parameter}={value}" for parameter, value in point.items()) or '(catalog)'
+            lines.append(f"{self.score(rates):>8.4f}  " + '  '.join(f"{rates[pair]:>14.4f}" for pair in pairs) +
+                         f"  {settings}")
+        lines.append(f"{len(self.points)} points, {self.computed} tasks simulated, {self.reused} reused")
+        return '\n'.join(lines)
+
+    def __str__(self) -> str:
+        return self.format()
+
+    # endregion
+
+
+def run_sweep(space: Space, battles: int = 20_000, points: Optional[Sequence[Point]] = None,
+              policies: Policy = POLICIES['random'], names: Optional[Sequence[str]] = None, seed: int = 0,
+              workers: Optional[int] = None, max_turns: int = MAX_TURNS,
+              checkpoint: Optional[Path] = CHECKPOINT) -> SweepResult:
+    """
+    Plays every pair of characters, in both seat orders, at each point of a parameter space on the simulator,
+    spread over a process pool. Every point plays the same random numbers, so differences between points come
+    from the stats rather than from luck. A pair is keyed by its two characters' stats only, so it is simulated
+    once for all the points that leave it alone, and each finished pair is appended to the checkpoint,
+    which a later run resumes from.
+    :param space: The values to try per parameter.
+    :param battles: The number of battles of each pair in each seat order.
+    :param points: The points to evaluate, default is the whole grid of the space.
+    :param policies: How everybody plays.
+    :param names: Factory names of the characters entered, default is every character of the factory.
+    :param seed: The root seed.
+    :param workers: The number of worker processes, default is the CPU count. 1 runs in this process.
+    :param max_turns: Battles still running after this many turns count as a draw.
+    :param checkpoint: The file finished pairs are appended to and resumed from, None to keep nothing.
+    :return: The pairwise win rates of every point and of the catalog.
+    :raises ValueError: If a parameter, a name or a stat is unknown.
+    """
+    factory = CharacterFactory()
+    names = list(names or factory.get_character_names())
+    characters = {name: factory.create_character(name) for name in names}
+    for parameter in space:
+        check_parameter(parameter)
+    points = list(grid(space) if points is None else points)
+    pairs = list(itertools.combinations(names, 2))
+
+    result = SweepResult(names)
+    done = load_checkpoint(checkpoint)
+    tasks: Dict[str, tuple] = {}
+    # Per point, the task keys of each pair in both seat orders
+    plans: List[Tuple[Point, Dict[Tuple[str, str], Tuple[str, str]]]] = []
+    for point in [{}] + points:
+        overrides = overrides_of(point)
+        stats = {name: tuned_stats(character, overrides.get(name)) for name, character in characters.items()}
+        plan = {}
+        for pair in pairs:
+            keys = []
+            for lineup in (pair, pair[::-1]):
+                key = task_key(lineup, [stats[name] for name in lineup], [policies] * 2, seed, battles, max_turns)
+                if key in done or key in tasks:
+                    result.reused += 1
+                else:
+                    used = {name: overrides[name] for name in lineup if name in overrides}
+                    tasks[key] = (list(lineup), battles, [policies] * 2, chunk_seed(seed, lineup, 0), max_turns,
+                                  used)
+                keys.append(key)
+            plan[pair] = tuple(keys)
+        plans.append((point, plan))
+
+    log = None
+    if checkpoint is not None:
+        Path(checkpoint).parent.mkdir(parents=True, exist_ok=True)
+        log = open(checkpoint, 'a')
+
+    def finish(key: str, counts: Counts) -> None:
+        if log is not None:
+            log.write(json.dumps({'key': key, 'counts': list(counts)}) + '\n')
+            log.flush()
+        done[key] = counts
+        result.computed += 1
+
+    try:
+        workers = min(workers or os.cpu_count() or 1, len(tasks))
+        if workers <= 1:
+            for key, task in tasks.items():
+                finish(key, run_task(*task))
+        else:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = {pool.submit(run_task, *task): key for key, task in tasks.items()}
+                for future in as_completed(futures):
+                    finish(futures[future], future.result())
+    finally:
+        if log is not None:
+            log.close()
+
+    for point, plan in plans:
+        rates = {}
+        for pair, (forward, backward) in plan.items():
+            # The first character's wins from both seats, a draw counts as half a win for each
+            wins = done[forward][0][0] + done[backward][0][1]
+            draws = done[forward][1] + done[backward][1]
+            rates[pair] = (wins + draws / 2) / (2 * battles)
+        if point:
+            result.points.append((point, rates))
+        else:
+            result.baseline = rates
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Search JJK character stats for the most even pairwise win rates.')
+    parser.add_argument('ranges', nargs='+', metavar='NAME.STAT=RANGE',
+                        help=f"Values to try, e.g. Gojo.attack=24:32:2 or Nanami.hp=90,100,110. "
+                             f"Stats: {', '.join(TUNABLE)}")
+    parser.add_argument('--random', type=int, default=None, metavar='N',
+                        help='Evaluate N random points instead of the whole grid')
+    parser.add_argument('--battles', type=int, default=20_000, help='Battles per pair and seat order')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random', help='How everybody plays')
+    parser.add_argument('--characters', nargs='+', default=None, help='Characters to enter, default is everybody')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10, help='How many of the best points to print')
+    parser.add_argument('--checkpoint', type=Path, default=CHECKPOINT)
+    parser.add_argument('--output', type=Path, default=None, help='File for every point as JSON')
+    args = parser.parse_args()
+
+    ranges = dict(parse_range(spec) for spec in args.ranges)
+    chosen = None if args.random is None else sample(ranges, args.random, args.seed)
+    outcome = run_sweep(ranges, args.battles, chosen, POLICIES[args.policy], args.characters, args.seed,
+                        args.workers, checkpoint=args.checkpoint)
+    print(outcome.format(args.top))
+    if args.output is not None:
+        args.output.write_text(json.dumps(outcome.to_dict(), indent=2))
@@ -0,0 +1,245 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from JJK_Game.analysis.monte_carlo import CACHE_DIR as ESTIMATE_CACHE_DIR, rules_version, run_task, wilson_interval, \
+    write_atomic
+from JJK_Game.analysis.simulator import Policy, POLICIES, MAX_TURNS
+from JJK_Game.character_factory import CharacterFactory
+
+CHUNK_SIZE = 20_000  # Battles per cached chunk, an interrupted tournament loses at most one chunk per worker
+SIZES = (2, 3, 4, 5)
+CACHE_DIR = ESTIMATE_CACHE_DIR.parent / 'tournament'
+
+# Wins per seat, draws and the total number of turns of some battles of one lineup
+Counts = Tuple[List[int], int, int]
+
+
+# region Helpers
+def lineups(names: Sequence[str], sizes: Sequence[int] = SIZES) -> Iterator[Tuple[str, ...]]:
+    """
+    Every set of distinct characters of the given sizes, once in each rotation of its seats,
+    so every character moves first, second and so on equally often.
+    :param names: Factory names of the characters to enter.
+    :param sizes: The lineup sizes.
+    :return: Lineups in seat order.
+    """
+    for size in sizes:
+        for entrants in itertools.combinations(names, size):
+            for first in range(size):
+                yield entrants[first:] + entrants[:first]
+
+
+def chunk_key(lineup: Sequence[str], policies: List[Policy], seed: int, start: int, battles: int,
+              max_turns: int) -> str:
+    description = json.dumps({
+        'lineup': list(lineup),
+        'policies': [repr(policy) for policy in policies],
+        'seed': seed,
+        'start': start,
+        'battles': battles,
+        'max_turns': max_turns,
+        'rules': rules_version()
+    }, sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def chunk_seed(seed: int, lineup: Sequence[str], start: int) -> np.random.SeedSequence:
+    # Depends only on the chunk itself, so a chunk plays the same battles whichever others are computed with it
+    roster = CharacterFactory().get_character_names()
+    return np.random.SeedSequence(seed, spawn_key=tuple(roster.index(name) for name in lineup) + (start,))
+
+
+# endregion
+
+class TournamentResult:
+    """
+    The outcomes of every lineup of a tournament.
+    """
+
+    # region Constructor
+    def __init__(self, names: List[str]) -> None:
+        """
+        :param names: The characters entered.
+        """
+        self.names: List[str] = names
+        self.lineups: Dict[Tuple[str, ...], Counts] = {}
+        self.computed: int = 0  # chunks simulated by this run
+        self.cached: int = 0  # chunks read from the cache
+
+    # endregion
+
+    # region Methods
+    def add(self, lineup: Tuple[str, ...], counts: Counts) -> None:
+        wins, draws, turns = self.lineups.get(lineup, ([0] * len(lineup), 0, 0))
+        self.lineups[lineup] = [a + b for a, b in zip(wins, counts[0])], draws + counts[1], turns + counts[2]
+
+    def character_table(self) -> Dict[str, dict]:
+        """
+        :return: Per character, the battles it played and won and its win rate with a 95% confidence interval.
+        """
+        battles = {name: 0 for name in self.names}
+        wins = {name: 0 for name in self.names}
+        for lineup, (seat_wins, draws, _) in self.lineups.items():
+            for name, won in zip(lineup, seat_wins):
+                battles[name] += sum(seat_wins) + draws
+                wins[name] += won
+        table = {}
+        for name in self.names:
+            low, high = wilson_interval(wins[name], battles[name])
+            table[name] = {'battles': battles[name], 'wins': wins[name],
+                           'win_rate': wins[name] / battles[name] if battles[name] else 0.0, 'low': low, 'high': high}
+        return table
+
+    def matchup_table(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: For each pair, how often the first character won the battles both of them played in.
+        """
+        battles = {a: {b: 0 for b in self.names} for a in self.names}
+        wins = {a: {b: 0 for b in self.names} for a in self.names}
+        for lineup, (seat_wins, draws, _) in self.lineups.items():
+            played = sum(seat_wins) + draws
+            for a, won in zip(lineup, seat_wins):
+                for b in lineup:
+                    if b != a:
+                        battles[a][b] += played
+                        wins[a][b] += won
+        return {a: {b: wins[a][b] / battles[a][b] for b in self.names if battles[a][b]} for a in self.names}
+
+    def to_dict(self) -> dict:
+        return {
+            'characters': self.character_table(),
+            'matchups': self.matchup_table(),
+            'lineups': [{'lineup': list(lineup), 'wins': wins, 'draws': draws, 'turns': turns}
+                        for lineup, (wins, draws, turns) in self.lineups.items()]
+        }
+
+    def write(self, directory: Path) -> None:
+        """
+        Writes characters.csv, matchups.csv and tournament.json with every lineup's counts.
+        :param directory: Where to write them, created if needed.
+        :return: None
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / 'characters.csv', 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['character', 'battles', 'wins', 'win_rate', 'low', 'high'])
+            for name, row in self.character_table().items():
+                writer.writerow([name, row['battles'], row['wins'], row['win_rate'], row['low'], row['high']])
+        matchups = self.matchup_table()
+        with open(directory / 'matchups.csv', 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['character'] + self.names)
+            for a in self.names:
+                writer.writerow([a] + [matchups[a].get(b, '') for b in self.names])
+        (directory / 'tournament.json').write_text(json.dumps(self.to_dict(), indent=2))
+
+    def __str__(self) -> str:
+        lines = [f"{'character':<10}{'battles':>10}{'win rate':>10}  95% interval"]
+        for name, row in self.character_table().items():
+            lines.append(f"{name:<10}{row['battles']:>10}{row['win_rate']:>10.4f}  "
+                         f"[{row['low']:.4f}, {row['high']:.4f}]")
+        lines.append('')
+        matchups = self.matchup_table()
+        lines.append(f"{'vs':<10}" + ''.join(f"{name:>10}" for name in self.names))
+        for a in self.names:
+            lines.append(f"{a:<10}" + ''.join(f"{matchups[a][b]:>10.4f}" if b in matchups[a] else f"{'-':>10}"
+                                              for b in self.names))
+        lines.append(f"{len(self.lineups)} lineups, {self.computed} chunks simulated, {self.cached} from the cache")
+        return '\n'.join(lines)
+
+    # endregion
+
+
+def run_tournament(battles: int = 100_000, policies: Union[Policy, Dict[str, Policy]] = POLICIES['random'],
+                   names: Optional[Sequence[str]] = None, sizes: Sequence[int] = SIZES, seed: int = 0,
+                   workers: Optional[int] = None, max_turns: int = MAX_TURNS, chunk_size: int = CHUNK_SIZE,
+                   cache_dir: Optional[Path] = CACHE_DIR) -> TournamentResult:
+    """
+    Plays every lineup of distinct characters many times on the simulator, spread over a process pool.
+    Each finished chunk of battles is cached as soon as it completes, so a re-run only simulates what is missing.
+    :param battles: The number of battles of each lineup, in each seat order.
+    :param policies: One policy for everybody, or one per character name. Characters not named play randomly.
+    :param names: Factory names of the characters entered, default is every character of the factory.
+    :param sizes: The lineup sizes to play.
+    :param seed: The root seed.
+    :param workers: The number of worker processes, default is the CPU count. 1 runs in this process.
+    :param max_turns: Battles still running after this many turns count as a draw.
+    :param chunk_size: The number of battles per cached chunk.
+    :param cache_dir: Where chunks are kept between runs, None to disable the cache.
+    :return: The outcomes.
+    :raises ValueError: If a name is unknown or a size is not between 2 and the number of characters.
+    """
+    factory = CharacterFactory()
+    names = list(names or factory.get_character_names())
+    for name in names:
+        factory.create_character(name)
+    if any(not 2 <= size <= len(names) for size in sizes):
+        raise ValueError(f"Lineup sizes must be between 2 and {len(names)}.")
+    chosen = policies if isinstance(policies, dict) else {name: policies for name in names}
+
+    result = TournamentResult(names)
+    tasks = []
+    for lineup in lineups(names, sizes):
+        seat_policies = [chosen.get(name, POLICIES['random']) for name in lineup]
+        for start in range(0, battles, chunk_size):
+            size = min(chunk_size, battles - start)
+            key = chunk_key(lineup, seat_policies, seed, start, size, max_turns)
+            path = None if cache_dir is None else Path(cache_dir) / f'{key}.json'
+            if path is not None and path.exists():
+                result.add(lineup, tuple(json.loads(path.read_text())))
+                result.cached += 1
+            else:
+                tasks.append((lineup, path, (list(lineup), size, seat_policies, chunk_seed(seed, lineup, start),
+                                             max_turns)))
+
+    def finish(lineup: Tuple[str, ...], path: Optional[Path], counts: Counts) -> None:
+        if path is not None:
+            write_atomic(path, list(counts))
+        result.add(lineup, counts)
+        result.computed += 1
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        for lineup, path, task in tasks:
+            finish(lineup, path, run_task(*task))
+    else:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {pool.submit(run_task, *task): (lineup, path) for lineup, path, task in tasks}
+            for future in as_completed(futures):
+                finish(*futures[future], future.result())
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play every JJK lineup against each other and rank the characters.')
+    parser.add_argument('--battles', type=int, default=100_000, help='Battles per lineup and seat order')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random', help='How everybody plays')
+    parser.add_argument('--character-policy', nargs='*', default=[], metavar='NAME=POLICY',
+                        help='How single characters play, e.g. Gojo=greedy')
+    parser.add_argument('--characters', nargs='+', default=None, help='Characters to enter, default is everybody')
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', type=Path, default=None, help='Directory for the CSV and JSON tables')
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    entered = args.characters or CharacterFactory().get_character_names()
+    per_character = {name: POLICIES[args.policy] for name in entered}
+    for assignment in args.character_policy:
+        name, policy = assignment.split('=')
+        per_character[name] = POLICIES[policy]
+    outcome = run_tournament(args.battles, per_character, entered, args.sizes, args.seed, args.workers,
+                             cache_dir=None if args.no_cache else CACHE_DIR)
+    print(outcome)
+    if args.output is not None:
+        outcome.write(args.output)
@@ -0,0 +1,90 @@
+from typing import List, Optional
+
+# Event kinds
+VOICELINE = 'voiceline'
+SPECIAL = 'special'
+COOLDOWN = 'cooldown'
+DAMAGE = 'damage'
+DEATH = 'death'
+STUN = 'stun'
+STUN_SKIP = 'stun_skip'
+STUN_END = 'stun_end'
+POISON = 'poison'
+POISON_TICK = 'poison_tick'
+POISON_END = 'poison_end'
+
+
+class BattleEvent:
+    """
+    Something that happened in a battle, with the line that used to be printed for it.
+    """
+    __slots__ = ('kind', 'text', 'source', 'target', 'amount')
+
+    def __init__(self, kind: str, text: str, source: Optional[str] = None, target: Optional[str] = None,
+                 amount: Optional[int] = None) -> None:
+        """
+        :param kind: One of the event kinds above.
+        :param text: The human readable line.
+        :param source: The name of the move or effect that caused the event.
+        :param target: The name of the character it happened to.
+        :param amount: The damage, duration or other number involved, if any.
+        """
+        self.kind: str = kind
+        self.text: str = text
+        self.source: Optional[str] = source
+        self.target: Optional[str] = target
+        self.amount: Optional[int] = amount
+
+    def __repr__(self) -> str:
+        return f"BattleEvent({self.kind!r}, {self.text!r})"
+
+
+class EventSink:
+    """
+    Receives the events of the battle engine. Subclasses decide whether they are shown, kept or ignored.
+    """
+    # False if every event is dropped, moves hitting a whole lobby then skip building them
+    listening: bool = True
+
+    def emit(self, event: BattleEvent) -> None:
+        pass
+
+
+class NullSink(EventSink):
+    """
+    Discards every event, for simulations that only care about the outcome.
+    """
+    listening = False
+
+
+class PrintSink(EventSink):
+    """
+    Prints each event's line immediately.
+    """
+
+    def emit(self, event: BattleEvent) -> None:
+        print(event.text)
+
+
+class BufferedSink(EventSink):
+    """
+    Keeps events in memory until they are drained, so a server can forward them in one go.
+    """
+
+    def __init__(self) -> None:
+        self.events: List[BattleEvent] = []
+
+    def emit(self, event: BattleEvent) -> None:
+        self.events.append(event)
+
+    def drain(self) -> List[BattleEvent]:
+        """
+        Removes and returns the buffered events.
+        :return: The events in the order they happened.
+        """
+        events, self.events = self.events, []
+        return events
+
+
+# Where engine objects send their events until they are given a sink
+DEFAULT_SINK: EventSink = PrintSink()
@@ -1,14 +1,97 @@
-from typing import List, Optional, Dict
+import random
+from typing import List, Optional, Dict, Tuple
+from JJK_Game.battle_events import EventSink
+from JJK_Game.battle_state import BattleState
 from JJK_Game.character import Character
+from JJK_Game.matchups import get_table
+
+# One entry per action applied: the actor's seat, the action and the target's seat, if any
+LoggedAction = Tuple[int, str, Optional[int]]
+# Separates a repeated character's name from its copy number, e.g. 'Satoru Gojo #2'
+COPY_MARK = ' #'
+
+
+def seat_names(names: List[str]) -> List[str]:
+    """
+    Tells repeated characters apart the way BattleManager.assign_character() does.
+    :param names: The characters' own names in seat order.
+    :return: The names shown in game, the first of each character keeps its own.
+    """
+    copies: Dict[str, int] = {}
+    shown = []
+    for name in names:
+        copies[name] = copies.get(name, 0) + 1
+        shown.append(name if copies[name] == 1 else f'{name}{COPY_MARK}{copies[name]}')
+    return shown
+
+
+def base_name(name: str) -> str:
+    """
+    :param name: A name shown in game, e.g. 'Satoru Gojo #2'.
+    :return: The character's own name, e.g. 'Satoru Gojo'.
+    """
+    base, mark, copy = name.rpartition(COPY_MARK)
+    return base if mark and copy.isdigit() else name
+
+
+class MatchRecorder:
+    """
+    Receives every step of a BattleManager's match. The base class ignores them, see match_log for a real one.
+    """
+
+    def start(self, seed: int, players: List[str]) -> None:
+        pass
+
+    def tick(self, turn: int, seat: int, hp: int, skipped: bool) -> None:
+        pass
+
+    def action(self, turn: int, seat: int, action: str, target: Optional[int], hp: Optional[int]) -> None:
+        pass
+
+    def advance(self, turn: int) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
 
 
 class BattleManager:
-    def __init__(self, available_players: List[Character]):
+    def __init__(self, available_players: List[Character], sink: Optional[EventSink] = None,
+                 seed: Optional[int] = None, recorder: Optional[MatchRecorder] = None,
+                 repeat_characters: bool = False):
+        """
+        :param available_players: The characters players choose from.
+        :param sink: Where the events of the battle go.
+        :param seed: The seed of the match, default is a random one.
+        :param recorder: Receives every step of the match.
+        :param repeat_characters: Seat a copy of the chosen character and keep it available,
+        so a lobby can be larger than the pool.
+        """
+        if sink is not None:
+            for c in available_players:
+                c.sink = sink
+        # Every random draw of the match comes from this generator, so the seed and the action log replay it exactly
+        self.__seed: int = random.SystemRandom().getrandbits(64) if seed is None else seed
+        self.__rng: random.Random = random.Random(self.__seed)
+        table = get_table()
+        for c in available_players:
+            c.rng = self.__rng
+            c.bind_matchups(table)
+        self.__actions: List[LoggedAction] = []
+        self.__recorder: MatchRecorder = recorder or MatchRecorder()
         self.__available_players: List[Character] = available_players.copy()
+        self.__repeat_characters: bool = repeat_characters
+        self.__copies: Dict[str, int] = {}  # seated characters by their own name
         self.__players: List[Character] = []
         self.__turn: int = 0
         self.__current_turn_index: int = 0
-        self.__previously_alive: set = set()
+        # Kept up to date by the players' life hooks, so no turn has to scan every seat
+        self.__seats: Dict[Character, int] = {}
+        self.__by_name: Dict[str, Character] = {}
+        self.__alive: Dict[Character, None] = {}  # alive players in seat order
+        self.__next_seat: List[int] = []  # an alive seat points to itself, a dead one to a later seat
+        # Players whose next turn starts with something to handle, the only ones handle_status_effects() ticks
+        self.__affected: Dict[Character, None] = {}
 
     def get_available_characters(self) -> List[str]:
         return [c.name for c in self.__available_players]
@@ -16,61 +99,155 @@ class BattleManager:
     def assign_character(self, character_name: str) -> Optional[Character]:
         for c in self.__available_players:
             if c.name == character_name:
-                self.__available_players.remove(c)
+                if self.__repeat_characters:
+                    c = c.clone()
+                else:
+                    self.__available_players.remove(c)
+                # Repeated characters get a copy number, names identify players in targets and the battle state
+                copies = self.__copies[character_name] = self.__copies.get(character_name, 0) + 1
+                if copies > 1:
+                    c.name = f'{character_name}{COPY_MARK}{copies}'
                 self.__players.append(c)
+                if c.is_alive():
+                    seat = len(self.__players) - 1
+                    self.__seats[c] = seat
+                    self.__by_name[c.name] = c
+                    self.__alive[c] = None
+                    self.__next_seat.append(seat)
+                    c.add_life_hook(self.__on_life_change)
+                    c.add_effect_hook(self.__on_effect)
+                    if c.has_effects():
+                        self.__affected[c] = None
+                else:
+                    self.__build_index()
                 return c
         return None
 
+    def __build_index(self):
+        count = len(self.__players)
+        self.__seats = {p: seat for seat, p in enumerate(self.__players)}
+        self.__by_name = {p.name: p for p in self.__players}
+        self.__alive = {p: None for p in self.__players if p.is_alive()}
+        self.__next_seat = [seat if p.is_alive() else (seat + 1) % count for seat, p in enumerate(self.__players)]
+        self.__affected = {p: None for p in self.__players if p.has_effects()}
+        for p in self.__players:
+            p.add_life_hook(self.__on_life_change)
+            p.add_effect_hook(self.__on_effect)
+
+    def __on_life_change(self, player: Character):
+        seat = self.__seats.get(player)
+        if seat is None:
+            return
+        if player.is_alive():
+            # Revivals are rare, rebuilding keeps the alive players in seat order
+            self.__build_index()
+        else:
+            del self.__alive[player]
+            self.__next_seat[seat] = (seat + 1) % len(self.__players)
+
+    def __on_effect(self, player: Character):
+        if player in self.__seats:
+            self.__affected[player] = None
+
+    def __find_alive_seat(self, seat: int) -> int:
+        # Follows dead seats to the next alive one, halving the path so later lookups skip straight over them
+        next_seat = self.__next_seat
+        while next_seat[seat] != seat:
+            next_seat[seat] = next_seat[next_seat[seat]]
+            seat = next_seat[seat]
+        return seat
+
+    def get_turn(self) -> int:
+        return self.__turn
+
+    def get_seat(self, player: Character) -> int:
+        return self.__seats[player]
+
     def is_battle_ready(self) -> bool:
         return len(self.__players) >= 2
 
+    def get_seed(self) -> int:
+        return self.__seed
+
+    def get_action_log(self) -> List[LoggedAction]:
+        return self.__actions
+
+    def snapshot(self) -> BattleState:
+        """
+        Copies the state of the battle so a search can try moves and come back, without deep copying any object.
+        The random generator and the recorder are not part of it.
+        :return: The snapshot.
+        """
+        return BattleState([p.snapshot() for p in self.__players], self.__turn, self.__current_turn_index,
+                           len(self.__actions))
+
+    def restore(self, state: BattleState):
+        """
+        Returns the battle to a snapshot taken by this manager.
+        :param state: The snapshot.
+        """
+        for p, saved in zip(self.__players, state.characters):
+            p.restore(saved)
+        self.__turn = state.turn
+        self.__current_turn_index = state.current
+        del self.__actions[state.actions:]
+        self.__build_index()
+
     def start_battle(self):
         self.__turn = 0
         self.__current_turn_index = 0
-        self.__previously_alive = set(p for p in self.__players if p.is_alive())
+        self.__rng.seed(self.__seed)
+        self.__actions = []
+        self.__build_index()
+        self.__recorder.start(self.__seed, [p.name for p in self.__players])
 
     def is_battle_over(self) -> bool:
-        return sum(p.is_alive() for p in self.__players) <= 1
+        return len(self.__alive) <= 1
 
     def get_current_player(self) -> Optional[Character]:
-        if not self.__players:
+        if not self.__alive:
             return None
-        for _ in range(len(self.__players)):
-            player = self.__players[self.__current_turn_index]
-            if player.is_alive():
-                return player
-            self.__current_turn_index = (self.__current_turn_index + 1) % len(self.__players)
-        return None
+        self.__current_turn_index = self.__find_alive_seat(self.__current_turn_index)
+        return self.__players[self.__current_turn_index]
 
     def advance_turn(self):
         self.__turn += 1
         self.__current_turn_index = (self.__current_turn_index + 1) % len(self.__players)
-        self.__previously_alive = set(p for p in self.__players if p.is_alive())
+        self.__recorder.advance(self.__turn)
 
     def handle_status_effects(self, player: Character) -> bool:
-        player.handle_defense_boost()
-        player.handle_poison()
-        return player.handle_stun()
+        skipped = False
+        # Players without a boost, poison or stun have nothing to tick
+        if player in self.__affected:
+            player.handle_defense_boost()
+            player.handle_poison()
+            skipped = player.handle_stun()
+            if not player.has_effects():
+                del self.__affected[player]
+        self.__recorder.tick(self.__turn, self.__seats[player], player.hp, skipped)
+        return skipped
 
     def apply_action(self, actor: Character, action: str, target: Optional[Character] = None) -> str:
+        seat, target_seat = self.__seats[actor], None if target is None else self.__seats[target]
+        self.__actions.append((seat, action, target_seat))
+        result = ''
         if action == 'attack' and target:
-            return actor.attack(target)
+            result = actor.attack(target)
         elif action == 'defend':
-            return actor.defend()
+            result = actor.defend()
         elif action == 'special':
-            others = [p for p in self.__players if p != actor and p.is_alive()]
+            others = [p for p in self.__alive if p is not actor]
             actor.special(others, self.__turn)
-            return actor.special_move.voiceline
-        return ''
+            result = actor.special_move.voiceline
+        self.__recorder.action(self.__turn, seat, action, target_seat, None if target is None else target.hp)
+        return result
 
     def get_alive_targets(self, exclude: Optional[Character] = None) -> List[str]:
-        return [p.name for p in self.__players if p.is_alive() and p != exclude]
+        return [p.name for p in self.__alive if p is not exclude]
 
     def get_target_by_name(self, name: str) -> Optional[Character]:
-        for p in self.__players:
-            if p.name == name and p.is_alive():
-                return p
-        return None
+        p = self.__by_name.get(name)
+        return p if p is not None and p.is_alive() else None
 
     def get_battle_state(self) -> Dict:
         return {
@@ -92,7 +269,4 @@ class BattleManager:
         }
 
     def get_winner(self) -> Optional[str]:
-        for p in self.__players:
-            if p.is_alive():
-                return p.name
-        return None
+        return next((p.name for p in self.__alive), None)
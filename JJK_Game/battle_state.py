@@ -0,0 +1,71 @@
+from typing import List
+
+
+class CharacterState:
+    """
+    The numbers of one character that change during a battle.
+    A Character and its defense, special move and status effects all read and write the same instance,
+    so copying these five fields copies everything a battle can change about the character.
+    """
+    __slots__ = ('hp', 'defense', 'last_used', 'stun', 'poison')
+
+    def __init__(self, hp: int = 0, defense: int = 0, last_used: int = 0, stun: int = 0, poison: int = 0) -> None:
+        """
+        :param hp: The hit points.
+        :param defense: The current defense, including an active boost.
+        :param last_used: The turn the special move was last used on.
+        :param stun: The remaining turns of stun.
+        :param poison: The remaining turns of poison.
+        """
+        self.hp: int = hp
+        self.defense: int = defense
+        self.last_used: int = last_used
+        self.stun: int = stun
+        self.poison: int = poison
+
+    def __repr__(self) -> str:
+        return (f"CharacterState(hp={self.hp}, defense={self.defense}, last_used={self.last_used}, "
+                f"stun={self.stun}, poison={self.poison})")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CharacterState):
+            return NotImplemented
+        return (self.hp, self.defense, self.last_used, self.stun, self.poison) == \
+            (other.hp, other.defense, other.last_used, other.stun, other.poison)
+
+    def clone(self) -> 'CharacterState':
+        return CharacterState(self.hp, self.defense, self.last_used, self.stun, self.poison)
+
+    def restore(self, other: 'CharacterState') -> None:
+        """
+        Copies another state into this one in place, so every view bound to this instance sees it.
+        :param other: The state to copy.
+        :return: None
+        """
+        self.hp = other.hp
+        self.defense = other.defense
+        self.last_used = other.last_used
+        self.stun = other.stun
+        self.poison = other.poison
+
+
+class BattleState:
+    """
+    A snapshot of a whole battle, taken and restored by BattleManager in O(players).
+    """
+    __slots__ = ('characters', 'turn', 'current', 'actions')
+
+    def __init__(self, characters: List[CharacterState], turn: int, current: int, actions: int) -> None:
+        """
+        :param characters: The state of every player in seat order.
+        :param turn: The turn counter.
+        :param current: The seat whose turn it is.
+        :param actions: The length of the action log.
+        """
+        self.characters: List[CharacterState] = characters
+        self.turn: int = turn
+        self.current: int = current
+        self.actions: int = actions
+
+    def clone(self) -> 'BattleState':
+        return BattleState([c.clone() for c in self.characters], self.turn, self.current, self.actions)
@@ -0,0 +1,162 @@
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+from JJK_Game.framing import encode_json, read_json
+
+ATTACK = 'attack'
+MIXED = 'mixed'
+JOIN_SETTLE = 0.05  # Seconds the host waits after the joins before pressing start
+MIXED_WEIGHTS = {'attack': 0.6, 'defend': 0.25, 'special': 0.15}
+
+
+class RoomProbe:
+    """
+    Latency samples shared by the bots of one room.
+    All bots of a room run on the same event loop, so their timestamps come from the same clock.
+    """
+
+    # region Constructor
+    def __init__(self) -> None:
+        # Index of the next turn broadcast -> when the answer was sent and which bot sent it
+        self.answers: Dict[int, Tuple[float, 'BotClient']] = {}
+        self.turn_latencies: List[float] = []
+        self.fanout_latencies: List[float] = []
+        self.turns: int = 0
+        self.errors: List[str] = []
+        self.winner: Optional[str] = None
+
+    # endregion
+
+
+class BotClient:
+    """
+    Headless player that speaks the real game protocol, joining a room and answering every prompt.
+    """
+
+    # region Constructor
+    def __init__(self, name: str, room: str, probe: RoomProbe, policy: str = ATTACK, seed: int = 0) -> None:
+        """
+        Creates a bot. Nothing connects until connect() is called.
+        :param name: The player name sent with the join.
+        :param room: The room to join.
+        :param probe: Where the bot records its samples.
+        :param policy: ATTACK always attacks, MIXED also defends and uses specials.
+        :param seed: Seed for the bot's choices, so a scenario replays the same decisions.
+        """
+        self.name: str = name
+        self.room: str = room
+        self.probe: RoomProbe = probe
+        self.policy: str = policy
+        self.rng: random.Random = random.Random(seed)
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.__broadcasts: int = 0  # new_turn and battle_over messages seen so far
+
+    # endregion
+
+    # region Methods
+    async def connect(self, host: str, port: int) -> None:
+        """
+        Opens the connection and joins the room.
+        :param host: The game server host.
+        :param port: The game server port.
+        :return: None
+        """
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        await self.send({'type': 'join', 'player_name': self.name, 'room': self.room})
+
+    async def send(self, message: dict) -> None:
+        self.writer.write(encode_json(message))
+        await self.writer.drain()
+
+    async def answer(self, message: dict) -> None:
+        """
+        Sends the answer that ends this bot's turn and marks the broadcast that will confirm it.
+        :param message: The action or target message.
+        :return: None
+        """
+        self.probe.answers[self.__broadcasts] = (time.monotonic(), self)
+        await self.send(message)
+
+    def choose_action(self) -> str:
+        if self.policy == MIXED:
+            return self.rng.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()))[0]
+        return 'attack'
+
+    async def play(self) -> None:
+        """
+        Answers prompts until the battle ends or the server closes the connection.
+        :return: None
+        """
+        while (message := await read_json(self.reader)) is not None:
+            kind = message['type']
+            if kind == 'character_selection':
+                choice = self.rng.choice(message['descriptions'])['name']
+                await self.send({'type': 'character_choice', 'character': choice})
+            elif kind == 'action_selection':
+                action = self.choose_action()
+                if action == 'defend':
+                    await self.answer({'type': 'action', 'action': action})
+                else:
+                    await self.send({'type': 'action', 'action': action})
+            elif kind == 'target_selection':
+                await self.answer({'type': 'target', 'target': self.rng.choice(message['targets'])})
+            elif kind in ('new_turn', 'battle_over'):
+                self.record_broadcast()
+                if kind == 'battle_over':
+                    self.probe.winner = message['winner']
+                    return
+            elif kind == 'error':
+                self.probe.errors.append(message['msg'])
+                return
+
+    def record_broadcast(self) -> None:
+        """
+        Records how long after a turn was answered this bot heard about the next one.
+        :return: None
+        """
+        answer = self.probe.answers.get(self.__broadcasts)
+        self.__broadcasts += 1
+        if answer is None:
+            return
+        sent, bot = answer
+        latency = time.monotonic() - sent
+        self.probe.fanout_latencies.append(latency)
+        if bot is self:
+            self.probe.turn_latencies.append(latency)
+            self.probe.turns += 1
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+    # endregion
+
+
+async def run_room(host: str, port: int, room: str, players: int, policy: str = ATTACK, seed: int = 0,
+                   settle: float = JOIN_SETTLE) -> RoomProbe:
+    """
+    Plays one match with a full room of bots.
+    :param host: The game server host.
+    :param port: The game server port.
+    :param room: The room id.
+    :param players: The number of bots in the room.
+    :param policy: The policy every bot plays.
+    :param seed: Seed of the room, each seat derives its own from it.
+    :param settle: Seconds the host waits after the joins before starting the match.
+    :return: The samples of the match.
+    """
+    probe = RoomProbe()
+    bots = [BotClient(f'{room}-bot{seat}', room, probe, policy, seed * 1000 + seat) for seat in range(players)]
+    try:
+        for bot in bots:
+            await bot.connect(host, port)
+        await asyncio.sleep(settle)
+        await bots[0].send({'type': 'start'})
+        await asyncio.gather(*(bot.play() for bot in bots))
+    except (ConnectionError, OSError) as e:
+        probe.errors.append(str(e))
+    finally:
+        for bot in bots:
+            bot.close()
+    return probe
@@ -0,0 +1,91 @@
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+from JJK_Game.action import SpecialMove
+from JJK_Game.battle_events import DAMAGE, DEATH, NullSink
+from JJK_Game.character import Character
+from JJK_Game.character_factory import CharacterFactory
+
+LOBBY_SIZES = (100, 500)
+NAMES = ['Gojo', 'Megumi', 'Nanami', 'Nobara', 'Sukuna']
+
+
+def strike_per_target(special: SpecialMove, targets: List[Character], power: int, pierces: bool = False) -> List[int]:
+    """
+    The per-target loop SpecialMove.strike() replaced: every hit goes through the hp property and its life hooks.
+    """
+    known: Dict[tuple, int] = {}
+    damages = []
+    for target in targets:
+        key = (target.kind, target.defense)
+        damage = known.get(key)
+        if damage is None:
+            damage = known[key] = special.hit(target, power, pierces)
+        target.hp -= damage
+        damages.append(damage)
+    if special.sink.listening:
+        for target, damage in zip(targets, damages):
+            if not target.is_alive():
+                special.emit(DEATH, f"{target.name} was eliminated by {special.name}.", target.name, damage)
+            else:
+                special.emit(DAMAGE, f"{target.name} was damaged for {damage} damage.", target.name, damage)
+    return damages
+
+
+def lobby(size: int) -> List[Character]:
+    """
+    :return: A lobby of repeated characters, each with a life hook like the ones a BattleManager registers.
+    """
+    factory = CharacterFactory()
+    characters = [factory.create_character(NAMES[i % len(NAMES)]) for i in range(size)]
+    for character in characters:
+        character.sink = NullSink()
+        character.add_life_hook(lambda _: None)
+    return characters
+
+
+def time_strikes(strike: Callable[[List[Character]], List[int]], targets: List[Character], rounds: int) -> float:
+    """
+    :return: The mean seconds per strike over the rounds. Everybody is healed before each strike, so a third of
+             the lobby falls every round and the life hooks run.
+    """
+    total = 0.0
+    for _ in range(rounds):
+        for j, target in enumerate(targets):
+            target.hp = 10 if j % 3 == 0 else 1000
+        start = time.perf_counter()
+        strike(targets)
+        total += time.perf_counter() - start
+    return total / rounds
+
+
+def run(sizes=LOBBY_SIZES, rounds: int = 200) -> List[dict]:
+    """
+    Times Sukuna's special against lobbies of each size, batched and with the old per-target loop.
+    :return: One row per lobby size with both timings in microseconds and the speedup.
+    """
+    sukuna = CharacterFactory().create_character('Sukuna')
+    special = sukuna.special_move
+    special.sink = NullSink()
+    rows = []
+    for size in sizes:
+        targets = lobby(size)
+        batched = time_strikes(lambda t: special.strike(t, special.power, special.pierces), targets, rounds)
+        looped = time_strikes(lambda t: strike_per_target(special, t, special.power, special.pierces), targets,
+                              rounds)
+        rows.append({
+            'lobby': size,
+            'per_target_us': round(looped * 1e6, 1),
+            'batched_us': round(batched * 1e6, 1),
+            'speedup': round(looped / batched, 2)
+        })
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time lobby-wide specials, batched against the per-target loop.')
+    parser.add_argument('--lobby', type=int, nargs='+', default=list(LOBBY_SIZES), help='Lobby sizes to time')
+    parser.add_argument('--rounds', type=int, default=200, help='Strikes timed per lobby size')
+    args = parser.parse_args()
+    print(json.dumps(run(args.lobby, args.rounds), indent=2))
@@ -0,0 +1,304 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from GoPirate_GUI.network_manager import NetworkManager
+from JJK_Game.bench.bot_client import ATTACK, MIXED, run_room
+from JJK_Game.framing import HEADER, encode_frame
+from JJK_Game.game_server import GameServer
+from JJK_Game.shard_server import ShardedGameServer
+
+BENCH_HOST = '127.0.0.1'
+REGRESSION_TOLERANCE = 0.2  # Allowed relative slowdown of a latency percentile before a run counts as a regression
+PERCENTILES = (50, 95, 99)
+LISTENER_NAME = 'bench'
+
+
+class Scenario:
+    """
+    A repeatable load pattern: how many rooms, how full they are and how the bots play.
+    """
+
+    # region Constructor
+    def __init__(self, name: str, rooms: int, players: int, processes: int = 1, policy: str = ATTACK,
+                 server_workers: int = 0, seed: int = 0) -> None:
+        """
+        :param name: The name used on the command line and in reports.
+        :param rooms: The number of matches played at once.
+        :param players: The number of bots in each room.
+        :param processes: The number of processes the bots are spread over.
+        :param policy: The bot policy, ATTACK or MIXED.
+        :param server_workers: 0 runs a single GameServer, more runs a ShardedGameServer with that many workers.
+        :param seed: Base seed for the bots' choices.
+        """
+        self.name: str = name
+        self.rooms: int = rooms
+        self.players: int = players
+        self.processes: int = processes
+        self.policy: str = policy
+        self.server_workers: int = server_workers
+        self.seed: int = seed
+
+    # endregion
+
+
+SCENARIOS: Dict[str, Scenario] = {scenario.name: scenario for scenario in [
+    Scenario('smoke', rooms=2, players=2),
+    Scenario('rooms', rooms=50, players=3, processes=4),
+    Scenario('full-rooms', rooms=20, players=5, processes=4),
+    Scenario('mixed', rooms=20, players=4, processes=4, policy=MIXED),
+    Scenario('sharded', rooms=50, players=3, processes=4, server_workers=4),
+]}
+
+
+# region Helpers
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    """
+    Nearest-rank percentile.
+    :param samples: The measured values.
+    :param p: The percentile between 0 and 100.
+    :return: The value at that percentile, or None without samples.
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Reduces latency samples to milliseconds at the reported percentiles.
+    :param samples: Latencies in seconds.
+    :return: The percentiles keyed as p50, p95 and p99, plus the maximum.
+    """
+    summary = {}
+    for p in PERCENTILES:
+        value = percentile(samples, p)
+        summary[f'p{p}'] = None if value is None else round(value * 1000, 3)
+    summary['max'] = round(max(samples) * 1000, 3) if samples else None
+    return summary
+
+
+def usage(who: int) -> Dict[str, float]:
+    """
+    Reads the CPU time and peak RSS of this process or of its finished children.
+    :param who: resource.RUSAGE_SELF or resource.RUSAGE_CHILDREN.
+    :return: CPU seconds and peak RSS in MiB.
+    """
+    rusage = resource.getrusage(who)
+    # Linux reports ru_maxrss in KiB, macOS in bytes
+    rss = rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return {'cpu': rusage.ru_utime + rusage.ru_stime, 'rss': rss}
+
+
+# endregion
+
+# region Server Process
+def run_server(conn, server_workers: int, chat_port: int) -> None:
+    """
+    Hosts the server under test in its own process so its CPU time and RSS can be measured apart from the bots.
+    Sends the listening port, waits for a stop request and answers with the resource usage.
+    """
+    asyncio.run(serve_until_stopped(conn, server_workers, chat_port))
+    own, children = usage(resource.RUSAGE_SELF), usage(resource.RUSAGE_CHILDREN)
+    conn.send({
+        'cpu_seconds': own['cpu'] + children['cpu'],
+        'max_rss_mib': max(own['rss'], children['rss'])
+    })
+    conn.close()
+
+
+async def serve_until_stopped(conn, server_workers: int, chat_port: int) -> None:
+    if server_workers:
+        server = ShardedGameServer(workers=server_workers, host=BENCH_HOST, port=0,
+                                   chat_host=BENCH_HOST, chat_port=chat_port)
+    else:
+        server = GameServer(host=BENCH_HOST, port=0, chat_host=BENCH_HOST, chat_port=chat_port)
+    serve_task = asyncio.create_task(server.serve())
+    while server.server is None:
+        await asyncio.sleep(0.01)
+    listener = server.server if server_workers else server.server.sockets[0]
+    conn.send(listener.getsockname()[1])
+
+    await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+    serve_task.cancel()
+    await asyncio.gather(serve_task, return_exceptions=True)
+
+
+# endregion
+
+# region Chat Server Process
+def run_chat_server(conn) -> None:
+    """
+    Hosts the game's chat server, the headless NetworkManager behind the chat GUI, in its own process.
+    Sends the listening port, then relays chat until the process is terminated.
+    """
+    chat = NetworkManager(host=BENCH_HOST, port=0)
+    conn.send(chat.server_socket.getsockname()[1])
+    conn.close()
+    chat.run()
+
+
+# endregion
+
+# region Bot Processes
+def run_bots(port: int, rooms: List[int], players: int, policy: str, seed: int) -> dict:
+    """
+    Plays the given rooms concurrently in this process.
+    :return: The merged samples of every room.
+    """
+    return asyncio.run(play_rooms(port, rooms, players, policy, seed))
+
+
+async def play_rooms(port: int, rooms: List[int], players: int, policy: str, seed: int) -> dict:
+    probes = await asyncio.gather(*(run_room(BENCH_HOST, port, f'bench{room}', players, policy, seed + room)
+                                    for room in rooms))
+    return {
+        'turn_latencies': [x for probe in probes for x in probe.turn_latencies],
+        'fanout_latencies': [x for probe in probes for x in probe.fanout_latencies],
+        'turns': sum(probe.turns for probe in probes),
+        'matches': sum(probe.winner is not None for probe in probes),
+        'errors': [error for probe in probes for error in probe.errors]
+    }
+
+
+# endregion
+
+class ChatListener:
+    """
+    A chat client that joins the chat server and counts the narration lines it passes on from the game server.
+    """
+
+    def __init__(self) -> None:
+        self.lines: int = 0
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def read(reader: asyncio.StreamReader) -> bytes:
+        (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+        return await reader.readexactly(length)
+
+    async def listen(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            try:
+                line = await self.read(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            if line.startswith(b'[SERVER]'):
+                self.lines += 1
+
+    async def start(self, port: int) -> None:
+        reader, self.writer = await asyncio.open_connection(BENCH_HOST, port)
+        self.writer.write(encode_frame(f'JOIN:{LISTENER_NAME}'))
+        await self.writer.drain()
+        # The chat server announces the join once it has registered us, so no relayed line is missed after this
+        await self.read(reader)
+        self.task = asyncio.create_task(self.listen(reader))
+
+    async def close(self) -> None:
+        self.writer.close()
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+async def run_scenario(scenario: Scenario) -> dict:
+    """
+    Starts a local server, plays the scenario against it and measures the run.
+    :param scenario: The load to generate.
+    :return: The report, see the keys below.
+    """
+    loop = asyncio.get_running_loop()
+    context = multiprocessing.get_context('spawn')
+
+    chat_conn, chat_child = context.Pipe()
+    chat_server = context.Process(target=run_chat_server, args=(chat_child,), daemon=True)
+    chat_server.start()
+    chat_port = await loop.run_in_executor(None, chat_conn.recv)
+    chat = ChatListener()
+    await chat.start(chat_port)
+
+    conn, child = context.Pipe()
+    server = context.Process(target=run_server, args=(child, scenario.server_workers, chat_port))
+    server.start()
+    port = await loop.run_in_executor(None, conn.recv)
+
+    shares = [list(range(scenario.rooms))[i::scenario.processes] for i in range(scenario.processes)]
+    start = time.monotonic()
+    with ProcessPoolExecutor(scenario.processes, mp_context=context) as pool:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, run_bots, port, share, scenario.players, scenario.policy, scenario.seed)
+            for share in shares if share))
+    elapsed = time.monotonic() - start
+
+    conn.send('stop')
+    server_usage = await loop.run_in_executor(None, conn.recv)
+    await loop.run_in_executor(None, server.join)
+    await chat.close()
+    chat_server.terminate()
+    await loop.run_in_executor(None, chat_server.join)
+
+    turns = sum(result['turns'] for result in results)
+    matches = sum(result['matches'] for result in results)
+    return {
+        'scenario': scenario.name,
+        'rooms': scenario.rooms,
+        'players': scenario.players,
+        'policy': scenario.policy,
+        'server_workers': scenario.server_workers,
+        'elapsed_seconds': round(elapsed, 3),
+        'matches': matches,
+        'matches_per_second': round(matches / elapsed, 3),
+        'turns': turns,
+        'turns_per_second': round(turns / elapsed, 3),
+        'turn_latency_ms': summarize([x for result in results for x in result['turn_latencies']]),
+        'fanout_latency_ms': summarize([x for result in results for x in result['fanout_latencies']]),
+        'chat_lines': chat.lines,
+        'server_cpu_seconds': round(server_usage['cpu_seconds'], 3),
+        'server_cpu_percent': round(100 * server_usage['cpu_seconds'] / elapsed, 1),
+        'server_max_rss_mib': round(server_usage['max_rss_mib'], 1),
+        'errors': [error for result in results for error in result['errors']]
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """
+    Lists the latency percentiles that got slower than the baseline by more than the tolerance.
+    :param report: The new report.
+    :param baseline: A report of the same scenario from an earlier run.
+    :param tolerance: The allowed relative slowdown.
+    :return: A line describing each regression, empty if there is none.
+    """
+    regressions = []
+    for metric in ('turn_latency_ms', 'fanout_latency_ms'):
+        for key, old in baseline[metric].items():
+            new = report[metric].get(key)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append(f"{metric} {key}: {old} -> {new}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play a swarm of bot clients against a local JJK game server.')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='smoke')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='Report of an earlier run to check for latency regressions')
+    args = parser.parse_args()
+
+    result = asyncio.run(run_scenario(SCENARIOS[args.scenario]))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = compare(result, json.load(f))
+        for line in found:
+            print(f"Regression: {line}")
+        sys.exit(1 if found else 0)
@@ -0,0 +1,132 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Deque, Dict, Optional, Sequence
+from JJK_Game.ai import SearchAI, Move
+from JJK_Game.battle_state import BattleState
+
+BOT_WORKERS = 2
+MIN_BUDGET_MS = 10  # Even a move that waited its whole budget in the queue gets this long to think
+
+# One search per worker thread, each keeps its own models and transposition tables
+_local = threading.local()
+
+
+def think(players: Sequence[str], state: BattleState, seat: int, budget_ms: float) -> Move:
+    """
+    Runs in a pool worker and picks one move.
+    :return: The action and the seat it targets.
+    """
+    ai = getattr(_local, 'ai', None)
+    if ai is None:
+        ai = _local.ai = SearchAI()
+    ai.budget = budget_ms / 1000
+    return ai.choose(players, state, seat)
+
+
+class BotJob:
+    """
+    A move waiting for a worker.
+    """
+    __slots__ = ('players', 'state', 'seat', 'deadline', 'future')
+
+    def __init__(self, players: Sequence[str], state: BattleState, seat: int, deadline: float,
+                 future: asyncio.Future) -> None:
+        self.players = players
+        self.state = state
+        self.seat = seat
+        self.deadline = deadline
+        self.future = future
+
+
+class BotPool:
+    """
+    Thinks for every CPU seat of a server on a fixed number of workers.
+    Each room queues its own moves and the rooms take turns for free workers, so a room full of bots
+    cannot hold up the others. The search runs outside the event loop, which keeps serving every match meanwhile.
+    """
+
+    # region Constructor
+    def __init__(self, workers: int = BOT_WORKERS, processes: bool = True) -> None:
+        """
+        :param workers: The number of moves computed at the same time.
+        :param processes: Compute in worker processes, or in threads where processes cannot be started.
+        """
+        self.workers: int = workers
+        self.processes: bool = processes
+        self.busy: int = 0
+        self.queues: 'OrderedDict[str, Deque[BotJob]]' = OrderedDict()  # in the order the rooms get a worker
+        self.__executor: Optional[Executor] = None
+
+    # endregion
+
+    # region Methods
+    async def choose(self, room_id: str, players: Sequence[str], state: BattleState, seat: int,
+                     budget_ms: float) -> Move:
+        """
+        Queues a move for a room and waits for it.
+        :param room_id: The room asking, for fair scheduling.
+        :param players: The in game names of the characters in seat order.
+        :param state: A snapshot of the battle.
+        :param seat: The seat to move for.
+        :param budget_ms: How long the move may take from now, waiting for a worker included.
+        :return: The action and the seat it targets.
+        """
+        future = asyncio.get_running_loop().create_future()
+        job = BotJob(list(players), state, seat, time.monotonic() + budget_ms / 1000, future)
+        self.queues.setdefault(room_id, deque()).append(job)
+        self.dispatch()
+        return await future
+
+    def dispatch(self) -> None:
+        while self.busy < self.workers and self.queues:
+            room_id, queue = next(iter(self.queues.items()))
+            job = queue.popleft()
+            # The room goes to the back of the line, and leaves it once it has nothing waiting
+            del self.queues[room_id]
+            if queue:
+                self.queues[room_id] = queue
+            if job.future.cancelled():
+                continue
+            self.run(job)
+
+    def run(self, job: BotJob) -> None:
+        budget_ms = max(MIN_BUDGET_MS, (job.deadline - time.monotonic()) * 1000)
+        self.busy += 1
+        loop = asyncio.get_running_loop()
+        work = loop.run_in_executor(self.executor(), think, job.players, job.state, job.seat, budget_ms)
+        work.add_done_callback(lambda done: self.finish(job, done))
+
+    def finish(self, job: BotJob, done: asyncio.Future) -> None:
+        self.busy -= 1
+        if not job.future.done():
+            if done.cancelled():
+                job.future.cancel()
+            elif done.exception() is not None:
+                job.future.set_exception(done.exception())
+            else:
+                job.future.set_result(done.result())
+        self.dispatch()
+
+    def executor(self) -> Executor:
+        # Started on the first move, servers without CPU seats never pay for the workers
+        if self.__executor is None:
+            if self.processes:
+                self.__executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self.__executor = ThreadPoolExecutor(self.workers, thread_name_prefix='bot')
+        return self.__executor
+
+    def close(self) -> None:
+        for queue in self.queues.values():
+            for job in queue:
+                job.future.cancel()
+        self.queues.clear()
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+    # endregion
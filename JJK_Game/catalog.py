@@ -0,0 +1,29 @@
+import functools
+import json
+from pathlib import Path
+from typing import Dict
+
+# Stats, names and voicelines of every character, shared with the chatbot
+CATALOG_PATH = Path(__file__).parent / 'characters' / 'catalog.json'
+
+
+@functools.cache
+def load_catalog() -> Dict[str, dict]:
+    """
+    Reads the character catalog, once per process.
+    :return: The catalog entry of each character, keyed by factory name in the factory's order.
+    """
+    with open(CATALOG_PATH, encoding='utf-8') as file:
+        return json.load(file)['characters']
+
+
+def character_stats(name: str) -> dict:
+    """
+    :param name: The factory name of a character, e.g. 'Gojo'.
+    :return: Its catalog entry.
+    :raises ValueError: If the catalog has no such character.
+    """
+    catalog = load_catalog()
+    if name not in catalog:
+        raise ValueError(f"Character '{name}' does not exist in the catalog.")
+    return catalog[name]
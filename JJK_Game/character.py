@@ -1,13 +1,21 @@
+import random
+from typing import TYPE_CHECKING, Callable
 from JJK_Game.action import Attack, Defend, SpecialMove
-from JJK_Game.status_effects import Stun, Poison
-from JJK_Game.user_interface import slow_print
-import time
+from JJK_Game.battle_events import BattleEvent, EventSink, DEFAULT_SINK, VOICELINE, SPECIAL, COOLDOWN
+from JJK_Game.battle_state import CharacterState
+from JJK_Game.status_effects import StatusEffect, Stun, Poison
+
+if TYPE_CHECKING:
+    from JJK_Game.matchups import MatchupTable
 
 
 class Character:
     """
     Base character class with information, stats and a special move.
+    Everything a battle changes is kept in one CharacterState shared with the moves and effects, see snapshot().
     """
+    __slots__ = ('_name', '_attack_move', '_defense_move', '_special_move', '_stun', '_poison', '_sink',
+                 '_life_hooks', '_effect_hooks', '_state', '_kind')
 
     # region Constructor and Overrides
     def __init__(self, name: str, hp: int, attack_move: Attack, defense_move: Defend,
@@ -23,7 +31,6 @@ class Character:
         """
         # Attributes
         self._name: str = name
-        self._hp: int = hp
         # Actions
         self._attack_move: Attack = attack_move
         self._defense_move: Defend = defense_move
@@ -31,9 +38,19 @@ class Character:
         # Effects
         self._stun: Stun = Stun(0)
         self._poison: Poison = Poison(10, 0)
+        self._sink: EventSink = DEFAULT_SINK
+        self._life_hooks: list[Callable[['Character'], None]] = []
+        self._effect_hooks: list[Callable[['Character'], None]] = []
+        # State, shared with the parts that change during a battle
+        self._state: CharacterState = CharacterState(hp, defense_move.current_defense, special_move.last_used)
+        for part in (self._defense_move, self._special_move, self._stun, self._poison):
+            part.state = self._state
+        self._stun.listener = self._poison.listener = self.__effect_started
+        # Row in the matchup table, -1 until bind_matchups()
+        self._kind: int = -1
 
     def __str__(self) -> str:
-        return f"{self._name} (HP: {self._hp})"
+        return f"{self._name} (HP: {self._state.hp})"
 
     # endregion
 
@@ -42,13 +59,23 @@ class Character:
     def name(self):
         return self._name
 
+    @name.setter
+    def name(self, name: str) -> None:
+        """
+        Renames this character, BattleManager tells repeated characters of a lobby apart this way.
+        """
+        self._name = name
+
     @property
     def hp(self):
-        return self._hp
+        return self._state.hp
 
     @hp.setter
     def hp(self, value):
-        self._hp = value
+        was_alive = self._state.hp > 0
+        self._state.hp = value
+        if (value > 0) != was_alive:
+            self.report_life_change()
 
     @property
     def attack_damage(self) -> int:
@@ -56,7 +83,7 @@ class Character:
 
     @property
     def defense(self):
-        return self._defense_move.current_defense
+        return self._state.defense
 
     @property
     def special_move(self):
@@ -70,15 +97,143 @@ class Character:
     def poison(self) -> Poison:
         return self._poison
 
+    @property
+    def state(self) -> CharacterState:
+        return self._state
+
+    @property
+    def kind(self) -> int:
+        return self._kind
+
+    @property
+    def sink(self) -> EventSink:
+        return self._sink
+
+    @sink.setter
+    def sink(self, sink: EventSink) -> None:
+        """
+        Sends the events of this character, its moves and its status effects to the given sink.
+        """
+        self._sink = sink
+        for part in (self._attack_move, self._defense_move, self._special_move, self._stun, self._poison):
+            part.sink = sink
+
+    @property
+    def rng(self) -> random.Random:
+        return self._special_move.rng
+
+    @rng.setter
+    def rng(self, rng: random.Random) -> None:
+        """
+        Makes this character's special move draw its random numbers from the given generator.
+        """
+        self._special_move.rng = rng
+
     # endregion
 
     # region Methods
+    def snapshot(self) -> CharacterState:
+        """
+        Copies the state of this character, five numbers no matter how many moves and effects it has.
+        :return: The copy.
+        """
+        return self._state.clone()
+
+    def clone(self) -> 'Character':
+        """
+        Copies this character with its moves and effects bound to a copy of its state, without running any constructor.
+        Sinks, generators and matchups are those of this character.
+        :return: The copy, sharing nothing a battle changes.
+        """
+        twin = object.__new__(type(self))
+        twin._name = self._name
+        twin._attack_move = self._attack_move.clone()
+        twin._defense_move = self._defense_move.clone()
+        twin._special_move = self._special_move.clone()
+        twin._stun = self._stun.clone()
+        twin._poison = self._poison.clone()
+        twin._sink = self._sink
+        twin._life_hooks = []
+        twin._effect_hooks = []
+        twin._state = self._state.clone()
+        twin._kind = self._kind
+        for part in (twin._defense_move, twin._special_move, twin._stun, twin._poison):
+            part.state = twin._state
+        twin._stun.listener = twin._poison.listener = twin.__effect_started
+        return twin
+
+    def restore(self, state: CharacterState) -> None:
+        """
+        Returns this character to a snapshot. Life hooks are not called, BattleManager.restore() rebuilds its index.
+        :param state: A snapshot of this character.
+        :return: None
+        """
+        self._state.restore(state)
+
+    def bind_matchups(self, table: 'MatchupTable') -> None:
+        """
+        Makes this character's attack and special read their damage from the table instead of working it out.
+        :param table: The matchup table, see matchups.get_table().
+        :return: None
+        """
+        self._kind = table.kind(self)
+        if self._kind >= 0:
+            self._attack_move.hits = table.attack_hits[self._kind]
+            self._special_move.hits = table.special_hits[self._kind]
+
+    def add_life_hook(self, hook: Callable[['Character'], None]) -> None:
+        """
+        Registers a function to call with this character whenever its hit points cross zero, in either direction.
+        :param hook: The function to call. Registering the same hook twice has no effect.
+        :return: None
+        """
+        if hook not in self._life_hooks:
+            self._life_hooks.append(hook)
+
+    def report_life_change(self) -> None:
+        """
+        Runs the life hooks, for code that writes hit points straight to the state, see SpecialMove.strike().
+        :return: None
+        """
+        for hook in self._life_hooks:
+            hook(self)
+
+    def add_effect_hook(self, hook: Callable[['Character'], None]) -> None:
+        """
+        Registers a function to call with this character whenever it gains a status effect or a defense boost.
+        :param hook: The function to call. Registering the same hook twice has no effect.
+        :return: None
+        """
+        if hook not in self._effect_hooks:
+            self._effect_hooks.append(hook)
+
+    def add_effect(self, effect: StatusEffect, duration: int) -> None:
+        """
+        Applies one of this character's status effects by its stacking rule. The effect reports it to the effect hooks.
+        :param effect: The effect, e.g. self.stun.
+        :param duration: The number of turns.
+        :return: None
+        """
+        effect.add(duration)
+
+    def __effect_started(self) -> None:
+        # The stun and poison call this whenever they are given a duration
+        for hook in self._effect_hooks:
+            hook(self)
+
+    def has_effects(self) -> bool:
+        """
+        :return: True if the start of this character's next turn has anything to handle.
+        """
+        state = self._state
+        return state.stun > 0 or state.poison > 0 or self._defense_move.is_boost_active()
+
     def is_alive(self) -> bool:
         """
         Determines if the player is still alive.
         :return: True if the player's hit points are greater than 0, False otherwise.
         """
-        return self.hp > 0
+        return self._state.hp > 0
 
     def get_description(self) -> str:
         """
@@ -105,7 +260,7 @@ class Character:
         :param target: Character receiving the attack.
         :return: None
         """
-        print(self._attack_move.voiceline)
+        self._sink.emit(BattleEvent(VOICELINE, self._attack_move.voiceline, self._attack_move.name))
         return self._attack_move.apply(self, target)
 
     def defend(self) -> str:
@@ -115,6 +270,8 @@ class Character:
         """
         if not self._defense_move.is_boost_active():
             self._defense_move.apply()
+            for hook in self._effect_hooks:
+                hook(self)
             return f"{self._name} strengthens themselves, adding {self._defense_move.boost} defense."
         else:
             return f"{self._name} is already defending this turn."
@@ -136,14 +293,14 @@ class Character:
         @param turn: The current tally of turns that have passed.
         @return: True if the special was applied, False otherwise.
         """
-        if self._special_move.is_available(turn):
-            print(self._special_move.voiceline)
-            self._special_move.apply(targets)
-            self._special_move.last_used = turn
-        else:
-            print(f"{self._special_move.name} is on cooldown! Choose another action.")
+        special = self._special_move
+        if not special.is_available(turn):
+            self._sink.emit(BattleEvent(COOLDOWN, f"{special.name} is on cooldown! Choose another action.",
+                                        special.name, amount=special.cooldown - (turn - special.last_used)))
             return False
-        time.sleep(1)
+        self._sink.emit(BattleEvent(SPECIAL, special.voiceline, special.name))
+        special.apply(targets)
+        special.last_used = turn
         return True
 
     def handle_poison(self) -> None:
@@ -1,3 +1,5 @@
+from typing import Dict
+from JJK_Game.catalog import load_catalog
 from JJK_Game.character import Character
 from JJK_Game.characters.gojo import Gojo
 from JJK_Game.characters.sukuna import Sukuna
@@ -9,7 +11,9 @@ from JJK_Game.characters.nobara import Nobara
 class CharacterFactory:
     """
     Factory class to create different character types dynamically.
+    Each character is built once per process from the catalog, every character handed out is a clone of that prototype.
     """
+    __prototypes: Dict[str, Character] = {}
 
     # region Constructor
     def __init__(self):
@@ -26,6 +30,9 @@ class CharacterFactory:
     # endregion
 
     # region Methods
+    def get_character_names(self) -> list[str]:
+        return [name for name in load_catalog() if name in self.__character_classes]
+
     def create_character(self, name: str) -> Character:
         """
         Creates a character instance based on the given name.
@@ -34,8 +41,10 @@ class CharacterFactory:
         :return: An instance of the specified character.
         :raises ValueError: If the character name is invalid.
         """
-        if name in self.__character_classes:
-            return self.__character_classes[name]()
-        else:
-            raise ValueError(f"Character '{name}' does not exist in the factory.")
+        prototype = CharacterFactory.__prototypes.get(name)
+        if prototype is None:
+            if name not in self.__character_classes:
+                raise ValueError(f"Character '{name}' does not exist in the factory.")
+            prototype = CharacterFactory.__prototypes[name] = self.__character_classes[name]()
+        return prototype.clone()
     # endregion
\ No newline at end of file
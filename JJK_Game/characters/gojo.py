@@ -1,6 +1,9 @@
 from JJK_Game.action import *
+from JJK_Game.battle_events import STUN
+from JJK_Game.catalog import character_stats
 from JJK_Game.character import Character
-import random
+
+_STATS = character_stats('Gojo')
 
 
 # region GOJO
@@ -8,19 +11,22 @@ class Red(Attack):
     """
     Amplifies the repelling force of Limitless using reversed cursed energy, creating a powerful shockwave that violently repels anything in its path.
     """
+    __slots__ = ()
 
     def __init__(self):
-        super().__init__(28, "Red", self.__doc__,
-                         "Convergence, divergence... What do you think happens when one touches this void?")
+        attack = _STATS['attack']
+        super().__init__(attack['damage'], attack['name'], self.__doc__, attack['voiceline'])
 
 
 class Limitless(Defend):
     """
     Recursively divides the space between the attack and defender into a convergent series of fractional distances.
     """
+    __slots__ = ()
 
     def __init__(self):
-        super().__init__("Limitless", self.__doc__, 8, 15)
+        defense = _STATS['defense']
+        super().__init__(defense['name'], self.__doc__, defense['base'], defense['boost'])
 
 
 class UnlimitedVoid(SpecialMove):
@@ -28,13 +34,13 @@ class UnlimitedVoid(SpecialMove):
     Traps opponents in an empty space with an overwhelming amount of information.
     Deals 25 damage to each player and has a 50% chance to stun each opponent.
     """
+    __slots__ = ()
+    draws = ((1, 0.5), (0, 0.5))
+    power = _STATS['special']['power']
 
     def __init__(self):
-        super().__init__("Unlimited Void",
-                         self.__doc__,
-                         "It's ironic isn't it? When granted everything you can't do anything. " +
-                         "Domain Expansion. Unlimited Void.",
-                         5)
+        special = _STATS['special']
+        super().__init__(special['name'], self.__doc__, special['voiceline'], special['cooldown'])
 
     def create_stun_rng(self, n: int) -> list[bool]:
         """
@@ -42,7 +48,7 @@ class UnlimitedVoid(SpecialMove):
         :param n: The size of the list.
         :return: List of bools
         """
-        return [True if random.randint(0, 1) == 1 else False for _ in range(n)]
+        return [True if self._rng.randint(0, 1) == 1 else False for _ in range(n)]
 
     def stun_targets(self, stun_list: list[bool], targets: list[Character]) -> None:
         """
@@ -51,10 +57,12 @@ class UnlimitedVoid(SpecialMove):
         :param targets: The list of other characters
         :return: None
         """
-        for to_stun, target in zip(stun_list, targets):
-            if to_stun:
-                target.stun.duration = 1
-                print(f'{target.name} was stunned.')
+        stunned = [target for to_stun, target in zip(stun_list, targets) if to_stun]
+        for target in stunned:
+            target.add_effect(target.stun, 1)
+        if self._sink.listening:
+            for target in stunned:
+                self.emit(STUN, f'{target.name} was stunned.', target.name, 1)
 
     def apply(self, targets: list[Character]) -> None:
         """
@@ -62,14 +70,7 @@ class UnlimitedVoid(SpecialMove):
         :param targets: The list of other characters
         :return: None
         """
-        for target in targets:
-            damage: int = max(0, 25 - target.defense)
-            target.hp -= damage
-            if not target.is_alive():
-                print(f'{target.name} was eliminated by {self._name}.')
-            else:
-                print(f'{target.name} was damaged for {damage} damage.')
-
+        self.strike(targets, self.power)
         stun_list: list[bool] = self.create_stun_rng(len(targets))
         self.stun_targets(stun_list, targets)
 
@@ -78,8 +79,9 @@ class Gojo(Character):
     """
     https://jujutsu-kaisen.fandom.com/wiki/Satoru_Gojo
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__("Satoru Gojo", 120, Red(), Limitless(), UnlimitedVoid())
+        super().__init__(_STATS['name'], _STATS['hp'], Red(), Limitless(), UnlimitedVoid())
 
 # endregion
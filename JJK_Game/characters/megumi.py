@@ -1,27 +1,31 @@
 from JJK_Game.action import *
+from JJK_Game.catalog import character_stats
 from JJK_Game.character import Character
 
+_STATS = character_stats('Megumi')
+
 
 # region Megumi
 class DivineDogs(Attack):
     """
     Summons shikigami that act as swift and relentless hunting beasts that track and attack his enemies.
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__(25,
-                         "Divine Dogs",
-                         self.__doc__,
-                         "Devour!")
+        attack = _STATS['attack']
+        super().__init__(attack['damage'], attack['name'], self.__doc__, attack['voiceline'])
 
 
 class RabbitEscape(Defend):
     """
     Creates a shield for escape by surrounding himself with thousands of rabbit shikigami.
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__("Rabbit Escape", self.__doc__, 9, 14)
+        defense = _STATS['defense']
+        super().__init__(defense['name'], self.__doc__, defense['base'], defense['boost'])
 
 
 class Mahoraga(SpecialMove):
@@ -29,12 +33,14 @@ class Mahoraga(SpecialMove):
     Summons the shadow Mahoraga who is able to adapt to techniques and deal massive damage.
     Deals 25 damage to each player negating defense and heals 20hp.
     """
+    __slots__ = ()
+    power = _STATS['special']['power']
+    pierces = _STATS['special']['pierces']
+    heal: int = _STATS['special']['heal']  # Given to Megumi by Megumi.special()
 
     def __init__(self) -> None:
-        super().__init__("Mahoraga",
-                         self.__doc__,
-                         "With this treasure, I summon Eight-Handled Sword, Divergent Sila, Divine General Mahoraga.",
-                         5)
+        special = _STATS['special']
+        super().__init__(special['name'], self.__doc__, special['voiceline'], special['cooldown'])
 
     def apply(self, targets: list[Character]) -> None:
         """
@@ -42,26 +48,21 @@ class Mahoraga(SpecialMove):
         :param targets: The list of other characters
         :return: None
         """
-        for target in targets:
-            damage: int = 25 # Negates defense
-            target.hp -= damage
-            if not target.is_alive():
-                print(f"{target.name} was eliminated by {self.name}.")
-            else:
-                print(f"{target.name} was damaged for {damage} damage.")
+        self.strike(targets, self.power, self.pierces)
 
 
 class Megumi(Character):
     """
     https://jujutsu-kaisen.fandom.com/wiki/Megumi_Fushiguro
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__("Megumi Fushiguro", 110, DivineDogs(), RabbitEscape(), Mahoraga())
+        super().__init__(_STATS['name'], _STATS['hp'], DivineDogs(), RabbitEscape(), Mahoraga())
 
     def special(self, targets: list[Character], turn: int) -> bool:
         if super().special(targets, turn):
-            self.hp += 20
+            self.hp += self.special_move.heal
             return True
         else:
             return False
@@ -1,27 +1,31 @@
 from JJK_Game.action import *
+from JJK_Game.battle_events import STUN
+from JJK_Game.catalog import character_stats
 from JJK_Game.character import Character
-import random
+
+_STATS = character_stats('Nanami')
 
 # region Nanami
 class RatioTechnique(Attack):
     """
     Divides anything he touches into a 7:3 ratio, marking the weaker portion as a critical weak point for a guaranteed enhanced strike.
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__(28,
-                         "Ratio",
-                         self.__doc__,
-                         "Even with just a blunt sword, a decisive hit at the weak point is lethal.")
+        attack = _STATS['attack']
+        super().__init__(attack['damage'], attack['name'], self.__doc__, attack['voiceline'])
 
 
 class Block(Defend):
     """
     Basically hardening of cursed energy to negate damage.
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__("Block", self.__doc__, 10, 12)
+        defense = _STATS['defense']
+        super().__init__(defense['name'], self.__doc__, defense['base'], defense['boost'])
 
 
 class Overtime(SpecialMove):
@@ -29,12 +33,13 @@ class Overtime(SpecialMove):
     A self-imposed restriction that temporarily increases power and speed.
     Has a 25% chance to stun each opponent or will deal 20 damage.
     """
+    __slots__ = ()
+    draws = ((1, 0.25), (0, 0.75))  # Any roll but 1 is a miss
+    power = _STATS['special']['power']
 
     def __init__(self) -> None:
-        super().__init__("Overtime",
-                         self.__doc__,
-                         "I dislike working overtime... but when I do, I give it my all.",
-                         3)
+        special = _STATS['special']
+        super().__init__(special['name'], self.__doc__, special['voiceline'], special['cooldown'])
 
     def create_stun_rng(self, n: int) -> list[bool]:
         """
@@ -42,7 +47,7 @@ class Overtime(SpecialMove):
         :param n: The length of the list
         :return: List of bools.
         """
-        return [True if random.randint(0, 3) == 1 else False for _ in range(n)]
+        return [True if self._rng.randint(0, 3) == 1 else False for _ in range(n)]
 
     def stun_and_damage_targets(self, stun_list: list[bool], targets: list[Character]) -> None:
         """
@@ -51,18 +56,13 @@ class Overtime(SpecialMove):
         :param targets: The list of other characters.
         :return: None
         """
-        for i in range(0, len(stun_list)):
-            target: Character = targets[i]
-            if stun_list[i]:
-                target.stun.duration = 1
-                print(f'{target.name} was stunned by {self.name}.')
-            else:
-                damage: int = max(0, 20 - target.defense)
-                target.hp -= damage
-                if not target.is_alive():
-                    print(f"{target.name} was eliminated by {self.name}.")
-                else:
-                    print(f"{target.name} was damaged for {damage} damage.")
+        stunned = [target for to_stun, target in zip(stun_list, targets) if to_stun]
+        for target in stunned:
+            target.add_effect(target.stun, 1)
+        if self._sink.listening:
+            for target in stunned:
+                self.emit(STUN, f'{target.name} was stunned by {self.name}.', target.name, 1)
+        self.strike([target for to_stun, target in zip(stun_list, targets) if not to_stun], self.power)
 
     def apply(self, targets: list[Character]) -> None:
         """
@@ -78,9 +78,10 @@ class Nanami(Character):
     """
     https://jujutsu-kaisen.fandom.com/wiki/Kento_Nanami
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__("Kento Nanami", 120, RatioTechnique(), Block(), Overtime())
+        super().__init__(_STATS['name'], _STATS['hp'], RatioTechnique(), Block(), Overtime())
 
 
 # endregion
@@ -1,6 +1,9 @@
 from JJK_Game.action import *
+from JJK_Game.battle_events import POISON
+from JJK_Game.catalog import character_stats
 from JJK_Game.character import Character
-import random
+
+_STATS = character_stats('Nobara')
 
 
 # region Nobara
@@ -8,21 +11,22 @@ class Hairpin(Attack):
     """
     Plants multiple nails into a surface and detonates them simultaneously, causing large-scale destruction.
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__(27,
-                         "Hairpin",
-                         self.__doc__,
-                         "Hairpin!—Hope you like surprises.")
+        attack = _STATS['attack']
+        super().__init__(attack['damage'], attack['name'], self.__doc__, attack['voiceline'])
 
 
 class StrawDoll(Defend):
     """
     Transmits damage into a straw doll to avoid taking a direct hit.
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__("Straw Doll", self.__doc__, 14, 14)
+        defense = _STATS['defense']
+        super().__init__(defense['name'], self.__doc__, defense['base'], defense['boost'])
 
 
 class Resonance(SpecialMove):
@@ -30,12 +34,12 @@ class Resonance(SpecialMove):
     Drives a nail into a straw doll linked to her opponents, transmitting poison damage to them.
     Randomly poisons alive players for 1-3 moves.
     """
+    __slots__ = ()
+    draws = ((1, 1 / 3), (2, 1 / 3), (3, 1 / 3))
 
     def __init__(self) -> None:
-        super().__init__("Resonance",
-                         self.__doc__,
-                         "No matter where you run, Resonance will find you.",
-                         4)
+        special = _STATS['special']
+        super().__init__(special['name'], self.__doc__, special['voiceline'], special['cooldown'])
 
     def poison_duration_rng(self, n: int) -> list[int]:
         """
@@ -43,7 +47,7 @@ class Resonance(SpecialMove):
         :param n: The length of the list.
         :return: List of random ints.
         """
-        return [random.randint(1, 3) for _ in range(n)]
+        return [self._rng.randint(1, 3) for _ in range(n)]
 
     def poison_targets(self, poison_list: list[int], targets: list[Character]) -> None:
         """
@@ -53,8 +57,11 @@ class Resonance(SpecialMove):
         :return: None
         """
         for poison_duration, target in zip(poison_list, targets):
-            target.poison.duration = poison_duration
-            print(f'{target.name} was poisoned by {self.name} for {poison_duration} turns.')
+            target.add_effect(target.poison, poison_duration)
+        if self._sink.listening:
+            for poison_duration, target in zip(poison_list, targets):
+                self.emit(POISON, f'{target.name} was poisoned by {self.name} for {poison_duration} turns.',
+                          target.name, poison_duration)
 
     def apply(self, defenders: list[Character]) -> None:
         """
@@ -71,8 +78,9 @@ class Nobara(Character):
     https://jujutsu-kaisen.fandom.com/wiki/Nobara_Kugisaki
                          SpecialMove("Straw Doll Technique", self.straw_doll, 2))
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__("Nobara Kugisaki", 130, Hairpin(), StrawDoll(), Resonance())
+        super().__init__(_STATS['name'], _STATS['hp'], Hairpin(), StrawDoll(), Resonance())
 
 # endregion
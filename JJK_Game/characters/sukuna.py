@@ -1,27 +1,31 @@
 from JJK_Game.action import *
+from JJK_Game.catalog import character_stats
 from JJK_Game.character import Character
 
+_STATS = character_stats('Sukuna')
+
 
 # region SUKUNA
 class Dismantle(Attack):
     """
     Slashes opponents with cursed energy capable of cutting through anything with precision.
     """
+    __slots__ = ()
 
     def __init__(self):
-        super().__init__(35,
-                         "Dismantle",
-                         self.__doc__,
-                         "You are nothing but a fish on my chopping board.")
+        attack = _STATS['attack']
+        super().__init__(attack['damage'], attack['name'], self.__doc__, attack['voiceline'])
 
 
 class FallingBlossomEmotion(Defend):
     """
     An application of cursed energy that automatically repels anything it touches.
     """
+    __slots__ = ()
 
     def __init__(self):
-        super().__init__('Falling Blossom Emotion', self.__doc__, 7, 10)
+        defense = _STATS['defense']
+        super().__init__(defense['name'], self.__doc__, defense['base'], defense['boost'])
 
 
 class MalevolentShrine(SpecialMove):
@@ -29,13 +33,13 @@ class MalevolentShrine(SpecialMove):
     Creates an open barrier where dismantle and cleave continually cut everything within a massive radius.
     Deals 30 damage to each player negating defense.
     """
+    __slots__ = ()
+    power = _STATS['special']['power']
+    pierces = _STATS['special']['pierces']
 
     def __init__(self):
-        super().__init__("Malevolent Shrine",
-                         self.__doc__,
-                         "This is divine punishment. " +
-                         "Domain Expansion. Malevolent Shrine.",
-                         6)
+        special = _STATS['special']
+        super().__init__(special['name'], self.__doc__, special['voiceline'], special['cooldown'])
 
     def apply(self, targets: list[Character]) -> None:
         """
@@ -43,19 +47,14 @@ class MalevolentShrine(SpecialMove):
         :param targets: The list of other characters.
         :return: None
         """
-        for target in targets:
-            damage: int = 30 # Negates defense
-            target.hp -= damage
-            if not target.is_alive():
-                print(f"{target.name} was eliminated by {self.name}.")
-            else:
-                print(f"{target.name} was damaged for {damage} damage.")
+        self.strike(targets, self.power, self.pierces)
 
 
 class Sukuna(Character):
     """
     https://jujutsu-kaisen.fandom.com/wiki/Sukuna
     """
+    __slots__ = ()
 
     def __init__(self) -> None:
-        super().__init__("Ryomen Sukuna", 140, Dismantle(), FallingBlossomEmotion(), MalevolentShrine())
+        super().__init__(_STATS['name'], _STATS['hp'], Dismantle(), FallingBlossomEmotion(), MalevolentShrine())
@@ -0,0 +1,119 @@
+import asyncio
+from collections import deque
+from typing import Deque, Optional, Tuple
+from JJK_Game.framing import encode_frame
+
+CHAT_QUEUE_LIMIT = 1000
+CHAT_BATCH_SIZE = 32
+MIN_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+
+class ChatRelay:
+    """
+    Forwards server narration to the chat server from a background task.
+    Lines wait in a bounded queue while the chat server is down, and several are written per syscall once it is up.
+    """
+
+    # region Constructor
+    def __init__(self, host: str, port: int, limit: int = CHAT_QUEUE_LIMIT, batch_size: int = CHAT_BATCH_SIZE,
+                 min_backoff: float = MIN_BACKOFF, max_backoff: float = MAX_BACKOFF) -> None:
+        """
+        Creates a relay for the chat server at the given address. Nothing connects until start() is called.
+        :param host: The chat server host.
+        :param port: The chat server port.
+        :param limit: The number of lines kept while disconnected. The oldest lines are dropped first.
+        :param batch_size: The maximum number of lines written at once.
+        :param min_backoff: Seconds to wait before the first reconnect attempt.
+        :param max_backoff: The longest wait between reconnect attempts.
+        """
+        self.host: str = host
+        self.port: int = port
+        self.limit: int = limit
+        self.batch_size: int = batch_size
+        self.min_backoff: float = min_backoff
+        self.max_backoff: float = max_backoff
+        self.dropped: int = 0
+        self.connected: bool = False
+        self.__queue: Deque[str] = deque()
+        self.__ready: asyncio.Event = asyncio.Event()
+        self.__task: Optional[asyncio.Task] = None
+
+    # endregion
+
+    # region Methods
+    def start(self) -> None:
+        """
+        Starts the background task that connects and forwards lines.
+        :return: None
+        """
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__run())
+
+    def send(self, line: str) -> None:
+        """
+        Queues a line for the chat server without waiting.
+        :param line: The chat line.
+        :return: None
+        """
+        if len(self.__queue) >= self.limit:
+            self.__queue.popleft()
+            self.dropped += 1
+        self.__queue.append(line)
+        self.__ready.set()
+
+    async def __connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        Connects to the chat server, backing off exponentially between failed attempts.
+        :return: The streams of the new connection.
+        """
+        backoff = self.min_backoff
+        while True:
+            try:
+                return await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def __run(self) -> None:
+        """
+        Keeps a connection open and writes queued lines in batches, reconnecting whenever a write fails.
+        :return: None
+        """
+        while True:
+            reader, writer = await self.__connect()
+            self.connected = True
+            try:
+                while True:
+                    if not self.__queue:
+                        self.__ready.clear()
+                        await self.__ready.wait()
+                    if reader.at_eof():
+                        # The chat server hung up while we were idle
+                        break
+                    batch = [self.__queue.popleft() for _ in range(min(self.batch_size, len(self.__queue)))]
+                    try:
+                        writer.writelines([encode_frame(line) for line in batch])
+                        await writer.drain()
+                    except (ConnectionError, RuntimeError):
+                        # Put the batch back in order, it is retried on the next connection
+                        self.__queue.extendleft(reversed(batch))
+                        while len(self.__queue) > self.limit:
+                            self.__queue.popleft()
+                            self.dropped += 1
+                        break
+            finally:
+                self.connected = False
+                writer.close()
+            await asyncio.sleep(self.min_backoff)
+
+    async def close(self) -> None:
+        """
+        Stops the background task and closes the connection.
+        :return: None
+        """
+        if self.__task is not None:
+            self.__task.cancel()
+            await asyncio.gather(self.__task, return_exceptions=True)
+            self.__task = None
+    # endregion
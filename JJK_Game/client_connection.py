@@ -0,0 +1,111 @@
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+from JJK_Game.framing import encode_json
+
+OUTBOUND_LIMIT = 256
+DROP = 'drop'
+RESYNC = 'resync'
+SLOW_CLIENT_POLICY = RESYNC
+
+
+class ClientConnection:
+    """
+    One connected socket with a bounded outbound queue drained by its own task.
+    Senders only enqueue already encoded frames, so a slow reader never holds up the battle loop.
+    """
+
+    # region Constructor
+    def __init__(self, writer: asyncio.StreamWriter, limit: int = OUTBOUND_LIMIT,
+                 policy: str = SLOW_CLIENT_POLICY) -> None:
+        """
+        Wraps a stream writer and starts draining its queue.
+        :param writer: The stream writer of the connection.
+        :param limit: The number of frames that may wait before the client counts as slow.
+        :param policy: What to do with a slow client: DROP closes it, RESYNC discards its queued
+                       game state frames and sends a fresh snapshot instead.
+        """
+        self.writer: asyncio.StreamWriter = writer
+        self.limit: int = limit
+        self.policy: str = policy
+        self.snapshot: Optional[Callable[[], Optional[bytes]]] = None  # Provides the resync frame
+        self.closed: bool = False
+        self.__queue: Deque[Tuple[bytes, bool]] = deque()
+        self.__ready: asyncio.Event = asyncio.Event()
+        self.__task: asyncio.Task = asyncio.create_task(self.__drain())
+
+    # endregion
+
+    # region Methods
+    def send(self, frame: bytes, state: bool = False) -> None:
+        """
+        Queues an encoded frame without waiting for the socket.
+        :param frame: The frame to send. The same bytes object may be queued on many connections.
+        :param state: True for game state frames, which a resync may replace with a snapshot.
+        :return: None
+        """
+        if self.closed:
+            return
+        if len(self.__queue) >= self.limit:
+            if not self.__handle_overflow():
+                return
+            # The snapshot already includes the state this frame would have delivered
+            if state and self.__queue and self.__queue[-1][1]:
+                self.__ready.set()
+                return
+        self.__queue.append((frame, state))
+        self.__ready.set()
+
+    def send_json(self, message: dict) -> None:
+        """
+        Encodes and queues a message for this client only.
+        :param message: The message to send.
+        :return: None
+        """
+        self.send(encode_json(message))
+
+    def __handle_overflow(self) -> bool:
+        """
+        Applies the slow client policy once the queue is full.
+        :return: True if there is room for the new frame afterwards, False if the client was dropped.
+        """
+        if self.policy == RESYNC and self.snapshot is not None:
+            pending = [entry for entry in self.__queue if not entry[1]]
+            if len(pending) < self.limit:
+                self.__queue = deque(pending)
+                frame = self.snapshot()
+                if frame is not None:
+                    self.__queue.append((frame, True))
+                if len(self.__queue) < self.limit:
+                    return True
+        self.close()
+        return False
+
+    async def __drain(self) -> None:
+        """
+        Writes queued frames in batches, waiting for the socket to accept each batch.
+        :return: None
+        """
+        try:
+            while True:
+                await self.__ready.wait()
+                self.__ready.clear()
+                frames = [frame for frame, _ in self.__queue]
+                self.__queue.clear()
+                self.writer.writelines(frames)
+                await self.writer.drain()
+        except (ConnectionError, RuntimeError):
+            self.close()
+
+    def close(self) -> None:
+        """
+        Stops sending and closes the socket. Queued frames are discarded.
+        :return: None
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.__queue.clear()
+        self.__task.cancel()
+        self.writer.close()
+    # endregion
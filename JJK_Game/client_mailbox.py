@@ -0,0 +1,70 @@
+import asyncio
+from typing import Dict, Optional
+
+
+class Mailbox:
+    """
+    Per-client message store keyed by message type.
+    Readers await a queue for the type they want, so waiting costs nothing until a message arrives.
+    """
+
+    # region Constructor
+    def __init__(self) -> None:
+        """
+        Creates an empty mailbox. Queues are created lazily, one per message type.
+        """
+        self.__queues: Dict[str, asyncio.Queue] = {}
+
+    # endregion
+
+    # region Methods
+    def __queue(self, message_type: str) -> asyncio.Queue:
+        """
+        Gets the queue for the given message type, creating it if needed.
+        :param message_type: The message type to get the queue for.
+        :return: The queue holding messages of this type.
+        """
+        queue = self.__queues.get(message_type)
+        if queue is None:
+            queue = self.__queues[message_type] = asyncio.Queue()
+        return queue
+
+    def put(self, message: dict) -> None:
+        """
+        Stores a message and wakes a reader waiting for its type.
+        :param message: The decoded message, must contain a "type" key.
+        :return: None
+        """
+        self.__queue(message.get("type")).put_nowait(message)
+
+    async def get(self, message_type: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Removes and returns the oldest message of the given type, waiting until one arrives.
+        :param message_type: The message type to wait for.
+        :param timeout: The maximum number of seconds to wait, or None to wait forever.
+        :return: The message, or None if the timeout expired.
+        """
+        try:
+            return await asyncio.wait_for(self.__queue(message_type).get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def discard(self, message_type: str) -> None:
+        """
+        Drops the stored messages of one type, such as late answers to a prompt that already timed out.
+        :param message_type: The message type to drop.
+        :return: None
+        """
+        queue = self.__queues.get(message_type)
+        while queue is not None and not queue.empty():
+            queue.get_nowait()
+
+    def clear(self) -> None:
+        """
+        Drops every stored message.
+        :return: None
+        """
+        for queue in self.__queues.values():
+            while not queue.empty():
+                queue.get_nowait()
+    # endregion
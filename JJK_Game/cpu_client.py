@@ -0,0 +1,61 @@
+import asyncio
+import random
+from typing import Optional
+from JJK_Game.ai import BUDGET_MS
+
+
+class CpuClient:
+    """
+    A seat of a GameRoom played by the search AI. It takes the place of a ClientConnection and answers each
+    prompt through its mailbox, so the room runs it exactly like a remote player.
+    """
+
+    def __init__(self, room, name: str, budget_ms: float = BUDGET_MS):
+        """
+        :param room: The room the seat belongs to.
+        :param name: The player name shown to the others.
+        :param budget_ms: How long each move may take, the search runs on the server's bot pool.
+        """
+        self.room = room
+        self.name = name
+        self.budget_ms = budget_ms
+        self.random = random.Random()
+        self.snapshot = None
+        self.target: Optional[str] = None
+        self.thinking: Optional[asyncio.Task] = None
+
+    def send(self, frame: bytes, state: bool = False) -> None:
+        # Broadcasts carry nothing the search does not read from the battle itself
+        pass
+
+    def send_json(self, message: dict) -> None:
+        kind = message['type']
+        if kind == 'character_selection':
+            choice = self.random.choice(message['descriptions'])['name']
+            self.answer({'type': 'character_choice', 'character': choice})
+        elif kind == 'action_selection':
+            self.thinking = asyncio.create_task(self.think())
+        elif kind == 'target_selection':
+            target = self.target if self.target in message['targets'] else message['targets'][0]
+            self.answer({'type': 'target', 'target': target})
+
+    def answer(self, message: dict) -> None:
+        # The room clears stale answers right after prompting, so this one is delivered once it is waiting
+        asyncio.get_running_loop().call_soon(self.room.mailboxes[self].put, message)
+
+    async def think(self) -> None:
+        """
+        Has the server's bot pool search a snapshot of the battle, the room waits for the answer like for a human's.
+        :return: None
+        """
+        manager = self.room.battle_manager
+        player = manager.get_current_player()
+        names = [p['name'] for p in manager.get_battle_state()['players']]
+        state, seat = manager.snapshot(), manager.get_seat(player)
+        action, target = await self.room.server.bots.choose(self.room.room_id, names, state, seat, self.budget_ms)
+        self.target = None if target is None else names[target]
+        self.answer({'type': 'action', 'action': action})
+
+    def close(self) -> None:
+        if self.thinking is not None:
+            self.thinking.cancel()
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import socket
+import struct
+from typing import Optional, Union
+
+HEADER = struct.Struct('!I')
+MAX_FRAME_SIZE = 1024 * 1024
+INITIAL_BUFFER_SIZE = 4096
+
+
+# region Encoding
+def encode_frame(payload: Union[bytes, str]) -> bytes:
+    """
+    Prefixes a payload with its length so the receiver knows where it ends.
+    :param payload: The bytes or text to send. Text is encoded as UTF-8.
+    :return: The header followed by the payload.
+    :raises ValueError: If the payload is larger than MAX_FRAME_SIZE.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {len(payload)} bytes exceeds the {MAX_FRAME_SIZE} byte limit.")
+    return HEADER.pack(len(payload)) + payload
+
+
+def encode_json(message: dict) -> bytes:
+    """
+    Serializes a message as a JSON frame.
+    :param message: The message to send.
+    :return: The encoded frame.
+    """
+    return encode_frame(json.dumps(message))
+
+
+def send_frame(sock: socket.socket, payload: Union[bytes, str]) -> None:
+    """
+    Sends one frame over a blocking socket.
+    :param sock: The connected socket.
+    :param payload: The bytes or text to send.
+    :return: None
+    """
+    sock.sendall(encode_frame(payload))
+
+
+# endregion
+
+# region Blocking Reader
+class FrameReader:
+    """
+    Reads length-prefixed frames from a blocking socket.
+    Data is received straight into a reusable bytearray with recv_into and frames are handed out as memoryviews,
+    so a frame is never copied or re-scanned while it arrives in pieces.
+    """
+
+    # region Constructor
+    def __init__(self, sock: socket.socket, size: int = INITIAL_BUFFER_SIZE) -> None:
+        """
+        Creates a reader for the given socket.
+        :param sock: The connected socket to read from.
+        :param size: The starting size of the receive buffer. It grows to fit the largest frame seen.
+        """
+        self.__sock: socket.socket = sock
+        self.__buffer: bytearray = bytearray(size)
+        self.__view: memoryview = memoryview(self.__buffer)
+        self.__start: int = 0  # First unread byte
+        self.__end: int = 0  # One past the last received byte
+
+    # endregion
+
+    # region Methods
+    def __make_room(self, needed: int) -> None:
+        """
+        Ensures the buffer can hold `needed` unread bytes, moving them to the front or growing the buffer.
+        :param needed: The number of bytes the next frame requires.
+        :return: None
+        """
+        unread = self.__end - self.__start
+        if needed <= len(self.__buffer) - self.__start:
+            return
+        if needed > len(self.__buffer):
+            grown = bytearray(max(needed, 2 * len(self.__buffer)))
+            grown[:unread] = self.__buffer[self.__start:self.__end]
+            self.__buffer = grown
+            self.__view = memoryview(self.__buffer)
+        else:
+            self.__buffer[:unread] = self.__buffer[self.__start:self.__end]
+        self.__start = 0
+        self.__end = unread
+
+    def __fill(self, needed: int) -> bool:
+        """
+        Receives until at least `needed` unread bytes are buffered.
+        :param needed: The number of unread bytes required.
+        :return: False if the peer closed the connection first, True otherwise.
+        """
+        self.__make_room(needed)
+        while self.__end - self.__start < needed:
+            received = self.__sock.recv_into(self.__view[self.__end:])
+            if not received:
+                return False
+            self.__end += received
+        return True
+
+    def read_frame(self) -> Optional[memoryview]:
+        """
+        Reads the next frame. The returned view is only valid until the next call.
+        :return: The frame payload, or None once the connection is closed.
+        :raises ValueError: If the peer announces a frame larger than MAX_FRAME_SIZE.
+        """
+        if not self.__fill(HEADER.size):
+            return None
+        (length,) = HEADER.unpack_from(self.__buffer, self.__start)
+        if length > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit.")
+        if not self.__fill(HEADER.size + length):
+            return None
+        start = self.__start + HEADER.size
+        self.__start = start + length
+        return self.__view[start:self.__start]
+
+    def read_text(self) -> Optional[str]:
+        """
+        Reads the next frame as UTF-8 text.
+        :return: The decoded text, or None once the connection is closed.
+        """
+        frame = self.read_frame()
+        return None if frame is None else str(frame, 'utf-8')
+
+    def read_json(self) -> Optional[dict]:
+        """
+        Reads the next frame as a JSON message.
+        :return: The decoded message, or None once the connection is closed.
+        """
+        text = self.read_text()
+        return None if text is None else json.loads(text)
+    # endregion
+
+
+# endregion
+
+# region Asyncio Streams
+async def read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """
+    Reads the next frame from an asyncio stream.
+    :param reader: The stream to read from.
+    :return: The frame payload, or None once the connection is closed.
+    :raises ValueError: If the peer announces a frame larger than MAX_FRAME_SIZE.
+    """
+    try:
+        (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+        if length > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit.")
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+
+
+async def read_json(reader: asyncio.StreamReader) -> Optional[dict]:
+    """
+    Reads the next frame from an asyncio stream as a JSON message.
+    :param reader: The stream to read from.
+    :return: The decoded message, or None once the connection is closed.
+    """
+    frame = await read_frame(reader)
+    return None if frame is None else json.loads(frame)
+
+
+def split_frame(data: Union[bytes, bytearray]) -> Optional[bytes]:
+    """
+    Returns the first complete frame in already received data, without consuming it.
+    :param data: The bytes received so far.
+    :return: The first frame payload, or None if it has not fully arrived yet.
+    :raises ValueError: If the frame is larger than MAX_FRAME_SIZE.
+    """
+    if len(data) < HEADER.size:
+        return None
+    (length,) = HEADER.unpack_from(data)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit.")
+    if len(data) < HEADER.size + length:
+        return None
+    return bytes(data[HEADER.size:HEADER.size + length])
+# endregion
@@ -0,0 +1,267 @@
+import asyncio
+from JJK_Game.battle_events import BufferedSink, VOICELINE, SPECIAL
+from JJK_Game.battle_manager import BattleManager, MatchRecorder
+from JJK_Game.character_factory import CharacterFactory
+from JJK_Game.client_mailbox import Mailbox
+from JJK_Game.cpu_client import CpuClient
+from JJK_Game.framing import encode_json
+from JJK_Game.state_stream import StateStream
+
+MAX_PLAYERS = 5
+CHARACTER_NAMES = ['Gojo', 'Megumi', 'Nanami', 'Nobara', 'Sukuna']
+
+
+class TurnDeadlines:
+    """
+    How long a player may take in each phase, and what is played for them when time runs out.
+    """
+
+    def __init__(self, selection: float = 60.0, action: float = 30.0, target: float = 15.0,
+                 default_action: str = 'defend'):
+        self.selection = selection
+        self.action = action
+        self.target = target
+        self.default_action = default_action
+
+
+class GameRoom:
+    """
+    One match hosted by a GameServer, with its own players, character pool and BattleManager.
+    """
+
+    def __init__(self, server, room_id: str):
+        self.server = server
+        self.room_id = room_id
+        self.task = None
+
+        self.clients = []
+        self.cpus = []
+        self.mailboxes = {}
+        self.player_names = {}
+        # Players who lost their connection during the match, their seats wait for them to join again
+        self.away = set()
+        self.start_requested = asyncio.Event()
+
+        factory = CharacterFactory()
+        self.available_characters = [factory.create_character(c) for c in CHARACTER_NAMES]
+        self.events = BufferedSink()
+        self.recorder = server.match_log.open_match() if server.match_log is not None else MatchRecorder()
+        self.battle_manager = BattleManager(self.available_characters, sink=self.events, recorder=self.recorder,
+                                            repeat_characters=server.repeat_characters)
+        self.state_stream = StateStream()
+        self.game_started = False
+
+    def is_full(self) -> bool:
+        return len(self.clients) >= self.server.max_players
+
+    def add_client(self, client, player_name: str) -> Mailbox:
+        mailbox = self.mailboxes[client] = Mailbox()
+        self.clients.append(client)
+        self.player_names[client] = player_name
+        client.snapshot = self.snapshot_frame
+        return mailbox
+
+    def add_cpu(self):
+        """
+        Seats a CPU player before the match starts.
+        Returns the new seat, or None if the room is full or already playing.
+        """
+        if self.game_started or self.is_full():
+            return None
+        cpu = CpuClient(self, f'CPU {len(self.cpus) + 1}')
+        self.add_client(cpu, cpu.name)
+        self.cpus.append(cpu)
+        return cpu
+
+    def fill_seats(self, seats: int):
+        # Called before the match starts, while CPUs may still join
+        while len(self.clients) < min(seats, self.server.max_players) and self.add_cpu() is not None:
+            pass
+
+    def reclaim_seat(self, client, player_name: str):
+        """
+        Hands the held seat of a player who lost their connection to their new one, and sends them the game state.
+        Returns the seat's mailbox, or None if no seat of that name is waiting for its player.
+        """
+        old = next((c for c in self.away if self.player_names[c] == player_name), None)
+        if old is None:
+            return None
+        self.away.remove(old)
+        # A turn in progress still holds the old connection, it finds the same mailbox and name under it
+        self.clients[self.clients.index(old)] = client
+        mailbox = self.mailboxes[client] = self.mailboxes[old]
+        self.player_names[client] = player_name
+        client.snapshot = self.snapshot_frame
+        old.close()
+        self.send_snapshot(client)
+        return mailbox
+
+    def has_humans(self) -> bool:
+        return len(self.clients) > len(self.cpus)
+
+    def remove_client(self, client):
+        if client not in self.clients:
+            return
+        # Seats are tied to the selection order once the match starts, so the seat is held for the player
+        if self.game_started:
+            self.away.add(client)
+            return
+        self.clients.remove(client)
+        del self.mailboxes[client]
+        del self.player_names[client]
+
+    def send_chat(self, msg):
+        self.server.send_chat(msg)
+
+    async def run(self):
+        await self.start_requested.wait()
+        self.fill_seats(self.server.fill_seats)
+        self.game_started = True
+
+        self.broadcast({"type": "status", "msg": "Game is starting..."})
+        try:
+            await self.handle_character_selection()
+            await self.run_battle()
+        finally:
+            self.recorder.close()
+            for cpu in self.cpus:
+                cpu.close()
+
+    def broadcast(self, message, state=False):
+        # Serialized once, every client queues the same bytes
+        frame = encode_json(message)
+        for client in self.clients:
+            client.send(frame, state)
+
+    async def wait_for_message(self, client, expected_type, timeout=None):
+        """
+        Waits for the client's next message of the given type.
+        Returns None if the timeout passes first, the deadline is kept on the server's shared timer wheel.
+        """
+        mailbox = self.mailboxes[client]
+        if timeout is None:
+            return await mailbox.get(expected_type)
+
+        # Anything already queued answered an earlier prompt that timed out
+        mailbox.discard(expected_type)
+        getter = asyncio.ensure_future(mailbox.get(expected_type))
+
+        timer = self.server.timers.schedule(timeout, getter.cancel)
+        try:
+            return await getter
+        except asyncio.CancelledError:
+            if not timer.fired:
+                raise
+            client.send_json({'type': 'timeout', 'phase': expected_type})
+            return None
+        finally:
+            timer.cancel()
+
+    async def handle_character_selection(self):
+        if self.server.repeat_characters:
+            await self.handle_open_selection()
+            return
+        for client in self.clients:
+            descriptions = [{'name': c.name, 'description': c.get_description()} for c in self.available_characters]
+            client.send_json({
+                'type': 'character_selection',
+                'descriptions': descriptions,
+            })
+
+            msg = await self.wait_for_message(client, 'character_choice', self.server.deadlines.selection)
+            char_name = msg['character'] if msg else self.available_characters[0].name
+            chosen = self.battle_manager.assign_character(char_name)
+            self.available_characters = [c for c in self.available_characters if not c.name == char_name]
+            self.send_chat(f"{self.player_names[client]} has selected {char_name}.")
+
+    async def handle_open_selection(self):
+        # No choice takes a character from anybody else, so a lobby of any size waits for one deadline, not one per seat
+        descriptions = [{'name': c.name, 'description': c.get_description()} for c in self.available_characters]
+
+        async def choose(client):
+            client.send_json({'type': 'character_selection', 'descriptions': descriptions})
+            return await self.wait_for_message(client, 'character_choice', self.server.deadlines.selection)
+
+        choices = await asyncio.gather(*(choose(client) for client in self.clients))
+        # Seats follow the join order whatever order the answers came in
+        for client, msg in zip(self.clients, choices):
+            chosen = self.battle_manager.assign_character(msg['character']) if msg else None
+            if chosen is None:
+                chosen = self.battle_manager.assign_character(self.available_characters[0].name)
+            self.send_chat(f"{self.player_names[client]} has selected {chosen.name}.")
+
+    async def run_battle(self):
+        self.battle_manager.start_battle()
+        self.state_stream.update(self.battle_manager.get_battle_state())
+        self.broadcast(self.state_stream.snapshot(), state=True)
+
+        while not self.battle_manager.is_battle_over():
+            player = self.battle_manager.get_current_player()
+            if not player:
+                break
+            self.broadcast_new_turn(player.name)
+            client = self.clients[self.battle_manager.get_seat(player)]
+
+            skipped = self.battle_manager.handle_status_effects(player)
+            self.send_events()
+            if skipped:
+                self.battle_manager.advance_turn()
+                continue
+
+            client.send_json({'type': 'action_selection'})
+            deadlines = self.server.deadlines
+            action_msg = await self.wait_for_message(client, 'action', deadlines.action)
+            if action_msg is None:
+                action = deadlines.default_action
+                self.send_chat(f"{self.player_names[client]} ran out of time and will {action}.")
+            else:
+                action = action_msg['action']
+
+            target = None
+            if action in ('attack', 'special'):
+                targets = self.battle_manager.get_alive_targets(exclude=player)
+                client.send_json({
+                    'type': 'target_selection',
+                    'targets': targets
+                })
+                target_msg = await self.wait_for_message(client, 'target', deadlines.target)
+                target_name = target_msg['target'] if target_msg else targets[0]
+                target = self.battle_manager.get_target_by_name(target_name)
+
+            result = self.battle_manager.apply_action(player, action, target)
+            self.send_chat(result)
+            self.send_events()
+            self.battle_manager.advance_turn()
+            self.broadcast_state()
+
+        self.broadcast({
+            'type': 'battle_over',
+            'winner': self.battle_manager.get_winner()
+        })
+
+    def send_events(self):
+        # Voicelines are already part of the action result
+        for event in self.events.drain():
+            if event.kind not in (VOICELINE, SPECIAL):
+                self.send_chat(event.text)
+
+    def broadcast_new_turn(self, name: str):
+        self.broadcast({
+            'type': 'new_turn',
+            'name': name
+        })
+
+    def broadcast_state(self):
+        delta = self.state_stream.update(self.battle_manager.get_battle_state())
+        if delta is not None:
+            self.broadcast(delta, state=True)
+
+    def snapshot_frame(self):
+        if not self.state_stream.seq:
+            return None
+        return encode_json(self.state_stream.snapshot())
+
+    def send_snapshot(self, client):
+        frame = self.snapshot_frame()
+        if frame is not None:
+            client.send(frame, state=True)
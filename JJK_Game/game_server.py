@@ -1,165 +1,146 @@
-import socket
-import json
-from threading import Thread, Lock
-from JJK_Game.battle_manager import BattleManager
-from JJK_Game.character_factory import CharacterFactory
+import asyncio
+from JJK_Game.bot_pool import BotPool, BOT_WORKERS
+from JJK_Game.chat_relay import ChatRelay
+from JJK_Game.client_connection import ClientConnection
+from JJK_Game.framing import encode_json, read_json
+from JJK_Game.game_room import GameRoom, TurnDeadlines, MAX_PLAYERS, CHARACTER_NAMES
+from JJK_Game.match_log import MatchLogWriter
+from JJK_Game.timer_wheel import TimerWheel
 
 HOST = '0.0.0.0'
 PORT = 5555
-MAX_PLAYERS = 5
+CHAT_HOST = 'localhost'
+CHAT_PORT = 12345
+DEFAULT_ROOM = 'default'
 
 
 class GameServer:
-    def __init__(self):
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.bind((HOST, PORT))
-        self.server_socket.listen(MAX_PLAYERS)
-
-        self.chat_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.chat_socket.connect(('localhost', 12345))
-
-        self.clients = []
-        self.client_threads = []
-        self.messages = []
-        self.player_names = {}
-        self.lock = Lock()
-
-        self.available_characters = [
-            CharacterFactory().create_character(c)
-            for c in ['Gojo', 'Megumi', 'Nanami', 'Nobara', 'Sukuna']
-        ]
-        self.battle_manager = BattleManager(self.available_characters)
-        self.game_started = False
+    def __init__(self, host=HOST, port=PORT, chat_host=CHAT_HOST, chat_port=CHAT_PORT, deadlines=None,
+                 match_log=None, fill_seats=0, bot_workers=BOT_WORKERS, bot_processes=True, max_players=MAX_PLAYERS,
+                 repeat_characters=None):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.chat = ChatRelay(chat_host, chat_port)
+        self.timers = TimerWheel()
+        self.deadlines = deadlines or TurnDeadlines()
+        # Finished matches are appended here when a path is given
+        self.match_log = MatchLogWriter(match_log) if match_log else None
+        # Rooms started with fewer players get CPU players up to this many seats
+        self.fill_seats = fill_seats
+        # Lobbies larger than the character pool need characters to repeat, so that is the default for them
+        self.max_players = max_players
+        self.repeat_characters = max_players > len(CHARACTER_NAMES) if repeat_characters is None else repeat_characters
+        if max_players > len(CHARACTER_NAMES) and not self.repeat_characters:
+            raise ValueError(f"Rooms of more than {len(CHARACTER_NAMES)} players need repeat_characters.")
+        self.bots = BotPool(bot_workers, processes=bot_processes)
+        self.rooms = {}
 
     def send_chat(self, msg):
-        self.chat_socket.send(f'[SERVER]: {msg}'.encode())
+        self.chat.send(f'[SERVER]: {msg}')
 
     def start(self):
-        Thread(target=self.accept_clients, daemon=True).start()
-
-        while not self.game_started:
-            with self.lock:
-                for msg in list(self.messages):
-                    if msg.get("type") == "start":
-                        self.game_started = True
-                        self.messages.remove(msg)
-                        break
-
-        self.broadcast({"type": "status", "msg": "Game is starting..."})
-        self.handle_character_selection()
-        self.run_battle()
-
-    def accept_clients(self):
-
-        while len(self.clients) < MAX_PLAYERS:
-            client_socket, _ = self.server_socket.accept()
-            self.clients.append(client_socket)
-            thread = Thread(target=self.handle_client, args=(client_socket,), daemon=True)
-            self.client_threads.append(thread)
-            thread.start()
-
-    def handle_client(self, client_socket):
-        buffer = b''
-        while True:
-            try:
-                data = client_socket.recv(1024)
-                if not data:
-                    break
-                buffer += data
-
-                while b'\n' in buffer:
-                    line, _, buffer = buffer.partition(b'\n')
-                    msg = json.loads(line)
-
-                    if msg.get("type") == "join":
-                        self.player_names[client_socket] = msg["player_name"]
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.chat.start()
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.close_match_log()
+            self.timers.close()
+            self.bots.close()
+            await self.chat.close()
+
+    def close_match_log(self):
+        # Matches still running are written up to where they stopped
+        for room in list(self.rooms.values()):
+            room.recorder.close()
+        if self.match_log is not None:
+            self.match_log.close()
+
+    def join_room(self, room_id):
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = GameRoom(self, room_id)
+            room.task = asyncio.create_task(room.run())
+            room.task.add_done_callback(lambda _: self.close_room(room))
+        if room.game_started or room.is_full():
+            return None
+        return room
+
+    def rejoin_room(self, room_id, client, player_name):
+        # A player of a running match who lost their connection takes their held seat back
+        room = self.rooms.get(room_id)
+        if room is None or room.task.done():
+            return None, None
+        mailbox = room.reclaim_seat(client, player_name)
+        return (room, mailbox) if mailbox is not None else (None, None)
+
+    def leave_room(self, room, client):
+        room.remove_client(client)
+        # Nobody is left to press start, so the room would wait forever
+        if not room.has_humans() and not room.game_started:
+            room.task.cancel()
+
+    def close_room(self, room):
+        if self.rooms.get(room.room_id) is room:
+            del self.rooms[room.room_id]
+
+    async def handle_client(self, reader, writer):
+        client = ClientConnection(writer)
+        room = None
+        mailbox = None
+        try:
+            while (msg := await read_json(reader)) is not None:
+                if room is not None and room.task.done():
+                    # The match is over, so the client is free to join another room
+                    self.leave_room(room, client)
+                    room = None
+                    mailbox = None
+
+                if msg.get("type") == "join":
+                    if room is not None:
+                        continue
+                    room_id = msg.get("room", DEFAULT_ROOM)
+                    room = self.join_room(room_id)
+                    if room is None:
+                        room, mailbox = self.rejoin_room(room_id, client, msg["player_name"])
+                        if room is None:
+                            writer.write(encode_json({"type": "error", "msg": "Room is full or already playing."}))
+                            break
                         continue
+                    mailbox = room.add_client(client, msg["player_name"])
+                    continue
 
-                    msg["__client"] = client_socket
-                    with self.lock:
-                        self.messages.append(msg)
+                if room is None:
+                    continue
 
-            except Exception as e:
-                self.send_chat(f"An error occurred: {str(e)}")
-                break
+                if msg.get("type") == "start":
+                    room.start_requested.set()
+                    continue
 
-    def send_json(self, sock, data):
-        try:
-            sock.sendall(json.dumps(data).encode() + b'\n')
-        except:
-            pass
+                if msg.get("type") == "add_cpu":
+                    if room.add_cpu() is None:
+                        client.send_json({"type": "error", "msg": "No free seat for a CPU player."})
+                    continue
+
+                if msg.get("type") == "resync":
+                    room.send_snapshot(client)
+                    continue
 
-    def broadcast(self, message):
-        for client in self.clients:
-            self.send_json(client, message)
-
-    def wait_for_message(self, client_socket, expected_type):
-        while True:
-            with self.lock:
-                for msg in list(self.messages):
-                    if msg.get("type") == expected_type and msg["__client"] == client_socket:
-                        self.messages.remove(msg)
-                        return msg
-
-    def handle_character_selection(self):
-        for client in self.clients:
-            descriptions = [{'name': c.name, 'description': c.get_description()} for c in self.available_characters]
-            self.send_json(client, {
-                'type': 'character_selection',
-                'descriptions': descriptions,
-            })
-
-            msg = self.wait_for_message(client, 'character_choice')
-            char_name = msg['character']
-            chosen = self.battle_manager.assign_character(char_name)
-            self.available_characters = [c for c in self.available_characters if not c.name == char_name]
-            self.send_chat(f"{self.player_names[client]} has selected {char_name}.")
-
-    def run_battle(self):
-        self.battle_manager.start_battle()
-
-        while not self.battle_manager.is_battle_over():
-            player = self.battle_manager.get_current_player()
-            self.broadcast_new_turn(player.name)
-            if not player:
-                break
-            client = self.clients[self.battle_manager._BattleManager__players.index(player)]
-
-            if self.battle_manager.handle_status_effects(player):
-                self.battle_manager.advance_turn()
-                continue
-
-            self.send_json(client, {'type': 'action_selection'})
-            action_msg = self.wait_for_message(client, 'action')
-            action = action_msg['action']
-
-            target = None
-            if action in ('attack', 'special'):
-                targets = self.battle_manager.get_alive_targets(exclude=player)
-                self.send_json(client, {
-                    'type': 'target_selection',
-                    'targets': targets
-                })
-                target_msg = self.wait_for_message(client, 'target')
-                target = self.battle_manager.get_target_by_name(target_msg['target'])
-
-            self.send_chat(self.battle_manager.apply_action(player, action, target))
-            self.battle_manager.advance_turn()
-            self.broadcast_state()
-
-        self.broadcast({
-            'type': 'battle_over',
-            'winner': self.battle_manager.get_winner()
-        })
-
-    def broadcast_new_turn(self, name: str):
-        self.broadcast({
-            'type': 'new_turn',
-            'name': name
-        })
-
-    def broadcast_state(self):
-        self.broadcast({
-            'type': 'game_state',
-            'state': self.battle_manager.get_battle_state()
-        })
\ No newline at end of file
+                mailbox.put(msg)
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            self.send_chat(f"An error occurred: {str(e)}")
+        finally:
+            if room is not None:
+                self.leave_room(room, client)
+            # Players of a running match keep their seat until it ends
+            if room is None or not room.game_started or room.task.done():
+                client.close()
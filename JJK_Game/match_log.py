@@ -0,0 +1,326 @@
+import mmap
+import os
+import struct
+from typing import BinaryIO, List, Optional, Tuple
+from JJK_Game.battle_manager import MatchRecorder, base_name, seat_names
+from JJK_Game.character_factory import CharacterFactory
+from JJK_Game.replay import MatchRecord
+
+# Record kinds
+SEAT = 0  # A player took a seat. code is the character's factory index
+TICK = 1  # Status effects were handled at the start of a turn. code is 1 if the turn was skipped, value the hp left
+ACTION = 2  # An action was applied. code is the action, value the target's hp left or -1 without a target
+ADVANCE = 3  # The turn counter moved on. turn is the new turn
+
+ACTIONS = ['attack', 'defend', 'special']
+UNKNOWN_ACTION = 255
+NO_TARGET = -1
+
+# kind, seat, code, target seat, turn, value: 14 bytes, little-endian on every platform.
+# Seats take two bytes so lobbies can have far more than 127 players
+RECORD = struct.Struct('<BHBhIi')
+TURN_OFFSET = struct.calcsize('<BHBh')
+# first record, record count, turns played, seed
+INDEX_ENTRY = struct.Struct('<QIIQ')
+INDEX_SUFFIX = '.idx'
+
+# Both files start with a header: magic, format version and the size of their entries.
+# Bump LOG_VERSION whenever RECORD or INDEX_ENTRY change, version 1 was the headerless log of 12-byte records
+LOG_MAGIC = b'JJKLOG'
+LOG_VERSION = 2
+HEADER = struct.Struct('<6sHH')
+
+
+def character_names() -> List[str]:
+    """
+    :return: The in game names of the characters, in the factory's order. A SEAT record stores the position.
+    """
+    factory = CharacterFactory()
+    return [factory.create_character(name).name for name in factory.get_character_names()]
+
+
+def header(entry: struct.Struct) -> bytes:
+    """
+    :param entry: RECORD for the log, INDEX_ENTRY for its index.
+    :return: The header a file of this format starts with.
+    """
+    return HEADER.pack(LOG_MAGIC, LOG_VERSION, entry.size)
+
+
+def check_header(data: bytes, entry: struct.Struct, path: str) -> None:
+    """
+    Makes sure a file was written in this version of the format, rather than misreading its entries.
+    :param data: The start of the file, at least the header.
+    :param entry: RECORD for the log, INDEX_ENTRY for its index.
+    :param path: The file, for the error message.
+    :return: None
+    :raises ValueError: If the file has no header or one of another version.
+    """
+    if len(data) < HEADER.size or bytes(data[:len(LOG_MAGIC)]) != LOG_MAGIC:
+        raise ValueError(f"'{path}' has no match log header, it is not a match log or was written by a version "
+                         f"before {LOG_VERSION}. Start a new log.")
+    _, version, size = HEADER.unpack_from(data)
+    if version != LOG_VERSION or size != entry.size:
+        raise ValueError(f"'{path}' is a version {version} match log with {size}-byte entries, this version reads "
+                         f"version {LOG_VERSION} with {entry.size}-byte entries. Start a new log.")
+
+
+class MatchBuffer(MatchRecorder):
+    """
+    Collects the records of one match in memory. Matches of a server run concurrently, so each one is
+    written to the log in a single append when it ends and its records stay contiguous.
+    """
+
+    # region Constructor
+    def __init__(self, log: 'MatchLogWriter') -> None:
+        """
+        :param log: The log the match is appended to when the buffer is closed.
+        """
+        self.log: 'MatchLogWriter' = log
+        self.data: bytearray = bytearray()
+        self.seed: int = 0
+        self.turns: int = 0
+        self.closed: bool = False
+
+    # endregion
+
+    # region Methods
+    def start(self, seed: int, players: List[str]) -> None:
+        self.data.clear()
+        self.seed = seed
+        self.turns = 0
+        for seat, name in enumerate(players):
+            self.data += RECORD.pack(SEAT, seat, self.log.character_index(name), NO_TARGET, 0, 0)
+
+    def tick(self, turn: int, seat: int, hp: int, skipped: bool) -> None:
+        self.data += RECORD.pack(TICK, seat, skipped, NO_TARGET, turn, hp)
+
+    def action(self, turn: int, seat: int, action: str, target: Optional[int], hp: Optional[int]) -> None:
+        code = ACTIONS.index(action) if action in ACTIONS else UNKNOWN_ACTION
+        self.data += RECORD.pack(ACTION, seat, code, NO_TARGET if target is None else target, turn,
+                                 -1 if hp is None else hp)
+
+    def advance(self, turn: int) -> None:
+        self.turns = turn
+        self.data += RECORD.pack(ADVANCE, 0, 0, NO_TARGET, turn, 0)
+
+    def close(self) -> None:
+        """
+        Appends the match to the log. Closing twice, or closing a match that never started, writes nothing.
+        :return: None
+        """
+        if not self.closed and self.data:
+            self.log.append(self.data, self.turns, self.seed)
+        self.closed = True
+
+    # endregion
+
+
+class MatchLogWriter:
+    """
+    Appends finished matches to a binary log of fixed-width records, with the offset of each match in a sidecar index.
+    """
+
+    # region Constructor
+    def __init__(self, path: str) -> None:
+        """
+        Opens the log for appending, creating it and its index if needed.
+        :param path: The log file. The index is written next to it with an .idx suffix.
+        :raises ValueError: If the log or its index exists in another version of the format.
+        """
+        self.path: str = path
+        self.records: BinaryIO = self.__open(path, RECORD)
+        try:
+            self.index: BinaryIO = self.__open(path + INDEX_SUFFIX, INDEX_ENTRY)
+        except ValueError:
+            self.records.close()
+            raise
+        # A crash between the two writes of append() can leave records no index entry points to
+        self.count: int = (self.records.tell() - HEADER.size) // RECORD.size
+        self.__characters = {name: i for i, name in enumerate(character_names())}
+
+    # endregion
+
+    # region Methods
+    @staticmethod
+    def __open(path: str, entry: struct.Struct) -> BinaryIO:
+        # A new file gets the header, an existing one is only appended to if it has the same format
+        file = open(path, 'ab')
+        if file.tell() == 0:
+            file.write(header(entry))
+            file.flush()
+            return file
+        with open(path, 'rb') as existing:
+            start = existing.read(HEADER.size)
+        try:
+            check_header(start, entry, path)
+        except ValueError:
+            file.close()
+            raise
+        return file
+
+    def character_index(self, name: str) -> int:
+        # Repeated characters are logged as the character, their copy numbers follow from the seat order
+        return self.__characters[base_name(name)]
+
+    def open_match(self) -> MatchBuffer:
+        return MatchBuffer(self)
+
+    def append(self, data: bytes, turns: int, seed: int) -> None:
+        """
+        Appends the records of one match, then its index entry, so a reader never sees an entry without its records.
+        :param data: The packed records.
+        :param turns: The number of turns played.
+        :param seed: The seed of the match.
+        :return: None
+        """
+        self.records.write(data)
+        self.records.flush()
+        self.index.write(INDEX_ENTRY.pack(self.count, len(data) // RECORD.size, turns, seed))
+        self.index.flush()
+        self.count += len(data) // RECORD.size
+
+    def close(self) -> None:
+        self.records.close()
+        self.index.close()
+
+    # endregion
+
+
+class MatchView:
+    """
+    One match of a memory-mapped log. Records are unpacked only when they are read.
+    """
+
+    # region Constructor
+    def __init__(self, reader: 'MatchLogReader', first: int, count: int, turns: int, seed: int) -> None:
+        self.reader: 'MatchLogReader' = reader
+        self.first: int = first
+        self.count: int = count
+        self.turns: int = turns
+        self.seed: int = seed
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> Tuple[int, int, int, int, int, int]:
+        """
+        :param i: The position of the record in this match.
+        :return: kind, seat, code, target, turn and value of the record.
+        """
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return RECORD.unpack_from(self.reader.records, self.offset(i))
+
+    # endregion
+
+    # region Methods
+    def offset(self, i: int) -> int:
+        # Records follow the header of the log
+        return HEADER.size + (self.first + i) * RECORD.size
+
+    def turn_of(self, i: int) -> int:
+        # The turn field sits after the kind, seat, code and target fields
+        return struct.unpack_from('<I', self.reader.records, self.offset(i) + TURN_OFFSET)[0]
+
+    def seek(self, turn: int) -> int:
+        """
+        Finds where a turn starts with a binary search, the turn field never decreases within a match.
+        :param turn: The turn to find.
+        :return: The position of the turn's first record, len(self) if the match ended before it.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.turn_of(middle) < turn:
+                low = middle + 1
+            else:
+                high = middle
+        # An ADVANCE record carries the turn it starts, the turn's own records come after it
+        if low < self.count and self[low][0] == ADVANCE:
+            low += 1
+        return low
+
+    def players(self) -> List[str]:
+        """
+        :return: The names of the characters in seat order, as shown in game.
+        """
+        names = self.reader.character_names
+        seats = []
+        for record in self:
+            if record[0] != SEAT:
+                break
+            seats.append(names[record[2]])
+        return seat_names(seats)
+
+    def actions(self) -> List[Tuple[int, str, Optional[int]]]:
+        """
+        :return: The action log of the match in the format of BattleManager.get_action_log().
+        """
+        return [(seat, ACTIONS[code] if code < len(ACTIONS) else '', None if target == NO_TARGET else target)
+                for kind, seat, code, target, _, _ in self if kind == ACTION]
+
+    def record(self) -> MatchRecord:
+        """
+        :return: What the replay engine needs to play this match again.
+        """
+        return MatchRecord(self.players(), self.seed, self.actions())
+
+    # endregion
+
+
+class MatchLogReader:
+    """
+    Memory-maps a match log and its index, so any match and turn can be read without parsing the rest of the file.
+    """
+
+    # region Constructor
+    def __init__(self, path: str) -> None:
+        """
+        :param path: The log file written by MatchLogWriter.
+        :raises ValueError: If the log or its index was written in another version of the format.
+        """
+        self.character_names: List[str] = character_names()
+        self.__files = [open(path, 'rb'), open(path + INDEX_SUFFIX, 'rb')]
+        self.records = self.__map(self.__files[0])
+        self.index = self.__map(self.__files[1])
+        try:
+            check_header(self.records, RECORD, path)
+            check_header(self.index, INDEX_ENTRY, path + INDEX_SUFFIX)
+        except ValueError:
+            self.close()
+            raise
+        self.matches: int = (len(self.index) - HEADER.size) // INDEX_ENTRY.size
+
+    def __len__(self) -> int:
+        return self.matches
+
+    def __getitem__(self, i: int) -> MatchView:
+        if not 0 <= i < self.matches:
+            raise IndexError(i)
+        return MatchView(self, *INDEX_ENTRY.unpack_from(self.index, HEADER.size + i * INDEX_ENTRY.size))
+
+    def __enter__(self) -> 'MatchLogReader':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    # endregion
+
+    # region Methods
+    @staticmethod
+    def __map(file: BinaryIO):
+        # Empty files cannot be mapped, an empty bytes object reads the same way
+        if os.fstat(file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        for mapped in (self.records, self.index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        for file in self.__files:
+            file.close()
+
+    # endregion
@@ -0,0 +1,125 @@
+import argparse
+import functools
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+from JJK_Game.action import damage_after_defense
+from JJK_Game.character import Character
+from JJK_Game.character_factory import CharacterFactory
+
+# Damage against a defender without and with its defense boost
+Hit = Tuple[int, int]
+# Stats a balance sweep may change
+TUNABLE = ('hp', 'attack', 'base_defense', 'boost', 'cooldown', 'power')
+# Changed stats by factory name, e.g. {'Gojo': {'attack': 30}}
+Overrides = Dict[str, Dict[str, int]]
+
+
+def tuned_stats(character: Character, overrides: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    :param character: A character as the catalog describes it.
+    :param overrides: Stats to use instead of the catalog's.
+    :return: Every tunable stat of the character.
+    :raises ValueError: If an override is not a tunable stat.
+    """
+    stats = {
+        'hp': character.hp,
+        'attack': character.attack_damage,
+        'base_defense': character.defense,
+        'boost': character._defense_move.boost,
+        'cooldown': character.special_move.cooldown,
+        'power': character.special_move.power
+    }
+    for stat, value in (overrides or {}).items():
+        if stat not in stats:
+            raise ValueError(f"'{stat}' is not a tunable stat, expected one of {', '.join(TUNABLE)}.")
+        stats[stat] = value
+    return stats
+
+
+class MatchupTable:
+    """
+    The damage each character's attack and special deal to every character, worked out once from the character classes.
+    Defense only ever takes two values, the base and the boosted one, so a hit is fully known ahead of the battle.
+    Random effects of specials are not included, a special's entry is what it deals whenever it deals damage.
+    """
+
+    # region Constructor
+    def __init__(self, names: Sequence[str], overrides: Optional[Overrides] = None) -> None:
+        """
+        :param names: Factory names of the characters to include, in the order of the table.
+        :param overrides: Stats to use instead of the catalog's, for balance work.
+        :raises ValueError: If a name or an overridden stat is unknown.
+        """
+        factory = CharacterFactory()
+        characters: List[Character] = [factory.create_character(name) for name in names]
+        stats = [tuned_stats(c, (overrides or {}).get(name)) for name, c in zip(names, characters)]
+        self.names: List[str] = list(names)
+        self.kinds: Dict[type, int] = {type(c): kind for kind, c in enumerate(characters)}
+        self.defense: List[Hit] = [(s['base_defense'], s['base_defense'] + s['boost']) for s in stats]
+        self.attack: List[List[Hit]] = [
+            [tuple(damage_after_defense(s['attack'], defense) for defense in d) for d in self.defense]
+            for s in stats]
+        self.special: List[List[Hit]] = [
+            [tuple(damage_after_defense(s['power'], defense, a.special_move.pierces) for defense in d)
+             for d in self.defense]
+            for a, s in zip(characters, stats)]
+        # Per attacker, one {defense: damage} per defender, the form actions look their hits up in
+        self.attack_hits: List[List[Dict[int, int]]] = [self.__hits(row) for row in self.attack]
+        self.special_hits: List[List[Dict[int, int]]] = [self.__hits(row) for row in self.special]
+
+    # endregion
+
+    # region Methods
+    def __hits(self, row: List[Hit]) -> List[Dict[int, int]]:
+        return [dict(zip(defense, hit)) for defense, hit in zip(self.defense, row)]
+
+    def kind(self, character: Character) -> int:
+        """
+        :param character: Any character.
+        :return: Its row in the table, -1 if its class is not in it.
+        """
+        return self.kinds.get(type(character), -1)
+
+    def to_dict(self) -> dict:
+        """
+        :return: The table keyed by factory name, for tools reading it as JSON.
+        """
+        def grid(rows: List[List[Hit]]) -> dict:
+            return {a: {d: {'base': hit[0], 'boosted': hit[1]} for d, hit in zip(self.names, row)}
+                    for a, row in zip(self.names, rows)}
+        return {
+            'characters': self.names,
+            'defense': {name: {'base': d[0], 'boosted': d[1]} for name, d in zip(self.names, self.defense)},
+            'attack': grid(self.attack),
+            'special': grid(self.special)
+        }
+
+    def format(self) -> str:
+        """
+        :return: Both tables as text, attackers down and defenders across, as base/boosted damage.
+        """
+        lines = []
+        for title, rows in (('attack', self.attack), ('special', self.special)):
+            lines.append(f"{title:<10}" + ''.join(f"{name:>10}" for name in self.names))
+            for name, row in zip(self.names, rows):
+                lines.append(f"{name:<10}" + ''.join(f"{f'{hit[0]}/{hit[1]}':>10}" for hit in row))
+            lines.append('')
+        return '\n'.join(lines)
+
+    # endregion
+
+
+@functools.cache
+def get_table() -> MatchupTable:
+    """
+    :return: The table of every character of the factory, built on first use and shared afterwards.
+    """
+    return MatchupTable(CharacterFactory().get_character_names())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print the damage every JJK character deals to every other.')
+    parser.add_argument('--json', action='store_true', help='Print the table as JSON')
+    args = parser.parse_args()
+    table = get_table()
+    print(json.dumps(table.to_dict(), indent=2) if args.json else table.format())
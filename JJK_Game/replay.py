@@ -0,0 +1,150 @@
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+from JJK_Game.battle_events import EventSink, NullSink
+from JJK_Game.battle_manager import BattleManager, LoggedAction, base_name
+from JJK_Game.character_factory import CharacterFactory
+
+
+class ReplayError(Exception):
+    """
+    Raised when an action log does not fit the match its seed produces.
+    """
+
+
+class MatchRecord:
+    """
+    Everything needed to re-derive a match: the lineup, the seed and the actions in the order they were applied.
+    The winner and final hit points are kept so a replay can be checked against them.
+    """
+
+    # region Constructor
+    def __init__(self, players: List[str], seed: int, actions: List[LoggedAction], winner: Optional[str] = None,
+                 hp: Optional[List[int]] = None) -> None:
+        """
+        :param players: The character names in seat order, as shown in the game.
+        :param seed: The seed of the match's random generator.
+        :param actions: The actor seat, action and target seat of every action applied.
+        :param winner: The name of the winner, None if the match had none.
+        :param hp: The final hit points in seat order.
+        """
+        self.players: List[str] = players
+        self.seed: int = seed
+        self.actions: List[LoggedAction] = actions
+        self.winner: Optional[str] = winner
+        self.hp: Optional[List[int]] = hp
+
+    # endregion
+
+    # region Methods
+    @classmethod
+    def from_manager(cls, manager: BattleManager) -> 'MatchRecord':
+        """
+        Records the match a BattleManager has played so far.
+        :param manager: The manager of the match.
+        :return: The record.
+        """
+        state = manager.get_battle_state()
+        return cls([p['name'] for p in state['players']], manager.get_seed(), list(manager.get_action_log()),
+                   manager.get_winner() if manager.is_battle_over() else None, [p['hp'] for p in state['players']])
+
+    def to_dict(self) -> dict:
+        return {'players': self.players, 'seed': self.seed, 'actions': self.actions, 'winner': self.winner,
+                'hp': self.hp}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MatchRecord':
+        actions = [(seat, action, target) for seat, action, target in data['actions']]
+        return cls(data['players'], data['seed'], actions, data.get('winner'), data.get('hp'))
+
+    # endregion
+
+
+# region Helpers
+_factory_names: Dict[str, str] = {}
+
+
+def factory_name(character_name: str) -> str:
+    """
+    Finds the factory name of a character from the name it shows in game, e.g. Gojo for Satoru Gojo #2.
+    :param character_name: The in game name.
+    :return: The name CharacterFactory creates it by.
+    :raises ReplayError: If no character has that name.
+    """
+    if not _factory_names:
+        factory = CharacterFactory()
+        _factory_names.update({factory.create_character(name).name: name for name in factory.get_character_names()})
+    name = base_name(character_name)
+    if name not in _factory_names:
+        raise ReplayError(f"Unknown character '{character_name}'.")
+    return _factory_names[name]
+
+
+# endregion
+
+def replay(record: MatchRecord, sink: Optional[EventSink] = None) -> BattleManager:
+    """
+    Plays the logged actions again, driving the BattleManager the way GameRoom does.
+    Stunned turns are not logged, they are skipped again because the seed reproduces the same stuns.
+    Status effects keep ticking after the last logged action until a turn would need an action, as in GameRoom.
+    :param record: The match to replay.
+    :param sink: Where the replayed events go, default is to discard them.
+    :return: The manager at the end of the replayed match.
+    :raises ReplayError: If an action is logged for the wrong seat or after the battle ended.
+    """
+    factory = CharacterFactory()
+    characters = [factory.create_character(factory_name(name)) for name in record.players]
+    manager = BattleManager(characters, sink=sink or NullSink(), seed=record.seed)
+    for c in characters:
+        manager.assign_character(c.name)
+    manager.start_battle()
+
+    actions = record.actions
+    applied = 0
+    while not manager.is_battle_over():
+        player = manager.get_current_player()
+        if manager.handle_status_effects(player):
+            manager.advance_turn()
+            continue
+        if applied == len(actions):
+            # A turn no action was logged for, the match ended or was left here
+            break
+        seat, action, target = actions[applied]
+        if seat != manager.get_seat(player):
+            raise ReplayError(f"Action {applied} was logged for seat {seat}, but it is seat "
+                              f"{manager.get_seat(player)}'s turn.")
+        manager.apply_action(player, action, None if target is None else characters[target])
+        manager.advance_turn()
+        applied += 1
+    if applied < len(actions):
+        raise ReplayError(f"The battle ended after {applied} of {len(actions)} logged actions.")
+    return manager
+
+
+def verify(record: MatchRecord) -> bool:
+    """
+    Checks that replaying a record ends with the recorded winner and hit points.
+    :param record: The match to check.
+    :return: True if the replay matches, False if it does not or the log does not fit the match.
+    """
+    try:
+        replayed = MatchRecord.from_manager(replay(record))
+    except ReplayError:
+        return False
+    return replayed.winner == record.winner and (record.hp is None or replayed.hp == record.hp)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verify JJK match records by replaying them.')
+    parser.add_argument('records', help='A JSON file with a list of match records')
+    args = parser.parse_args()
+
+    with open(args.records) as f:
+        records = [MatchRecord.from_dict(data) for data in json.load(f)]
+    start = time.perf_counter()
+    failed = [i for i, record in enumerate(records) if not verify(record)]
+    elapsed = time.perf_counter() - start
+    print(f"Verified {len(records)} records in {elapsed:.2f}s ({len(records) / max(elapsed, 1e-9):.0f}/s)")
+    for i in failed:
+        print(f"Record {i} does not replay to its recorded outcome.")
@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+from JJK_Game.framing import split_frame
+from JJK_Game.bot_pool import BOT_WORKERS
+from JJK_Game.game_room import MAX_PLAYERS
+from JJK_Game.game_server import GameServer, HOST, PORT, CHAT_HOST, CHAT_PORT, DEFAULT_ROOM
+
+JOIN_TIMEOUT = 10.0
+MAX_JOIN_BYTES = 64 * 1024
+MAX_NOTICE_BYTES = 4096
+
+
+def handoff_room(frame):
+    """
+    A connection belongs to the room of its join message, anything else goes to the default room.
+    :raises ValueError: If the frame is not a JSON object, or names a room that is not a string.
+    """
+    msg = json.loads(frame)
+    if not isinstance(msg, dict):
+        raise ValueError('A message must be a JSON object.')
+    if msg.get('type') != 'join':
+        return DEFAULT_ROOM
+    room_id = msg.get('room', DEFAULT_ROOM)
+    if not isinstance(room_id, str):
+        raise ValueError('A room id must be a string.')
+    return room_id
+
+
+class ShardWorker(GameServer):
+    """
+    A GameServer that hosts rooms in a worker process.
+    Connections arrive as file descriptors from the front acceptor instead of from its own listener.
+    """
+
+    def __init__(self, control: socket.socket, chat_host=CHAT_HOST, chat_port=CHAT_PORT, match_log=None,
+                 fill_seats=0, bot_workers=BOT_WORKERS, max_players=MAX_PLAYERS):
+        # Daemonic workers cannot start processes of their own, so their bots think on threads
+        super().__init__(chat_host=chat_host, chat_port=chat_port, match_log=match_log, fill_seats=fill_seats,
+                         bot_workers=bot_workers, bot_processes=False, max_players=max_players)
+        self.control = control
+        # Handed off connections that have not joined their room yet, by room id and by the task adopting them.
+        # A room they are headed for is not reported closed, they would open it again
+        self.arriving = {}
+        self.arrivals = {}
+
+    async def serve(self):
+        self.chat.start()
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        self.control.setblocking(False)
+        loop.add_reader(self.control.fileno(), self.receive_handoff, stopped)
+        try:
+            await stopped
+        finally:
+            self.close_match_log()
+            self.timers.close()
+            self.bots.close()
+            await self.chat.close()
+
+    def receive_handoff(self, stopped):
+        try:
+            data, fds, _, _ = socket.recv_fds(self.control, MAX_JOIN_BYTES, 1)
+        except BlockingIOError:
+            return
+        if not data:
+            # The front acceptor went away, nothing new will ever arrive
+            asyncio.get_running_loop().remove_reader(self.control.fileno())
+            stopped.set_result(None)
+            return
+        room_id = handoff_room(split_frame(data))
+        self.arriving[room_id] = self.arriving.get(room_id, 0) + 1
+        # Tells the acceptor the handoff is here, from now on this worker decides when the room is closed
+        self.notify({'adopted': room_id})
+        task = asyncio.create_task(self.adopt(socket.socket(fileno=fds[0]), data))
+        self.arrivals[task] = room_id
+
+    async def adopt(self, sock, data):
+        try:
+            await self.handle_adopted(sock, data)
+        finally:
+            self.settle(asyncio.current_task())
+
+    async def handle_adopted(self, sock, data):
+        loop = asyncio.get_running_loop()
+        # Replay the bytes the acceptor already read before the socket delivers anything new
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        protocol = asyncio.StreamReaderProtocol(reader)
+        transport, _ = await loop.connect_accepted_socket(lambda: protocol, sock)
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        await self.handle_client(reader, writer)
+
+    def join_room(self, room_id):
+        room = super().join_room(room_id)
+        self.settle(asyncio.current_task())
+        return room
+
+    def settle(self, task):
+        # The adopted connection joined its room or gave up, the room may be reported closed again
+        room_id = self.arrivals.pop(task, None)
+        if room_id is None:
+            return
+        self.arriving[room_id] -= 1
+        if not self.arriving[room_id]:
+            del self.arriving[room_id]
+            if room_id not in self.rooms:
+                self.notify({'closed': room_id})
+
+    def close_room(self, room):
+        super().close_room(room)
+        if room.room_id not in self.rooms and room.room_id not in self.arriving:
+            self.notify({'closed': room.room_id})
+
+    def notify(self, notice):
+        try:
+            self.control.send(json.dumps(notice).encode())
+        except OSError:
+            pass
+
+
+class ShardedGameServer:
+    """
+    Front acceptor that reads each client's join message and hands the socket to the worker owning its room.
+    """
+
+    def __init__(self, workers=None, host=HOST, port=PORT, chat_host=CHAT_HOST, chat_port=CHAT_PORT, match_log=None,
+                 fill_seats=0, bot_workers=BOT_WORKERS, max_players=MAX_PLAYERS):
+        self.host = host
+        self.port = port
+        self.chat_host = chat_host
+        self.chat_port = chat_port
+        self.match_log = match_log  # each worker appends to its own file, suffixed with its index
+        self.fill_seats = fill_seats
+        self.bot_workers = bot_workers  # per worker process
+        self.max_players = max_players
+        self.worker_count = workers or os.cpu_count() or 1
+        self.server = None
+        self.workers = []
+        self.controls = []
+        self.routes = {}  # room id -> worker index
+        self.loads = []  # rooms owned by each worker
+        # Handoffs sent to a worker it has not acknowledged yet, by room id. A room closed meanwhile is opened again
+        # by the arriving connection, so its route must outlive the closed notice
+        self.pending = {}
+
+    def start(self):
+        asyncio.run(self.serve())
+
+    def start_workers(self):
+        for index in range(self.worker_count):
+            control, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            # Spawned rather than forked, the acceptor's event loop must not leak into the workers
+            process = multiprocessing.get_context('spawn').Process(
+                target=run_worker, daemon=True,
+                args=(child, self.chat_host, self.chat_port, self.worker_log(index), self.fill_seats, self.bot_workers,
+                      self.max_players))
+            process.start()
+            child.close()
+            self.workers.append(process)
+            self.controls.append(control)
+            self.loads.append(0)
+
+    def worker_log(self, index):
+        return f'{self.match_log}.{index}' if self.match_log else None
+
+    async def serve(self):
+        self.start_workers()
+        loop = asyncio.get_running_loop()
+        for index, control in enumerate(self.controls):
+            control.setblocking(False)
+            loop.add_reader(control.fileno(), self.receive_notice, index)
+
+        listener = socket.create_server((self.host, self.port), backlog=1024)
+        listener.setblocking(False)
+        self.server = listener
+        try:
+            while True:
+                client, _ = await loop.sock_accept(listener)
+                asyncio.create_task(self.route(client))
+        finally:
+            listener.close()
+            self.stop_workers()
+
+    def stop_workers(self):
+        for control in self.controls:
+            asyncio.get_running_loop().remove_reader(control.fileno())
+            control.close()
+        for process in self.workers:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+
+    def owner(self, room_id):
+        index = self.routes.get(room_id)
+        if index is None:
+            index = min(range(self.worker_count), key=self.loads.__getitem__)
+            self.routes[room_id] = index
+            self.loads[index] += 1
+        return index
+
+    def release(self, room_id, index):
+        if self.routes.get(room_id) == index and not self.pending.get(room_id):
+            del self.routes[room_id]
+            self.loads[index] -= 1
+
+    def receive_notice(self, index):
+        try:
+            payload = self.controls[index].recv(MAX_NOTICE_BYTES)
+        except BlockingIOError:
+            return
+        if not payload:
+            return
+        notice = json.loads(payload)
+        if 'adopted' in notice:
+            room_id = notice['adopted']
+            self.pending[room_id] -= 1
+            if not self.pending[room_id]:
+                del self.pending[room_id]
+        else:
+            self.release(notice['closed'], index)
+
+    async def route(self, client):
+        loop = asyncio.get_running_loop()
+        data = bytearray()
+        try:
+            while (frame := split_frame(data)) is None:
+                chunk = await asyncio.wait_for(loop.sock_recv(client, 4096), JOIN_TIMEOUT)
+                if not chunk or len(data) + len(chunk) > MAX_JOIN_BYTES:
+                    return
+                data += chunk
+            room_id = handoff_room(frame)
+
+            created = room_id not in self.routes
+            index = self.owner(room_id)
+            try:
+                socket.send_fds(self.controls[index], [bytes(data)], [client.fileno()])
+            except OSError:
+                # The worker never saw the connection, a route this handoff created would point at no room
+                if created:
+                    self.release(room_id, index)
+                return
+            self.pending[room_id] = self.pending.get(room_id, 0) + 1
+        except (asyncio.TimeoutError, ValueError, OSError):
+            pass
+        finally:
+            # A handed off worker holds its own copy of the socket, every other path drops the connection
+            client.close()
+
+
+def run_worker(control, chat_host, chat_port, match_log=None, fill_seats=0, bot_workers=BOT_WORKERS,
+               max_players=MAX_PLAYERS):
+    ShardWorker(control, chat_host=chat_host, chat_port=chat_port, match_log=match_log, fill_seats=fill_seats,
+                bot_workers=bot_workers, max_players=max_players).start()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the JJK game server across several worker processes.')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--match-log', default=None, help='Record finished matches to this path (one file per worker)')
+    parser.add_argument('--fill-seats', type=int, default=0,
+                        help='Fill rooms with CPU players up to this many seats when they start')
+    parser.add_argument('--bot-workers', type=int, default=BOT_WORKERS, help='Threads thinking for CPU players, per worker')
+    parser.add_argument('--max-players', type=int, default=MAX_PLAYERS,
+                        help='Seats per room, characters repeat in rooms larger than the character pool')
+    args = parser.parse_args()
+    ShardedGameServer(workers=args.workers, host=args.host, port=args.port, match_log=args.match_log,
+                      fill_seats=args.fill_seats, bot_workers=args.bot_workers, max_players=args.max_players).start()
@@ -0,0 +1,149 @@
+from typing import Dict, Optional
+
+
+# region Helpers
+def diff(old: dict, new: dict) -> dict:
+    """
+    Collects the fields of `new` that differ from `old`, descending into nested dictionaries.
+    :param old: The previously sent values.
+    :param new: The current values.
+    :return: Only the changed fields, nested the same way as the input.
+    """
+    changes = {}
+    for key, value in new.items():
+        previous = old.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            nested = diff(previous, value)
+            if nested:
+                changes[key] = nested
+        elif previous != value or key not in old:
+            changes[key] = value
+    return changes
+
+
+def merge(target: dict, changes: dict) -> None:
+    """
+    Applies changes produced by `diff` onto a dictionary in place.
+    :param target: The dictionary to update.
+    :param changes: The changed fields.
+    :return: None
+    """
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        else:
+            target[key] = value
+
+
+# endregion
+
+class StateStream:
+    """
+    Server side of the versioned game_state stream.
+    Clients get one full snapshot and then numbered deltas carrying only the player fields that changed.
+    """
+
+    # region Constructor
+    def __init__(self) -> None:
+        self.__seq: int = 0
+        self.__turn: Optional[int] = None
+        self.__players: Dict[str, dict] = {}  # name -> last sent player state, in seat order
+
+    # endregion
+
+    # region Properties
+    @property
+    def seq(self) -> int:
+        return self.__seq
+
+    # endregion
+
+    # region Methods
+    def snapshot(self) -> dict:
+        """
+        Builds a full game_state message for the current version, for joins and resyncs.
+        :return: The game_state message.
+        """
+        return {
+            'type': 'game_state',
+            'seq': self.__seq,
+            'state': {
+                'turn': self.__turn,
+                'players': list(self.__players.values())
+            }
+        }
+
+    def update(self, state: dict) -> Optional[dict]:
+        """
+        Records a new battle state and builds the delta from the previous version.
+        :param state: The output of BattleManager.get_battle_state().
+        :return: The state_delta message, or None if nothing changed.
+        """
+        players = {}
+        for player in state['players']:
+            previous = self.__players.get(player['name'])
+            changes = player if previous is None else diff(previous, player)
+            if changes:
+                players[player['name']] = changes
+
+        if not players and state['turn'] == self.__turn:
+            return None
+
+        self.__seq += 1
+        self.__turn = state['turn']
+        self.__players = {player['name']: player for player in state['players']}
+        return {
+            'type': 'state_delta',
+            'seq': self.__seq,
+            'turn': self.__turn,
+            'players': players
+        }
+    # endregion
+
+
+class StateMirror:
+    """
+    Client side of the versioned game_state stream, rebuilding the full state from a snapshot and deltas.
+    """
+
+    # region Constructor
+    def __init__(self) -> None:
+        self.seq: Optional[int] = None
+        self.state: Optional[dict] = None
+        self.resync_requested: bool = False
+        self.__players: Dict[str, dict] = {}
+
+    # endregion
+
+    # region Methods
+    def apply(self, message: dict) -> bool:
+        """
+        Applies a game_state snapshot or a state_delta.
+        :param message: The message received from the server.
+        :return: False if a delta was just found missing and the client should send a resync request, True otherwise.
+        """
+        if message['type'] == 'game_state':
+            self.resync_requested = False
+            self.seq = message.get('seq', 0)
+            self.state = message['state']
+            self.__players = {player['name']: player for player in self.state['players']}
+            return True
+
+        if self.seq is None or message['seq'] != self.seq + 1:
+            # Deltas are useless until the snapshot arrives, ask only once
+            if self.resync_requested:
+                return True
+            self.resync_requested = True
+            return False
+
+        self.seq = message['seq']
+        self.state['turn'] = message['turn']
+        for name, changes in message['players'].items():
+            player = self.__players.get(name)
+            if player is None:
+                player = self.__players[name] = dict(changes)
+                self.state['players'].append(player)
+            else:
+                merge(player, changes)
+        return True
+    # endregion
@@ -1,14 +1,27 @@
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Optional
+from JJK_Game.battle_events import BattleEvent, EventSink, DEFAULT_SINK, POISON_TICK, POISON_END, DEATH, STUN_SKIP, \
+    STUN_END
+from JJK_Game.battle_state import CharacterState
 
 if TYPE_CHECKING:
     from character import Character
 
+# How an effect applied to a character that already has it combines with the running one
+REPLACE = 'replace'  # the new duration overwrites the remaining one
+REFRESH = 'refresh'  # the longer of the two is kept
+STACK = 'stack'  # the durations add up
+
 
 class StatusEffect(ABC):
     """
     Abstract class for storing and handling status effects.
+    The remaining duration lives in a CharacterState shared with the affected character.
+    Subclasses declare how a new application combines with a running one in stacking.
+    Setting a positive duration, however it happens, is reported to the listener, see Character.
     """
+    __slots__ = ('_sink', '_state', '_listener')
+    stacking: str = REPLACE
 
     # region Constructor
     def __init__(self, duration: int) -> None:
@@ -16,22 +29,86 @@ class StatusEffect(ABC):
         Super constructor for status effects. Takes a duration.
         :param duration: The number of moves this status effect will be applied for.
         """
-        self._duration: int = duration
+        self._sink: EventSink = DEFAULT_SINK
+        self._state: CharacterState = CharacterState()
+        self._listener: Optional[Callable[[], None]] = None
+        self.duration = duration
 
     # endregion
 
     # region Properties
     @property
+    @abstractmethod
     def duration(self) -> int:
-        return self._duration
+        pass
 
-    @duration.setter
-    def duration(self, duration: int) -> None:
-        self._duration = duration
+    @property
+    def state(self) -> CharacterState:
+        return self._state
+
+    @state.setter
+    def state(self, state: CharacterState) -> None:
+        self._state = state
+
+    @property
+    def sink(self) -> EventSink:
+        return self._sink
+
+    @sink.setter
+    def sink(self, sink: EventSink) -> None:
+        self._sink = sink
+
+    @property
+    def listener(self) -> Optional[Callable[[], None]]:
+        return self._listener
+
+    @listener.setter
+    def listener(self, listener: Optional[Callable[[], None]]) -> None:
+        self._listener = listener
 
     # endregion
 
     # region Methods
+    def started(self, duration: int) -> None:
+        # Called by the duration setters, so a stun or poison set from anywhere gets its ticks scheduled
+        if duration > 0 and self._listener is not None:
+            self._listener()
+
+    def emit(self, kind: str, text: str, player: 'Character', amount: Optional[int] = None) -> None:
+        """
+        Reports something this effect did to the sink.
+        :param kind: The event kind.
+        :param text: The line describing the event.
+        :param player: The affected character.
+        :param amount: The number involved, if any.
+        :return: None
+        """
+        self._sink.emit(BattleEvent(kind, text, type(self).__name__, player.name, amount))
+
+    def add(self, duration: int) -> None:
+        """
+        Applies this effect for the given number of turns, following its stacking rule.
+        :param duration: The number of turns.
+        :return: None
+        """
+        if self.stacking == STACK:
+            self.duration += duration
+        elif self.stacking == REFRESH:
+            self.duration = max(self.duration, duration)
+        else:
+            self.duration = duration
+
+    def clone(self) -> 'StatusEffect':
+        """
+        Copies this effect field by field without running its constructor, see CharacterFactory.
+        :return: The copy.
+        """
+        twin = object.__new__(type(self))
+        twin._sink = self._sink
+        twin._state = self._state
+        twin._listener = None  # the copy's character listens to it
+        return twin
+
     @abstractmethod
     def handle(self, player: 'Character') -> None:
         """
@@ -47,7 +124,7 @@ class StatusEffect(ABC):
         Checks if this effect is active.
         @return: True if the effect is active, False otherwise.
         """
-        return self._duration > 0
+        return self.duration > 0
     # endregion
 
 
@@ -55,6 +132,8 @@ class Poison(StatusEffect):
     """
     Class for managing poison damage and duration.
     """
+    __slots__ = ('damage',)
+    stacking = REPLACE
 
     # region Constructor
     def __init__(self, damage: int, duration: int) -> None:
@@ -63,11 +142,28 @@ class Poison(StatusEffect):
         :param damage: The amount of damage to deal per round this poison is active.
         :param duration: The number of rounds this poison is active for.
         """
-        super().__init__(duration)
         self.damage: int = damage
+        super().__init__(duration)
+    # endregion
+
+    # region Properties
+    @property
+    def duration(self) -> int:
+        return self._state.poison
+
+    @duration.setter
+    def duration(self, duration: int) -> None:
+        self._state.poison = duration
+        self.started(duration)
+
     # endregion
 
     # region Methods
+    def clone(self) -> 'Poison':
+        twin = super().clone()
+        twin.damage = self.damage
+        return twin
+
     def handle(self, player: 'Character') -> None:
         """
         If the poison effect is active, applies poison damage to the given player and decreases the duration.
@@ -78,15 +174,14 @@ class Poison(StatusEffect):
             return
 
         player.hp -= self.damage
-        print(f'{player.name} is poisoned! They take {self.damage} damage.')
+        self.emit(POISON_TICK, f'{player.name} is poisoned! They take {self.damage} damage.', player, self.damage)
 
         if not player.is_alive():
-            print(f'{player.name} was eliminated by poison!')
+            self.emit(DEATH, f'{player.name} was eliminated by poison!', player)
 
         self.duration -= 1
         if self.duration <= 0:
-            self.is_poisoned = False
-            print(f'{player.name} is no longer poisoned!')
+            self.emit(POISON_END, f'{player.name} is no longer poisoned!', player)
     # endregion
 
 
@@ -94,6 +189,8 @@ class Stun(StatusEffect):
     """
     Class for managing stun duration.
     """
+    __slots__ = ()
+    stacking = REPLACE
 
     # region Constructor
     def __init__(self, duration: int) -> None:
@@ -104,6 +201,18 @@ class Stun(StatusEffect):
         super().__init__(duration)
     # endregion
 
+    # region Properties
+    @property
+    def duration(self) -> int:
+        return self._state.stun
+
+    @duration.setter
+    def duration(self, duration: int) -> None:
+        self._state.stun = duration
+        self.started(duration)
+
+    # endregion
+
     # region Methods
     def handle(self, player: 'Character') -> None:
         """
@@ -111,8 +220,8 @@ class Stun(StatusEffect):
         @param player: the player to gather information from.
         @return: True if the stun was active, False otherwise.
         """
-        print(f'{player.name} is stunned and their turn is skipped!')
+        self.emit(STUN_SKIP, f'{player.name} is stunned and their turn is skipped!', player)
         self.duration -= 1
         if self.duration <= 0:
-            print(f'{player.name} is no longer stunned!')
+            self.emit(STUN_END, f'{player.name} is no longer stunned!', player)
     # endregion
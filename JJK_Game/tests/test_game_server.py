@@ -0,0 +1,787 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from JJK_Game.game_server import GameServer
+from JJK_Game.shard_server import ShardedGameServer, ShardWorker
+from JJK_Game.framing import FrameReader, encode_frame, encode_json, read_json, MAX_FRAME_SIZE
+from JJK_Game.state_stream import StateStream, StateMirror
+from JJK_Game.client_connection import ClientConnection, DROP, RESYNC
+from JJK_Game.chat_relay import ChatRelay
+from JJK_Game.game_room import TurnDeadlines
+from JJK_Game.match_log import MatchLogReader
+from JJK_Game.replay import replay
+from JJK_Game.timer_wheel import TimerWheel
+from JJK_Game.bench.bot_client import run_room
+from JJK_Game.bench.swarm import percentile, compare
+from threading import Thread
+from types import SimpleNamespace
+import asyncio
+import json
+import socket
+import pytest
+
+
+# region Helpers
+class ChatSink:
+    """
+    Stand-in for the chat server that records everything the game server relays.
+    """
+
+    def __init__(self) -> None:
+        self.received: bytes = b''
+        self.writes: int = 0
+        self.server = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while data := await reader.read(65536):
+            self.received += data
+            self.writes += 1
+
+    async def start(self, port: int = 0) -> int:
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', port)
+        return self.server.sockets[0].getsockname()[1]
+
+
+async def wait_for_port(server: GameServer) -> int:
+    while server.server is None:
+        await asyncio.sleep(0.01)
+    return server.server.sockets[0].getsockname()[1]
+
+
+async def send(writer: asyncio.StreamWriter, message: dict) -> None:
+    writer.write(encode_json(message))
+    await writer.drain()
+
+
+async def receive(reader: asyncio.StreamReader, message_type: str) -> dict:
+    while True:
+        message = await read_json(reader)
+        if message['type'] == message_type:
+            return message
+
+
+async def play_match(port: int, player_names: list[str], room: str = 'default') -> list[str]:
+    """
+    Joins the given players to a room, starts the match and attacks until it ends.
+    """
+    connections = [await asyncio.open_connection('127.0.0.1', port) for _ in player_names]
+    winners = await play_match_on(connections, player_names, room)
+    for _, writer in connections:
+        writer.close()
+    return winners
+
+
+async def play_match_on(connections: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]], player_names: list[str],
+                        room: str) -> list[str]:
+    """
+    Plays a match like play_match() over connections that are already open, and leaves them open.
+    """
+    for name, (_, writer) in zip(player_names, connections):
+        await send(writer, {'type': 'join', 'player_name': name, 'room': room})
+    await asyncio.sleep(0.05)
+    await send(connections[0][1], {'type': 'start'})
+
+    for reader, writer in connections:
+        selection = await receive(reader, 'character_selection')
+        await send(writer, {'type': 'character_choice', 'character': selection['descriptions'][0]['name']})
+
+    return await asyncio.gather(*(play_attacks_only(r, w) for r, w in connections))
+
+
+async def play_attacks_only(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> str:
+    """
+    Answers every turn prompt with an attack on the first target until the battle ends.
+    """
+    mirror = StateMirror()
+    while True:
+        message = await read_json(reader)
+        if message['type'] == 'action_selection':
+            await send(writer, {'type': 'action', 'action': 'attack'})
+        elif message['type'] == 'target_selection':
+            await send(writer, {'type': 'target', 'target': message['targets'][0]})
+        elif message['type'] in ('game_state', 'state_delta'):
+            assert mirror.apply(message)
+        elif message['type'] == 'battle_over':
+            assert [p['name'] for p in mirror.state['players'] if p['alive']] == [message['winner']]
+            return message['winner']
+
+
+# endregion
+
+# region Framing Tests
+def test_frame_reader_handles_split_and_coalesced_writes():
+    messages: list[dict] = [{'type': 'game_state', 'turn': i, 'note': 'Ryōmen ' * i} for i in range(40)]
+    data: bytes = b''.join(encode_json(m) for m in messages) + encode_frame('System: bye')
+    left, right = socket.socketpair()
+
+    def write_in_odd_pieces() -> None:
+        # Chunks cut straight through headers and multi-byte characters
+        for i in range(0, len(data), 7):
+            left.sendall(data[i:i + 7])
+        left.close()
+
+    writer: Thread = Thread(target=write_in_odd_pieces)
+    writer.start()
+    reader: FrameReader = FrameReader(right, size=16)
+    assert [reader.read_json() for _ in messages] == messages
+    assert reader.read_text() == 'System: bye'
+    assert reader.read_frame() is None
+    writer.join()
+    right.close()
+
+
+def test_frame_size_limit():
+    with pytest.raises(ValueError):
+        encode_frame(b'x' * (MAX_FRAME_SIZE + 1))
+
+    left, right = socket.socketpair()
+    left.sendall((MAX_FRAME_SIZE + 1).to_bytes(4, 'big'))
+    with pytest.raises(ValueError):
+        FrameReader(right).read_frame()
+    left.close()
+    right.close()
+
+
+# endregion
+
+# region Game Server Tests
+def test_game_server_full_match():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start())
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        winners = await asyncio.wait_for(play_match(port, ['player0', 'player1']), 10)
+        assert winners[0] == winners[1]
+        assert winners[0] is not None
+
+        await asyncio.sleep(0.05)
+        assert b'[SERVER]: player0 has selected' in sink.received
+        assert server.rooms == {}
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_lets_players_join_after_a_match():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start())
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        connections = [await asyncio.open_connection('127.0.0.1', port) for _ in range(2)]
+        for room in ('first', 'second'):
+            winners = await asyncio.wait_for(play_match_on(connections, ['player0', 'player1'], room), 10)
+            assert winners[0] == winners[1]
+            assert winners[0] is not None
+            await asyncio.sleep(0.05)
+            assert server.rooms == {}
+
+        for _, writer in connections:
+            writer.close()
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_gives_held_seats_back_on_reconnect():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start())
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        connections = [await asyncio.open_connection('127.0.0.1', port) for _ in range(2)]
+        for name, (_, writer) in zip(['player0', 'player1'], connections):
+            await send(writer, {'type': 'join', 'player_name': name, 'room': 'r'})
+        await asyncio.sleep(0.05)
+        await send(connections[0][1], {'type': 'start'})
+        for reader, writer in connections:
+            selection = await receive(reader, 'character_selection')
+            await send(writer, {'type': 'character_choice', 'character': selection['descriptions'][0]['name']})
+
+        # player1 drops once the battle is on, a stranger cannot take the seat, player1 can
+        await receive(connections[1][0], 'game_state')
+        connections[1][1].close()
+        await asyncio.sleep(0.05)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await send(writer, {'type': 'join', 'player_name': 'stranger', 'room': 'r'})
+        assert (await read_json(reader))['type'] == 'error'
+        writer.close()
+        connections[1] = await asyncio.open_connection('127.0.0.1', port)
+        await send(connections[1][1], {'type': 'join', 'player_name': 'player1', 'room': 'r'})
+
+        winners = await asyncio.wait_for(asyncio.gather(*(play_attacks_only(r, w) for r, w in connections)), 10)
+        assert winners[0] == winners[1]
+        assert winners[0] is not None
+        for _, writer in connections:
+            writer.close()
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_records_matches(tmp_path):
+    path = str(tmp_path / 'matches.log')
+
+    async def scenario() -> list[str]:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start(),
+                            match_log=path)
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+        results = await asyncio.wait_for(asyncio.gather(
+            play_match(port, ['a0', 'a1'], room='a'), play_match(port, ['b0', 'b1', 'b2'], room='b')), 10)
+        serve_task.cancel()
+        await asyncio.gather(serve_task, return_exceptions=True)
+        sink.server.close()
+        return [winners[0] for winners in results]
+
+    winners = asyncio.run(scenario())
+    with MatchLogReader(path) as log:
+        assert len(log) == 2
+        # Each match replays from its log alone to the winner the players saw
+        replayed = sorted(replay(log[i].record()).get_winner() for i in range(2))
+        assert replayed == sorted(winners)
+        assert sorted(len(log[i].players()) for i in range(2)) == [2, 3]
+
+
+def test_game_server_plays_cpu_seats():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start())
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await send(writer, {'type': 'join', 'player_name': 'human', 'room': 'cpu'})
+        for _ in range(2):
+            await send(writer, {'type': 'add_cpu'})
+        await asyncio.sleep(0.05)
+        room = server.rooms['cpu']
+        for cpu in room.cpus:
+            cpu.budget_ms = 10
+        await send(writer, {'type': 'start'})
+        selection = await receive(reader, 'character_selection')
+        await send(writer, {'type': 'character_choice', 'character': selection['descriptions'][0]['name']})
+
+        winner = await asyncio.wait_for(play_attacks_only(reader, writer), 20)
+        assert winner is not None
+        await asyncio.sleep(0.05)
+        assert b'[SERVER]: CPU 1 has selected' in sink.received
+        assert b'[SERVER]: CPU 2 has selected' in sink.received
+        assert b'ran out of time' not in sink.received
+        writer.close()
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_fills_empty_seats():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start(),
+                            fill_seats=3, bot_processes=False)
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await send(writer, {'type': 'join', 'player_name': 'human', 'room': 'filled'})
+        await asyncio.sleep(0.05)
+        await send(writer, {'type': 'start'})
+        selection = await receive(reader, 'character_selection')
+        room = server.rooms['filled']
+        assert len(room.clients) == 3 and len(room.cpus) == 2
+        for cpu in room.cpus:
+            cpu.budget_ms = 10
+        await send(writer, {'type': 'character_choice', 'character': selection['descriptions'][0]['name']})
+
+        winner = await asyncio.wait_for(play_attacks_only(reader, writer), 20)
+        assert winner is not None
+        await asyncio.sleep(0.05)
+        assert b'[SERVER]: CPU 2 has selected' in sink.received
+        assert b'CPU 3' not in sink.received
+        writer.close()
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_large_lobby_repeats_characters():
+    with pytest.raises(ValueError):
+        GameServer(max_players=12, repeat_characters=False)
+
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start(),
+                            fill_seats=12, bot_processes=False, max_players=12)
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await send(writer, {'type': 'join', 'player_name': 'human', 'room': 'lobby'})
+        await asyncio.sleep(0.05)
+        await send(writer, {'type': 'start'})
+        selection = await receive(reader, 'character_selection')
+        room = server.rooms['lobby']
+        assert len(room.clients) == 12 and room.is_full()
+        for cpu in room.cpus:
+            cpu.budget_ms = 10
+        await send(writer, {'type': 'character_choice', 'character': selection['descriptions'][0]['name']})
+
+        winner = await asyncio.wait_for(play_attacks_only(reader, writer), 30)
+        names = [p['name'] for p in room.battle_manager.get_battle_state()['players']]
+        assert len(set(names)) == 12 and any(name.endswith(' #2') for name in names)
+        assert winner is None or winner in names
+        writer.close()
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_concurrent_rooms():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start())
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        # Every room gets its own character pool, so each one can pick the same first character
+        matches = [play_match(port, [f'r{i}p0', f'r{i}p1', f'r{i}p2'], room=f'room{i}') for i in range(20)]
+        results = await asyncio.wait_for(asyncio.gather(*matches), 20)
+        for winners in results:
+            assert len(set(winners)) == 1
+            assert winners[0] is not None
+
+        await asyncio.sleep(0.05)
+        assert server.rooms == {}
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_rejects_full_room():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start())
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        connections = [await asyncio.open_connection('127.0.0.1', port) for _ in range(6)]
+        for i, (_, writer) in enumerate(connections):
+            await send(writer, {'type': 'join', 'player_name': f'player{i}', 'room': 'crowded'})
+        assert (await receive(connections[-1][0], 'error'))['msg'] == 'Room is full or already playing.'
+        assert len(server.rooms['crowded'].clients) == 5
+
+        # The room is closed once everybody leaves before starting
+        for _, writer in connections:
+            writer.close()
+        await asyncio.sleep(0.05)
+        assert server.rooms == {}
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_game_server_plays_for_idle_players():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start(),
+                            deadlines=TurnDeadlines(selection=0.05, action=0.05, target=0.05))
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        (active_reader, active_writer), (idle_reader, idle_writer) = \
+            [await asyncio.open_connection('127.0.0.1', port) for _ in range(2)]
+        await send(active_writer, {'type': 'join', 'player_name': 'active', 'room': 'afk'})
+        await send(idle_writer, {'type': 'join', 'player_name': 'idle', 'room': 'afk'})
+        await asyncio.sleep(0.05)
+        await send(active_writer, {'type': 'start'})
+        selection = await receive(active_reader, 'character_selection')
+        await send(active_writer, {'type': 'character_choice', 'character': selection['descriptions'][0]['name']})
+
+        async def stay_idle() -> list[str]:
+            phases = []
+            while (message := await read_json(idle_reader))['type'] != 'battle_over':
+                if message['type'] == 'timeout':
+                    phases.append(message['phase'])
+            return phases
+
+        # The idle player gets a character and defends every turn, so the active one wins
+        winner, phases = await asyncio.wait_for(
+            asyncio.gather(play_attacks_only(active_reader, active_writer), stay_idle()), 20)
+        assert winner == selection['descriptions'][0]['name']
+        assert phases[0] == 'character_choice'
+        assert set(phases[1:]) == {'action'}
+
+        await asyncio.sleep(0.05)
+        assert b'[SERVER]: idle ran out of time and will defend.' in sink.received
+        assert server.timers.pending == 0
+        active_writer.close()
+        idle_writer.close()
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+# endregion
+
+# region Timer Wheel Tests
+def test_timer_wheel_fires_in_order_and_cancels():
+    async def scenario() -> None:
+        wheel: TimerWheel = TimerWheel(tick=0.01, size=8)
+        fired: list[str] = []
+        # 0.15s is further than one turn of the wheel, so it shares a slot with an earlier timer
+        for delay, name in [(0.15, 'late'), (0.02, 'early'), (0.07, 'middle')]:
+            wheel.schedule(delay, lambda n=name: fired.append(n))
+        wheel.schedule(0.03, lambda: fired.append('cancelled')).cancel()
+        assert wheel.pending == 3
+
+        await asyncio.sleep(0.1)
+        assert fired == ['early', 'middle']
+        await asyncio.sleep(0.1)
+        assert fired == ['early', 'middle', 'late']
+        assert wheel.pending == 0
+
+        # An idle wheel picks up new timers without replaying the skipped ticks
+        await asyncio.sleep(0.1)
+        start = asyncio.get_running_loop().time()
+        wheel.schedule(0.05, lambda: fired.append('again'))
+        while len(fired) < 4:
+            await asyncio.sleep(0.005)
+        assert asyncio.get_running_loop().time() - start >= 0.04
+        wheel.close()
+
+    asyncio.run(scenario())
+
+
+# endregion
+
+# region Sharded Server Tests
+def test_sharded_server_routes_rooms_to_workers():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = ShardedGameServer(workers=2, host='127.0.0.1', port=0,
+                                   chat_host='127.0.0.1', chat_port=await sink.start())
+        serve_task = asyncio.create_task(server.serve())
+        while server.server is None:
+            await asyncio.sleep(0.01)
+        port = server.server.getsockname()[1]
+
+        matches = [play_match(port, [f'r{i}p0', f'r{i}p1'], room=f'room{i}') for i in range(4)]
+        results = await asyncio.wait_for(asyncio.gather(*matches), 30)
+        for winners in results:
+            assert len(set(winners)) == 1
+            assert winners[0] is not None
+
+        # Every room route is released once its match ends
+        await asyncio.sleep(0.2)
+        assert server.routes == {}
+        assert server.loads == [0, 0]
+        serve_task.cancel()
+        await asyncio.gather(serve_task, return_exceptions=True)
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_sharded_server_keeps_routes_of_handoffs_in_flight():
+    async def scenario() -> None:
+        server = ShardedGameServer(workers=2)
+        pairs = [socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET) for _ in range(2)]
+        server.controls, server.loads = [pair[0] for pair in pairs], [0, 0]
+
+        async def hand_off(room: str) -> None:
+            client, other = socket.socketpair()
+            client.setblocking(False)
+            other.sendall(encode_json({'type': 'join', 'player_name': 'p', 'room': room}))
+            await server.route(client)
+            other.close()
+
+        def notice(worker: socket.socket, index: int, message: dict) -> None:
+            worker.send(json.dumps(message).encode())
+            server.receive_notice(index)
+
+        await hand_off('r')
+        index = server.routes['r']
+        worker = pairs[index][1]
+        _, fds, _, _ = socket.recv_fds(worker, 4096, 1)
+        os.close(fds[0])
+        # The room closed on the worker while the handoff was on its way, the arriving player opens it again there
+        notice(worker, index, {'closed': 'r'})
+        assert server.routes == {'r': index} and server.pending == {'r': 1}
+        notice(worker, index, {'adopted': 'r'})
+        assert server.pending == {} and server.routes == {'r': index}
+        notice(worker, index, {'closed': 'r'})
+        assert server.routes == {} and server.loads == [0, 0]
+
+        # A handoff that cannot be sent leaves no route behind
+        for control in server.controls:
+            control.close()
+        await hand_off('s')
+        assert server.routes == {} and server.loads == [0, 0]
+        for _, worker in pairs:
+            worker.close()
+
+    asyncio.run(scenario())
+
+
+def test_sharded_server_drops_malformed_joins():
+    async def scenario() -> None:
+        server = ShardedGameServer(workers=2)
+        pairs = [socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET) for _ in range(2)]
+        server.controls, server.loads = [pair[0] for pair in pairs], [0, 0]
+
+        # A frame that is JSON but no object, and a join naming a room that cannot be a key
+        for frame in (encode_frame('[1]'), encode_frame('"x"'), encode_json({'type': 'join', 'room': [1]})):
+            client, other = socket.socketpair()
+            client.setblocking(False)
+            other.sendall(frame)
+            await server.route(client)
+            assert client.fileno() == -1
+            assert other.recv(4096) == b''
+            other.close()
+        assert server.routes == {} and server.pending == {} and server.loads == [0, 0]
+        for pair in pairs:
+            for end in pair:
+                end.close()
+
+    asyncio.run(scenario())
+
+
+def test_shard_worker_reports_rooms_closed_once_nobody_is_arriving():
+    acceptor, control = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    acceptor.setblocking(False)
+    worker = ShardWorker(control)
+    arrival = object()
+    worker.arriving, worker.arrivals = {'r': 1}, {arrival: 'r'}
+
+    # A player handed off to the room is still joining, closing the old room says nothing yet
+    worker.close_room(SimpleNamespace(room_id='r'))
+    with pytest.raises(BlockingIOError):
+        acceptor.recv(4096)
+    worker.settle(arrival)
+    assert json.loads(acceptor.recv(4096)) == {'closed': 'r'}
+    assert worker.arriving == {} and worker.arrivals == {}
+    acceptor.close()
+    control.close()
+
+
+# endregion
+
+# region State Stream Tests
+def player_state(name: str, hp: int, poison_duration: int = 0) -> dict:
+    return {
+        'name': name,
+        'hp': hp,
+        'alive': hp > 0,
+        'poison': {'active': poison_duration > 0, 'damage': 10, 'duration': poison_duration},
+        'stunned': False
+    }
+
+
+def test_state_stream_sends_only_changes():
+    stream: StateStream = StateStream()
+    mirror: StateMirror = StateMirror()
+
+    first: dict = stream.update({'turn': 0, 'players': [player_state('Gojo', 120), player_state('Sukuna', 140)]})
+    assert first['seq'] == 1
+    assert mirror.apply(stream.snapshot())
+    assert mirror.seq == 1
+
+    delta: dict = stream.update({'turn': 1, 'players': [player_state('Gojo', 120), player_state('Sukuna', 120, 2)]})
+    assert delta == {
+        'type': 'state_delta',
+        'seq': 2,
+        'turn': 1,
+        'players': {'Sukuna': {'hp': 120, 'poison': {'active': True, 'duration': 2}}}
+    }
+    assert mirror.apply(delta)
+    assert mirror.state == {'turn': 1, 'players': [player_state('Gojo', 120), player_state('Sukuna', 120, 2)]}
+
+    # Nothing changed, nothing to send
+    assert stream.update({'turn': 1, 'players': [player_state('Gojo', 120), player_state('Sukuna', 120, 2)]}) is None
+
+
+def test_state_mirror_detects_gaps():
+    stream: StateStream = StateStream()
+    mirror: StateMirror = StateMirror()
+    stream.update({'turn': 0, 'players': [player_state('Gojo', 120)]})
+    mirror.apply(stream.snapshot())
+
+    stream.update({'turn': 1, 'players': [player_state('Gojo', 100)]})  # Lost in transit
+    late: dict = stream.update({'turn': 2, 'players': [player_state('Gojo', 80)]})
+    assert not mirror.apply(late)
+    assert mirror.apply(stream.update({'turn': 3, 'players': [player_state('Gojo', 60)]}))  # Already asked
+    assert mirror.state['players'][0]['hp'] == 120
+
+    assert mirror.apply(stream.snapshot())
+    assert mirror.seq == 4
+    assert mirror.state['players'][0]['hp'] == 60
+
+
+# endregion
+
+# region Client Connection Tests
+class StalledWriter:
+    """
+    Stream writer whose peer never reads, so drain() blocks until released.
+    """
+
+    def __init__(self) -> None:
+        self.written: list[bytes] = []
+        self.closed: bool = False
+        self.released: asyncio.Event = asyncio.Event()
+
+    def writelines(self, frames: list[bytes]) -> None:
+        self.written.extend(frames)
+
+    async def drain(self) -> None:
+        await self.released.wait()
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_client_connection_shares_encoded_frames():
+    async def scenario() -> None:
+        writers = [StalledWriter() for _ in range(3)]
+        connections = [ClientConnection(w) for w in writers]
+        frame: bytes = encode_json({'type': 'new_turn', 'name': 'Satoru Gojo'})
+        for connection in connections:
+            connection.send(frame)
+        await asyncio.sleep(0)
+        assert all(w.written[0] is frame for w in writers)
+        for connection in connections:
+            connection.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_client_is_dropped():
+    async def scenario() -> None:
+        writer = StalledWriter()
+        connection = ClientConnection(writer, limit=4, policy=DROP)
+        connection.send(encode_json({'type': 'new_turn', 'name': 'first'}))
+        await asyncio.sleep(0)  # The first frame is written and its drain never finishes
+        for i in range(5):
+            connection.send(encode_json({'type': 'new_turn', 'name': str(i)}))
+        assert connection.closed
+        assert writer.closed
+
+    asyncio.run(scenario())
+
+
+def test_slow_client_is_resynced():
+    async def scenario() -> None:
+        writer = StalledWriter()
+        connection = ClientConnection(writer, limit=4, policy=RESYNC)
+        snapshot: bytes = encode_json({'type': 'game_state', 'seq': 4, 'state': {}})
+        connection.snapshot = lambda: snapshot
+        prompt: bytes = encode_json({'type': 'action_selection'})
+
+        connection.send(encode_json({'type': 'new_turn', 'name': 'first'}))
+        await asyncio.sleep(0)
+        connection.send(prompt)
+        for seq in range(1, 6):
+            connection.send(encode_json({'type': 'state_delta', 'seq': seq}), state=True)
+        assert not connection.closed
+
+        # Stale deltas were replaced by one snapshot that already covers delta 4, the prompt survived
+        writer.released.set()
+        await asyncio.sleep(0)
+        assert writer.written[1:] == [prompt, snapshot, encode_json({'type': 'state_delta', 'seq': 5})]
+        connection.close()
+
+    asyncio.run(scenario())
+
+
+# endregion
+
+# region Chat Relay Tests
+def test_chat_relay_connects_late_and_batches():
+    async def scenario() -> None:
+        # Reserve a port nobody listens on yet
+        probe: socket.socket = socket.create_server(('127.0.0.1', 0))
+        port: int = probe.getsockname()[1]
+        probe.close()
+
+        relay: ChatRelay = ChatRelay('127.0.0.1', port, min_backoff=0.01, max_backoff=0.05)
+        relay.start()
+        lines: list[str] = [f'[SERVER]: line {i}' for i in range(20)]
+        for line in lines:
+            relay.send(line)
+        await asyncio.sleep(0.05)
+        assert not relay.connected
+
+        sink = ChatSink()
+        await sink.start(port)
+        for _ in range(100):
+            if len(sink.received) == sum(len(encode_frame(line)) for line in lines):
+                break
+            await asyncio.sleep(0.01)
+        assert sink.received == b''.join(encode_frame(line) for line in lines)
+        assert sink.writes < len(lines)
+        await relay.close()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_chat_relay_drops_oldest_lines_when_full():
+    async def scenario() -> None:
+        relay: ChatRelay = ChatRelay('127.0.0.1', 9, limit=3)
+        for i in range(5):
+            relay.send(str(i))
+        assert relay.dropped == 2
+
+    asyncio.run(scenario())
+
+
+# endregion
+
+# region Bench Tests
+def test_bot_room_records_latencies():
+    async def scenario() -> None:
+        sink = ChatSink()
+        server = GameServer(host='127.0.0.1', port=0, chat_host='127.0.0.1', chat_port=await sink.start())
+        serve_task = asyncio.create_task(server.serve())
+        port = await wait_for_port(server)
+
+        probe = await asyncio.wait_for(run_room('127.0.0.1', port, 'bench', 3, seed=7), 10)
+        assert probe.errors == []
+        assert probe.winner is not None
+        # Every bot hears about every answered turn, the answering bot also times the turn
+        assert len(probe.turn_latencies) == probe.turns > 0
+        assert len(probe.fanout_latencies) == 3 * probe.turns
+        assert all(latency > 0 for latency in probe.fanout_latencies)
+        serve_task.cancel()
+        sink.server.close()
+
+    asyncio.run(scenario())
+
+
+def test_percentiles_and_regressions():
+    samples: list[float] = [i / 1000 for i in range(1, 101)]
+    assert percentile(samples, 50) == 0.05
+    assert percentile(samples, 99) == 0.099
+    assert percentile([], 50) is None
+
+    baseline: dict = {'turn_latency_ms': {'p50': 10.0, 'p99': 20.0}, 'fanout_latency_ms': {'p50': 10.0}}
+    report: dict = {'turn_latency_ms': {'p50': 11.0, 'p99': 30.0}, 'fanout_latency_ms': {'p50': 9.0}}
+    assert compare(report, baseline) == ['turn_latency_ms p99: 20.0 -> 30.0']
+
+
+# endregion
@@ -10,7 +10,22 @@ from characters.sukuna import *
 from characters.megumi import *
 from characters.nanami import *
 from characters.nobara import *
+from JJK_Game.client_mailbox import Mailbox
+from JJK_Game.battle_events import BufferedSink, NullSink, SPECIAL, DAMAGE, DEATH, STUN, COOLDOWN
+from JJK_Game.battle_manager import BattleManager, seat_names, base_name
+from JJK_Game.battle_state import CharacterState, BattleState
+from JJK_Game.status_effects import Poison, REFRESH, STACK
+from JJK_Game.ai import SearchAI
+from JJK_Game.bot_pool import BotPool
+from JJK_Game.replay import MatchRecord, ReplayError, replay, verify
+from JJK_Game.catalog import load_catalog
+from JJK_Game.matchups import MatchupTable, get_table
+from JJK_Game.match_log import MatchLogWriter, MatchLogReader, SEAT, TICK, ACTION, ADVANCE, HEADER, LOG_MAGIC
+import random
+import struct
+import time
 from typing import cast
+import asyncio
 import pytest
 
 # region Fixtures
@@ -935,5 +950,524 @@ def test_character_factory(capsys):
         factory.create_character('Marco')
     assert str(exc_info.value) == "Character 'Marco' does not exist in the factory."
 
+
+def test_character_factory_follows_the_catalog():
+    factory: CharacterFactory = CharacterFactory()
+    catalog: dict = load_catalog()
+    assert factory.get_character_names() == list(catalog)
+    for name, entry in catalog.items():
+        character: Character = factory.create_character(name)
+        assert (character.name, character.hp) == (entry['name'], entry['hp'])
+        for move, key in ((character._attack_move, 'attack'), (character._defense_move, 'defense'),
+                          (character.special_move, 'special')):
+            assert move.name == entry[key]['name']
+            # The chatbot shows the catalog's descriptions, the game those of the move classes
+            assert ' '.join(move.description.split()) == entry[key]['description']
+        assert character.attack_damage == entry['attack']['damage']
+        assert (character.defense, character._defense_move.boost) == (entry['defense']['base'], entry['defense']['boost'])
+        assert character.special_move.cooldown == entry['special']['cooldown']
+        assert (character.special_move.power, character.special_move.pierces) == \
+            (entry['special']['power'], entry['special']['pierces'])
+
+
+def test_character_factory_clones_share_no_state():
+    factory: CharacterFactory = CharacterFactory()
+    first: Character = factory.create_character('Megumi')
+    first.hp = 10
+    first.defend()
+    first.special_move.last_used = 3
+    first.poison.duration = 2
+    second: Character = factory.create_character('Megumi')
+    assert type(second) is type(first) and second is not first
+    assert second.state == CharacterState(110, 9, 0, 0, 0)
+    assert second.special(second_targets := [factory.create_character('Gojo')], 5)
+    assert second.hp == 110 + 20 and second_targets[0].hp == 120 - 25
+    assert first.poison.duration == 2 and second.poison.duration == 0
+
+# endregion
+# endregion
+
+# region Battle Event Tests
+def test_character_sink_reaches_moves_and_effects(capsys, characters, char_list):
+    sink: BufferedSink = BufferedSink()
+    gojo: Character = characters.get('Gojo')
+    gojo.sink = sink
+    others: list[Character] = [c for c in char_list if c is not gojo]
+    others[0].hp = 1
+
+    assert not gojo.special(others, 0)
+    gojo.special_move.stun_targets([True] * len(others), others)
+    assert gojo.special(others, 100)
+    gojo.stun.duration = 1
+    gojo.handle_stun()
+    assert capsys.readouterr().out == ''
+
+    events = sink.drain()
+    assert events[0].kind == COOLDOWN
+    assert [(e.kind, e.target) for e in events[1:len(others) + 1]] == [(STUN, c.name) for c in others]
+    assert events[len(others) + 1].kind == SPECIAL
+    assert events[len(others) + 2].kind == DEATH and events[len(others) + 2].target == others[0].name
+    assert all(e.amount == 25 - c.defense for e, c in zip(events[len(others) + 3:], others[1:]) if e.kind == DAMAGE)
+    assert events[-1].text == 'Satoru Gojo is no longer stunned!'
+    assert sink.drain() == []
+
+
+def test_headless_battle_runs_at_cpu_speed(capsys, char_list):
+    manager: BattleManager = BattleManager(char_list, sink=NullSink())
+    for c in char_list:
+        manager.assign_character(c.name)
+    manager.start_battle()
+
+    start: float = time.perf_counter()
+    while not manager.is_battle_over():
+        player: Character = manager.get_current_player()
+        if not manager.handle_status_effects(player):
+            targets: list[str] = manager.get_alive_targets(exclude=player)
+            manager.apply_action(player, 'special', manager.get_target_by_name(targets[0]))
+            manager.apply_action(player, 'attack', manager.get_target_by_name(targets[0]))
+        manager.advance_turn()
+    assert time.perf_counter() - start < 0.5
+    assert manager.get_winner() is not None
+    assert capsys.readouterr().out == ''
+
+
+# endregion
+
+# region Battle Manager Tests
+def test_battle_manager_tracks_deaths_through_hooks(char_list):
+    manager: BattleManager = BattleManager(char_list, sink=NullSink())
+    for c in char_list:
+        manager.assign_character(c.name)
+    manager.start_battle()
+    gojo, sukuna, megumi, nanami, nobara = char_list
+    assert manager.get_seat(nanami) == 3
+
+    # Deaths skip their seats and disappear from targets and lookups
+    sukuna.hp = 0
+    megumi.hp -= 500
+    manager.advance_turn()
+    assert manager.get_current_player() is nanami
+    assert manager.get_alive_targets(exclude=nanami) == [gojo.name, nobara.name]
+    assert manager.get_target_by_name(sukuna.name) is None
+    assert manager.get_target_by_name(nobara.name) is nobara
+
+    # Wrapping around past the end of the seats
+    nobara.hp = -1
+    manager.advance_turn()
+    assert manager.get_current_player() is gojo
+
+    # A revived player gets its seat back in order
+    sukuna.hp = 10
+    assert manager.get_alive_targets() == [gojo.name, sukuna.name, nanami.name]
+    manager.advance_turn()
+    assert manager.get_current_player() is sukuna
+
+    gojo.hp = sukuna.hp = 0
+    assert manager.is_battle_over()
+    assert manager.get_winner() == nanami.name
+
+
+def test_battle_manager_ticks_only_scheduled_effects():
+    manager, (nobara, gojo) = seat_battle(['Nobara', 'Gojo'])
+    manager.apply_action(nobara, 'defend')
+    nobara.add_effect(nobara.poison, 2)
+    gojo.add_effect(gojo.stun, 1)
+    saved: BattleState = manager.snapshot()
+
+    assert not manager.handle_status_effects(nobara)
+    assert (nobara.hp, nobara.defense, nobara.poison.duration) == (130 - 10, 14, 1)
+    assert manager.handle_status_effects(gojo)
+    assert not manager.handle_status_effects(gojo)
+    # An effect set straight through its duration is scheduled as well, and a restore picks it up from the state
+    gojo.stun.duration = 1
+    assert manager.handle_status_effects(gojo)
+    manager.restore(saved)
+    assert manager.handle_status_effects(gojo)
+    assert not manager.handle_status_effects(nobara) and nobara.poison.duration == 1
+
+
+def test_status_effect_stacking_rules(characters):
+    gojo: Character = characters.get('Gojo')
+    gojo.add_effect(gojo.poison, 3)
+    gojo.add_effect(gojo.poison, 1)
+    assert gojo.poison.duration == 1  # Poison and stun replace a running effect
+
+    class LingeringPoison(Poison):
+        __slots__ = ()
+        stacking = REFRESH
+
+    class StackingPoison(Poison):
+        __slots__ = ()
+        stacking = STACK
+
+    lingering, stacking = LingeringPoison(10, 3), StackingPoison(10, 3)
+    for effect in (lingering, stacking):
+        effect.add(2)
+    assert (lingering.duration, stacking.duration) == (3, 5)
+
+
+def play_large_lobby(seed: int, seats: int, recorder=None) -> BattleManager:
+    factory: CharacterFactory = CharacterFactory()
+    pool: list[Character] = [factory.create_character(name) for name in factory.get_character_names()]
+    manager: BattleManager = BattleManager(pool, sink=NullSink(), seed=seed, recorder=recorder,
+                                           repeat_characters=True)
+    for seat in range(seats):
+        manager.assign_character(pool[seat % len(pool)].name)
+    manager.start_battle()
+    choices: random.Random = random.Random(seed)
+    while not manager.is_battle_over():
+        player: Character = manager.get_current_player()
+        if not manager.handle_status_effects(player):
+            action: str = choices.choice(['attack', 'special'])
+            targets: list[str] = manager.get_alive_targets(exclude=player)
+            manager.apply_action(player, action, manager.get_target_by_name(choices.choice(targets)))
+        manager.advance_turn()
+    return manager
+
+
+def test_battle_manager_repeats_characters_in_large_lobbies():
+    manager: BattleManager = play_large_lobby(3, 150)
+    names: list[str] = [p['name'] for p in manager.get_battle_state()['players']]
+    assert len(names) == len(set(names)) == 150
+    assert names[5] == names[0] + ' #2' and names[10] == names[0] + ' #3'
+    assert names == seat_names([base_name(name) for name in names])
+    assert len(manager.get_available_characters()) == 5
+    # A special can take out every last player at once
+    assert manager.get_winner() in names + [None]
+
+    # A replay seats its own characters by name and tells the copies apart the same way
+    record: MatchRecord = MatchRecord.from_manager(manager)
+    assert verify(record)
+    assert [p['name'] for p in replay(record).get_battle_state()['players']] == names
+
+
+def test_specials_strike_a_lobby_as_a_batch():
+    class Deaf(BufferedSink):
+        listening = False
+
+    factory: CharacterFactory = CharacterFactory()
+    lobby: list[Character] = [factory.create_character('Nanami') for _ in range(100)]
+    sukuna: Character = factory.create_character('Sukuna')
+    fallen: list[Character] = []
+    for c in lobby:
+        c.add_life_hook(fallen.append)
+    for sink, expected in ((BufferedSink(), 100), (Deaf(), 0)):
+        for c in lobby:
+            c.hp = 100
+        lobby[0].hp = 1
+        fallen.clear()
+        sukuna.sink = sink
+        sukuna.special_move.last_used = -100
+        assert sukuna.special(lobby, 0)
+        assert [c.hp for c in lobby] == [1 - 30] + [70] * 99
+        # Only the target that fell runs its life hooks
+        assert fallen == [lobby[0]]
+        events = [e for e in sink.drain() if e.kind in (DAMAGE, DEATH)]
+        assert len(events) == expected
+        assert [e.kind for e in events[:1]] == [DEATH] * (expected > 0)
+
+
+# endregion
+
+# region Replay Tests
+def play_seeded_match(seed: int, recorder=None) -> BattleManager:
+    factory: CharacterFactory = CharacterFactory()
+    players: list[Character] = [factory.create_character(name) for name in ['Gojo', 'Nanami', 'Nobara', 'Sukuna']]
+    manager: BattleManager = BattleManager(players, sink=NullSink(), seed=seed, recorder=recorder)
+    for c in players:
+        manager.assign_character(c.name)
+    manager.start_battle()
+    choices: random.Random = random.Random(seed)
+    while not manager.is_battle_over():
+        player: Character = manager.get_current_player()
+        if not manager.handle_status_effects(player):
+            action: str = choices.choice(['attack', 'defend', 'special'])
+            targets: list[str] = manager.get_alive_targets(exclude=player)
+            manager.apply_action(player, action, manager.get_target_by_name(choices.choice(targets)))
+        manager.advance_turn()
+    return manager
+
+
+def test_battle_manager_seeds_the_specials():
+    first: BattleManager = play_seeded_match(7)
+    second: BattleManager = play_seeded_match(7)
+    assert first.get_seed() == 7
+    assert first.get_action_log() == second.get_action_log()
+    assert first.get_battle_state() == second.get_battle_state()
+
+
+def test_replay_rederives_matches():
+    for seed in range(50):
+        record: MatchRecord = MatchRecord.from_manager(play_seeded_match(seed))
+        assert verify(MatchRecord.from_dict(record.to_dict()))
+        assert replay(record).get_action_log() == record.actions
+
+
+def test_replay_rejects_tampered_logs():
+    record: MatchRecord = MatchRecord.from_manager(play_seeded_match(3))
+    wrong_seat: MatchRecord = MatchRecord(record.players, record.seed, [(1, 'attack', 0)] + record.actions)
+    with pytest.raises(ReplayError):
+        replay(wrong_seat)
+    too_long: MatchRecord = MatchRecord(record.players, record.seed, record.actions + [record.actions[-1]])
+    assert not verify(too_long)
+    fewer_moves: MatchRecord = MatchRecord(record.players, record.seed, record.actions[:-3], record.winner, record.hp)
+    assert not verify(fewer_moves)
+
+
 # endregion
+
+# region Match Log Tests
+def test_match_log_round_trip(tmp_path):
+    path: str = str(tmp_path / 'matches.log')
+    managers: list[BattleManager] = []
+    for seed in range(3):
+        log: MatchLogWriter = MatchLogWriter(path)
+        buffer = log.open_match()
+        managers.append(play_seeded_match(seed, buffer))
+        buffer.close()
+        buffer.close()
+        log.close()
+
+    with MatchLogReader(path) as reader:
+        assert len(reader) == 3
+        for view, manager in zip(reader, managers):
+            assert view.seed == manager.get_seed()
+            assert view.players() == [p['name'] for p in manager.get_battle_state()['players']]
+            assert view.actions() == manager.get_action_log()
+            assert [record[0] for record in view][:5] == [SEAT] * 4 + [TICK]
+
+        view = reader[2]
+        turn: int = view.turns // 2
+        start: int = view.seek(turn)
+        assert view[start][0] == TICK and view[start][4] == turn
+        assert view[start - 1][0] == ADVANCE and view[start - 1][4] == turn
+        assert view.seek(view.turns + 1) == len(view)
+        assert ACTION in {view[i][0] for i in range(start, view.seek(turn + 1))} or view[start][2] == 1
+        assert replay(view.record()).get_action_log() == managers[2].get_action_log()
+
+
+def test_match_log_keeps_large_lobbies(tmp_path):
+    path: str = str(tmp_path / 'lobby.log')
+    log: MatchLogWriter = MatchLogWriter(path)
+    buffer = log.open_match()
+    manager: BattleManager = play_large_lobby(5, 200, buffer)
+    buffer.close()
+    log.close()
+
+    with MatchLogReader(path) as reader:
+        view = reader[0]
+        assert view.players() == [p['name'] for p in manager.get_battle_state()['players']]
+        assert view.actions() == manager.get_action_log()
+        assert max(target for _, _, target in view.actions() if target is not None) > 127
+        assert replay(view.record()).get_battle_state() == manager.get_battle_state()
+
+
+def test_match_log_rejects_other_versions(tmp_path):
+    # A headerless log of the old 12-byte records
+    old = tmp_path / 'old.log'
+    old.write_bytes(struct.pack('<BBBbIi', SEAT, 0, 0, -1, 0, 0) * 4)
+    (tmp_path / 'old.log.idx').write_bytes(struct.pack('<QIIQ', 0, 4, 0, 7))
+    with pytest.raises(ValueError, match='no match log header'):
+        MatchLogWriter(str(old))
+    with pytest.raises(ValueError, match='no match log header'):
+        MatchLogReader(str(old))
+    assert old.stat().st_size == 48
+
+    # A future version with a header
+    path: str = str(tmp_path / 'matches.log')
+    MatchLogWriter(path).close()
+    with open(path, 'r+b') as f:
+        f.write(HEADER.pack(LOG_MAGIC, 3, 16))
+    with pytest.raises(ValueError, match='version 3'):
+        MatchLogWriter(path)
+    with pytest.raises(ValueError, match='version 3'):
+        MatchLogReader(path)
+
+
+# endregion
+
+# region Battle State Tests
+def test_character_parts_share_one_slotted_state(characters):
+    nobara: Character = characters.get('Nobara')
+    for part in (nobara, nobara._attack_move, nobara._defense_move, nobara.special_move, nobara.stun, nobara.poison):
+        assert not hasattr(part, '__dict__')
+    assert nobara.state == CharacterState(130, 14, 0, 0, 0)
+
+    nobara.defend()
+    nobara.special_move.last_used = 4
+    nobara.stun.duration = 1
+    nobara.poison.duration = 2
+    assert nobara.state == CharacterState(130, 28, 4, 1, 2)
+    assert nobara.defense == nobara._defense_move.current_defense == 28
+
+
+def test_battle_manager_snapshot_and_restore():
+    manager: BattleManager = play_seeded_match(11)
+    assert manager.is_battle_over()
+    log: list = list(manager.get_action_log())
+
+    replayed: BattleManager = replay(MatchRecord(
+        [p['name'] for p in manager.get_battle_state()['players']], 11, log[:len(log) // 2]))
+    saved: BattleState = replayed.snapshot()
+    state: dict = replayed.get_battle_state()
+    alive: list[str] = replayed.get_alive_targets()
+
+    # Playing the match out differently and restoring the snapshot comes back to exactly the same battle
+    while not replayed.is_battle_over():
+        player: Character = replayed.get_current_player()
+        if not replayed.handle_status_effects(player):
+            target: str = replayed.get_alive_targets(exclude=player)[0]
+            replayed.apply_action(player, 'special', replayed.get_target_by_name(target))
+            replayed.apply_action(player, 'attack', replayed.get_target_by_name(target))
+        replayed.advance_turn()
+    assert replayed.get_battle_state() != state
+    replayed.restore(saved)
+    assert replayed.get_battle_state() == state
+    assert replayed.get_alive_targets() == alive
+    assert len(replayed.get_action_log()) == len(log) // 2
+    assert saved.clone().characters == saved.characters
+
+
+# endregion
+
+# region Matchup Tests
+def test_matchup_table_covers_every_pair():
+    table: MatchupTable = get_table()
+    factory: CharacterFactory = CharacterFactory()
+    assert table.names == factory.get_character_names()
+    for a, attacker_name in enumerate(table.names):
+        for d, defender_name in enumerate(table.names):
+            attacker: Character = factory.create_character(attacker_name)
+            for boosted in (0, 1):
+                defender: Character = factory.create_character(defender_name)
+                if boosted:
+                    defender.defend()
+                assert table.attack[a][d][boosted] == max(attacker.attack_damage - defender.defense, 0)
+    gojo, sukuna = table.names.index('Gojo'), table.names.index('Sukuna')
+    assert table.attack[sukuna][gojo] == (27, 12)
+    assert table.special[sukuna][gojo] == (30, 30)  # Malevolent Shrine negates defense
+    assert table.to_dict()['special']['Gojo']['Nobara'] == {'base': 11, 'boosted': 0}
+
+
+def test_battle_reads_damage_from_the_matchup_table():
+    manager, (sukuna, gojo) = seat_battle(['Sukuna', 'Gojo'])
+    assert sukuna.kind == get_table().names.index('Sukuna')
+    gojo.defend()
+    manager.apply_action(sukuna, 'attack', gojo)
+    assert gojo.hp == 120 - 12
+    # A defense the table does not know is worked out as before
+    gojo.state.defense = 30
+    manager.apply_action(sukuna, 'attack', gojo)
+    assert gojo.hp == 120 - 12 - 5
+
+
+# endregion
+
+# region AI Tests
+def seat_battle(names: list[str]) -> tuple[BattleManager, list[Character]]:
+    factory: CharacterFactory = CharacterFactory()
+    players: list[Character] = [factory.create_character(name) for name in names]
+    manager: BattleManager = BattleManager(players, sink=NullSink(), seed=0)
+    for c in players:
+        manager.assign_character(c.name)
+    manager.start_battle()
+    return manager, players
+
+
+def test_search_ai_takes_a_sure_kill():
+    manager, (gojo, nobara) = seat_battle(['Gojo', 'Nobara'])
+    nobara.hp = 5
+    ai: SearchAI = SearchAI(budget_ms=50, seed=0)
+    assert ai.choose_for(manager, gojo) == ('attack', nobara.name)
+    assert ai.depth_reached >= 1
+
+
+def test_search_ai_respects_cooldowns_and_budget():
+    manager, (nanami, megumi) = seat_battle(['Nanami', 'Megumi'])
+    ai: SearchAI = SearchAI(budget_ms=20, seed=0)
+    before: dict = manager.get_battle_state()
+    for turn in range(6):
+        manager.restore(BattleState([p.snapshot() for p in (nanami, megumi)], turn, 0, 0))
+        start: float = time.perf_counter()
+        action, _ = ai.choose_for(manager, nanami)
+        # The first turn of look-ahead always finishes, deeper ones stop at the budget
+        assert time.perf_counter() - start < 0.5
+        if not nanami.special_move.is_available(turn):
+            assert action != 'special'
+    manager.restore(BattleState([p.snapshot() for p in (nanami, megumi)], 0, 0, 0))
+    assert manager.get_battle_state() == before
+
+
+def test_search_ai_weighs_chance_outcomes():
+    manager, (nobara, sukuna, megumi, gojo) = seat_battle(['Nobara', 'Sukuna', 'Megumi', 'Gojo'])
+    ai: SearchAI = SearchAI(budget_ms=1000, max_depth=1, max_outcomes=100)
+    ai.choose_for(manager, nobara)
+    # Resonance poisons each of the three others for 1-3 turns: 27 outcomes, each followed by one evaluation
+    assert ai.depth_reached == 1
+    assert ai.nodes == 0
+    ai.max_outcomes = 8
+    ai.max_depth = 2
+    ai.choose_for(manager, nobara)
+    assert ai.depth_reached == 2 and ai.nodes > 0
+
+
+def test_bot_pool_takes_rooms_in_turn():
+    manager, (gojo, nobara) = seat_battle(['Gojo', 'Nobara'])
+    names: list = [gojo.name, nobara.name]
+
+    async def scenario() -> list:
+        pool: BotPool = BotPool(workers=1, processes=False)
+        finished: list = []
+
+        async def move(room: str, i: int) -> None:
+            action, _ = await pool.choose(room, names, manager.snapshot(), 0, 10)
+            assert action in ('attack', 'defend', 'special')
+            finished.append(f'{room}{i}')
+
+        # The busy room queues three moves before the quiet one asks for its first
+        tasks = [asyncio.create_task(move('busy', i)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(move('quiet', 0)))
+        await asyncio.gather(*tasks)
+        pool.close()
+        return finished
+
+    assert asyncio.run(scenario()) == ['busy0', 'busy1', 'quiet0', 'busy2']
+
+
+# endregion
+
+# region Mailbox Tests
+def test_mailbox_get_by_type():
+    async def scenario() -> None:
+        mailbox: Mailbox = Mailbox()
+        mailbox.put({'type': 'action', 'action': 'attack'})
+        mailbox.put({'type': 'target', 'target': 'Ryomen Sukuna'})
+        mailbox.put({'type': 'action', 'action': 'defend'})
+
+        # Messages of each type come back in arrival order, independent of other types
+        assert (await mailbox.get('target'))['target'] == 'Ryomen Sukuna'
+        assert (await mailbox.get('action'))['action'] == 'attack'
+        assert (await mailbox.get('action'))['action'] == 'defend'
+
+        # Nothing left, so a bounded wait gives up
+        assert await mailbox.get('action', timeout=0.01) is None
+
+    asyncio.run(scenario())
+
+
+def test_mailbox_waits_until_put():
+    async def scenario() -> None:
+        mailbox: Mailbox = Mailbox()
+        reader: asyncio.Task = asyncio.create_task(mailbox.get('character_choice'))
+
+        mailbox.put({'type': 'action', 'action': 'attack'})
+        await asyncio.sleep(0.01)
+        assert not reader.done()
+
+        mailbox.put({'type': 'character_choice', 'character': 'Gojo'})
+        assert await asyncio.wait_for(reader, 1) == {'type': 'character_choice', 'character': 'Gojo'}
+
+    asyncio.run(scenario())
+
 # endregion
@@ -0,0 +1,163 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from JJK_Game.analysis.simulator import simulate, cross_check, play_object_battle, Lineup, Policy, POLICIES, DRAW
+from JJK_Game.analysis.monte_carlo import estimate
+from JJK_Game.analysis.tournament import run_tournament, lineups
+from JJK_Game.analysis.sweep import run_sweep, parse_range, sample
+import random
+import pytest
+
+
+# region Simulator Tests
+@pytest.mark.parametrize('names, policy', [
+    (['Sukuna', 'Megumi'], 'greedy'),
+    (['Megumi', 'Sukuna'], 'focus'),
+    (['Sukuna', 'Megumi'], 'focus'),
+])
+def test_simulator_matches_object_engine_without_randomness(names, policy):
+    # Neither these specials nor these policies draw random numbers, so every battle must play out identically
+    winner, turns, hp = play_object_battle(names, POLICIES[policy], random.Random(0))
+    result = simulate(names, 50, POLICIES[policy], seed=0)
+    assert (result.winners == winner).all()
+    assert (result.turns == turns).all()
+    assert (result.hp == hp).all()
+
+
+def test_simulator_cross_check_with_random_policies():
+    report: dict = cross_check(['Gojo', 'Sukuna', 'Megumi', 'Nanami', 'Nobara'], samples=1000, battles=20_000)
+    assert report['consistent'], report['z_scores']
+    assert sum(report['simulated']['win_rates'].values()) == pytest.approx(1)
+
+
+def test_simulator_turn_limit_is_a_draw():
+    result = simulate(['Gojo', 'Nobara'], 100, Policy((0, 1, 0)), seed=1, max_turns=20)
+    assert (result.winners == DRAW).all()
+    assert (result.turns == 20).all()
+    assert result.win_rates()['draw'] == 1
+
+
+def test_simulator_fills_every_chunk():
+    result = simulate(['Nanami', 'Nobara', 'Gojo'], 1000, seed=5, chunk_size=300)
+    assert len(result) == 1000
+    assert (result.turns > 0).all()
+    # Every decided battle has exactly one survivor, the winner
+    decided = result.winners != DRAW
+    assert ((result.hp[decided] > 0).sum(axis=1) == 1).all()
+    assert (result.hp[decided, result.winners[decided]] > 0).all()
+
+
+def test_lineup_validation():
+    with pytest.raises(ValueError):
+        Lineup(['Gojo'])
+    with pytest.raises(ValueError):
+        Lineup(['Gojo', 'Brysen'])
+
+
+def test_simulator_takes_a_policy_per_seat():
+    policies = [POLICIES['greedy'], POLICIES['focus']]
+    winner, turns, hp = play_object_battle(['Sukuna', 'Megumi'], policies, random.Random(0))
+    result = simulate(['Sukuna', 'Megumi'], 20, policies, seed=0)
+    assert (result.winners == winner).all()
+    assert (result.turns == turns).all()
+    assert (result.hp == hp).all()
+    with pytest.raises(ValueError):
+        simulate(['Sukuna', 'Megumi'], 20, [POLICIES['greedy']])
+
+
+# endregion
+
+# region Monte Carlo Tests
+def test_monte_carlo_estimate_is_cached(tmp_path):
+    names = ['Gojo', 'Nanami', 'Nobara']
+    policies = [POLICIES['random'], POLICIES['greedy'], POLICIES['focus']]
+    first = estimate(names, policies, battles=5000, workers=1, cache_dir=tmp_path)
+    assert not first.cached
+    assert sum(first.probability(seat) for seat in range(3)) + first.draws / first.battles == pytest.approx(1)
+    for seat in range(3):
+        low, high = first.interval(seat)
+        assert low <= first.probability(seat) <= high
+    second = estimate(names, policies, battles=5000, workers=1, cache_dir=tmp_path)
+    assert second.cached
+    assert second.wins == first.wins and second.mean_turns == first.mean_turns
+
+
+def test_monte_carlo_does_not_depend_on_worker_count():
+    one = estimate(['Sukuna', 'Nobara'], battles=120_000, workers=1, cache_dir=None)
+    two = estimate(['Sukuna', 'Nobara'], battles=120_000, workers=2, cache_dir=None)
+    assert one.wins == two.wins and one.draws == two.draws
+
+
+# endregion
+
+# region Tournament Tests
+def test_tournament_lineups_rotate_seats():
+    entered = list(lineups(['Gojo', 'Sukuna', 'Megumi'], (2, 3)))
+    assert len(entered) == 3 * 2 + 1 * 3
+    assert ('Sukuna', 'Gojo') in entered and ('Megumi', 'Gojo', 'Sukuna') in entered
+
+
+def test_tournament_resumes_from_cached_chunks(tmp_path):
+    names = ['Gojo', 'Sukuna', 'Nobara']
+    first = run_tournament(300, names=names, sizes=(2, 3), workers=1, chunk_size=100, cache_dir=tmp_path)
+    assert (first.computed, first.cached) == (9 * 3, 0)
+    # An interrupted run leaves some chunks behind, only those are simulated again
+    chunks = sorted(tmp_path.glob('*.json'))
+    for chunk in chunks[:4]:
+        chunk.unlink()
+    second = run_tournament(300, names=names, sizes=(2, 3), workers=1, chunk_size=100, cache_dir=tmp_path)
+    assert (second.computed, second.cached) == (4, 9 * 3 - 4)
+    assert second.lineups == first.lineups
+
+    characters = first.character_table()
+    assert all(row['battles'] == 300 * (2 * 2 + 3) for row in characters.values())
+    assert sum(row['wins'] for row in characters.values()) + sum(d for _, d, _ in first.lineups.values()) == \
+        300 * (3 * 2 + 3)
+    matchups = first.matchup_table()
+    assert set(matchups['Gojo']) == {'Sukuna', 'Nobara'}
+    first.write(tmp_path / 'tables')
+    assert (tmp_path / 'tables' / 'matchups.csv').read_text().splitlines()[0] == 'character,Gojo,Sukuna,Nobara'
+
+
+# endregion
+
+# region Sweep Tests
+def test_lineup_overrides_change_stats_and_tables():
+    plain = Lineup(['Gojo', 'Nanami'])
+    tuned = Lineup(['Gojo', 'Nanami'], {'Gojo': {'hp': 150, 'attack': plain.attack[0] + 5}})
+    assert tuned.hp[0] == 150 and tuned.hp[1] == plain.hp[1]
+    assert tuned.attack_table[0, 1, 0] == plain.attack_table[0, 1, 0] + 5
+    assert (tuned.attack_table[1] == plain.attack_table[1]).all()
+    with pytest.raises(ValueError):
+        Lineup(['Gojo', 'Nanami'], {'Gojo': {'speed': 3}})
+
+
+def test_sweep_ranges():
+    assert parse_range('Gojo.attack=24:30:2') == ('Gojo.attack', [24, 26, 28, 30])
+    assert parse_range('Nanami.hp=90,110') == ('Nanami.hp', [90, 110])
+    with pytest.raises(ValueError):
+        parse_range('Gojo.speed=1:3')
+    points = sample({'Gojo.hp': [100, 120], 'Nanami.hp': [90, 110]}, 10)
+    assert len(points) == 4 and len({tuple(point.values()) for point in points}) == 4
+
+
+def test_sweep_shares_pairs_and_resumes(tmp_path):
+    names = ['Gojo', 'Sukuna', 'Nanami']
+    space = {'Gojo.hp': [100, 140], 'Nanami.attack': [20, 30]}
+    checkpoint = tmp_path / 'sweep.jsonl'
+    first = run_sweep(space, 200, names=names, workers=1, checkpoint=checkpoint)
+    # Sukuna-Nanami only depends on Nanami and Gojo-Sukuna only on Gojo, so 5 points need far fewer than 5 * 6 tasks
+    assert len(first.points) == 4
+    assert first.computed == len(checkpoint.read_text().splitlines()) < 5 * 6
+    assert first.computed + first.reused == 5 * 6
+    rates = {tuple(point.values()): pairs for point, pairs in first.points}
+    assert rates[(100, 20)][('Gojo', 'Sukuna')] == rates[(100, 30)][('Gojo', 'Sukuna')]
+    assert first.best(1)[0][1] == min(rates.values(), key=first.score)
+
+    second = run_sweep(space, 200, names=names, workers=1, checkpoint=checkpoint)
+    assert second.computed == 0
+    assert second.points == first.points and second.baseline == first.baseline
+
+
+# endregion
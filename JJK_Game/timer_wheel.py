@@ -0,0 +1,136 @@
+import asyncio
+import math
+from typing import Callable, List, Optional
+
+TICK = 0.1
+WHEEL_SIZE = 512
+
+
+class Timer:
+    """
+    Handle for a callback scheduled on a TimerWheel.
+    """
+    __slots__ = ('wheel', 'tick', 'callback', 'cancelled', 'fired')
+
+    def __init__(self, wheel: 'TimerWheel', tick: int, callback: Callable[[], None]) -> None:
+        self.wheel: TimerWheel = wheel
+        self.tick: int = tick
+        self.callback: Callable[[], None] = callback
+        self.cancelled: bool = False
+        self.fired: bool = False
+
+    def cancel(self) -> None:
+        """
+        Prevents the callback from running. Does nothing if it already ran.
+        :return: None
+        """
+        if not self.cancelled and not self.fired:
+            self.cancelled = True
+            self.wheel.pending -= 1
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel shared by every match in a process.
+    Scheduling and cancelling are O(1) and a single task expires all deadlines, however many matches are waiting.
+    """
+
+    # region Constructor
+    def __init__(self, tick: float = TICK, size: int = WHEEL_SIZE) -> None:
+        """
+        Creates an empty wheel. The driving task starts with the first scheduled timer.
+        :param tick: The resolution of the wheel in seconds. Timers fire at most one tick late.
+        :param size: The number of slots. Timers further away than one turn of the wheel wait extra rounds.
+        """
+        self.tick: float = tick
+        self.pending: int = 0
+        self.__slots: List[List[Timer]] = [[] for _ in range(size)]
+        self.__current: int = 0  # Last tick that was expired
+        self.__origin: Optional[float] = None  # Loop time of tick 0
+        self.__wakeup: Optional[asyncio.Event] = None
+        self.__task: Optional[asyncio.Task] = None
+
+    # endregion
+
+    # region Methods
+    def __now(self) -> int:
+        """
+        Gets the tick the loop clock is currently in.
+        :return: The current tick number.
+        """
+        return int((asyncio.get_running_loop().time() - self.__origin) / self.tick)
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> Timer:
+        """
+        Runs a callback after the given delay.
+        :param delay: Seconds to wait.
+        :param callback: Function to call without arguments on the event loop.
+                         It runs as its own loop callback, so an exception in it cannot stop the wheel.
+        :return: A handle that can cancel the timer.
+        """
+        loop = asyncio.get_running_loop()
+        if self.__task is None or self.__task.done():
+            self.__slots = [[] for _ in self.__slots]
+            self.pending = 0
+            self.__origin = loop.time()
+            self.__current = 0
+            self.__wakeup = asyncio.Event()
+            self.__task = loop.create_task(self.__run())
+        elif self.pending == 0:
+            # Nothing was waiting, skip the idle ticks instead of walking through them
+            self.__current = self.__now()
+
+        tick = max(self.__current + 1, math.ceil((loop.time() + delay - self.__origin) / self.tick))
+        timer = Timer(self, tick, callback)
+        self.__slots[tick % len(self.__slots)].append(timer)
+        self.pending += 1
+        self.__wakeup.set()
+        return timer
+
+    def __expire(self, tick: int) -> None:
+        """
+        Fires the due timers in the slot of the given tick and keeps the ones due in a later round.
+        :param tick: The tick being expired.
+        :return: None
+        """
+        index = tick % len(self.__slots)
+        slot = self.__slots[index]
+        if not slot:
+            return
+        later = []
+        loop = asyncio.get_running_loop()
+        for timer in slot:
+            if timer.cancelled:
+                continue
+            if timer.tick > tick:
+                later.append(timer)
+                continue
+            timer.fired = True
+            self.pending -= 1
+            loop.call_soon(timer.callback)
+        self.__slots[index] = later
+
+    async def __run(self) -> None:
+        """
+        Expires ticks as the clock reaches them, sleeping while no timer is pending.
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.pending == 0:
+                self.__wakeup.clear()
+                await self.__wakeup.wait()
+            now = self.__now()
+            while self.__current < now:
+                self.__current += 1
+                self.__expire(self.__current)
+            await asyncio.sleep(self.__origin + (self.__current + 1) * self.tick - loop.time())
+
+    def close(self) -> None:
+        """
+        Stops the driving task. Pending timers never fire.
+        :return: None
+        """
+        if self.__task is not None:
+            self.__task.cancel()
+    # endregion